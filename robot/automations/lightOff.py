@@ -1,7 +1,11 @@
 from magicbot import StateMachine, timed_state, state
 from components import light, intake as Intake
+from common.scheduler import NORMAL
 
 class LightSwitch(StateMachine):
+    # Its states are a quarter second long
+    execute_rate = 10
+    execute_priority = NORMAL
     light = light.Light
     intake = Intake.Arm
 
@@ -1,10 +1,16 @@
 import components.intake as Intake
-from magicbot import StateMachine, state, timed_state
+from magicbot import state, timed_state
+from magicbot.magic_tunable import tunable
+from common import stateChaining
 
 
-class ShootBall(StateMachine):
+class ShootBall(stateChaining.ChainedStateMachine):
     intake = Intake.Arm
 
+    #: Past this position (bigger is lower) the arm is already low enough
+    #: to fire from, so it doesn't wait for the middle
+    fire_position = tunable(2000)
+
     def on_enable(self):
         self.is_running = False
 
@@ -17,13 +23,15 @@ class ShootBall(StateMachine):
     def stop(self):
         self.done()
 
+    @stateChaining.instant
     @state(first=True, must_finish=True)
-    First state, lower arm.
     def lower_arms(self):
+        """First state, lower arm."""
         self.intake.set_arm_middle()
-        if self.intake.get_position() > 2000:
+        if self.intake.get_position() > self.fire_position or \
+                self.intake.ready_to_fire():
             self.next_state('fire')
 
     @timed_state(duration=1, must_finish=True)
     def fire(self):
-        self.intake.outtake()
\ No newline at end of file
+        self.intake.outtake()
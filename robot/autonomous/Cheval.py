@@ -1,6 +1,6 @@
 from robotpy_ext.autonomous import state, timed_state, StatefulAutonomous
 from components import intake, drive as Drive
-import wpilib
+from common import sensors, stateChaining
 from networktables import NetworkTable
 from magicbot.magic_tunable import tunable
 
@@ -44,14 +44,14 @@ class ChevalDeFrise(StatefulAutonomous):
 
         self.drive.move(0.7, 0)
 
-class SonicCheval(StatefulAutonomous):
+class SonicCheval(stateChaining.ChainedAutonomous):
     MODE_NAME = 'SonicCheval'
     DEFAULT = False
 
     intake = intake.Arm
     drive = Drive.Drive
 
-    ultrasonic = wpilib.AnalogInput
+    sensors = sensors.Sensors
 
     targetDistance = tunable(.13)
     driveOnDistance = tunable(1)
@@ -60,7 +60,7 @@ class SonicCheval(StatefulAutonomous):
     @state(first = True)
     def drive_to_cheval(self):
         self.drive.move(.4, 0)
-        if self.ultrasonic.getVoltage() < self.targetDistance:
+        if self.sensors.get().ultrasonic < self.targetDistance:
             self.next_state('lower_arms')
 
     @state
@@ -77,6 +77,7 @@ class SonicCheval(StatefulAutonomous):
         if self.drive.drive_distance(self.driveOnDistance):
             self.next_state('raise_arms')
 
+    @stateChaining.instant
     @state
     def raise_arms(self, initial_call):
         self.intake.set_arm_top()
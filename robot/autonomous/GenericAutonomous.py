@@ -1,9 +1,9 @@
-from robotpy_ext.autonomous import state, timed_state, StatefulAutonomous
+from robotpy_ext.autonomous import state, timed_state
 from components import intake, drive
-import wpilib
+from common import sensors, stateChaining
 from magicbot.magic_tunable import tunable
 
-class LowBar(StatefulAutonomous):
+class LowBar(stateChaining.ChainedAutonomous):
     DEFAULT = False
 
     intake = intake.Arm
@@ -13,6 +13,7 @@ class LowBar(StatefulAutonomous):
         self.register_sd_var('Rotate_Angle', 55)
         self.register_sd_var('Ramp_Distance', 8.4)
 
+    @stateChaining.instant
     @state
     def LowBarStart(self):
         self.next_state('lower_arm')
@@ -21,7 +22,8 @@ class LowBar(StatefulAutonomous):
     def lower_arm(self, initial_call):
         self.intake.set_arm_bottom()
 
-        if self.intake.on_target():
+        # The bar is a ways off, so the arm can finish on the way
+        if self.intake.will_be_on_target(.5):
             self.next_state('drive_forward')
 
     @state
@@ -29,13 +31,13 @@ class LowBar(StatefulAutonomous):
         if self.drive.drive_distance(self.Drive_Distance*12):
             self.next_state('transition')
 
-class ChevalDeFrise(StatefulAutonomous):
+class ChevalDeFrise(stateChaining.ChainedAutonomous):
     DEFAULT = False
 
     intake = intake.Arm
     drive = drive.Drive
 
-    ultrasonic = wpilib.AnalogInput
+    sensors = sensors.Sensors
 
     targetDistance = tunable(.13)
     driveOnDistance = tunable(1)
@@ -43,7 +45,7 @@ class ChevalDeFrise(StatefulAutonomous):
 
     def drive_to_cheval(self):
         self.drive.move(.4, 0)
-        if self.ultrasonic.getVoltage() < self.targetDistance:
+        if self.sensors.get().ultrasonic < self.targetDistance:
             self.next_state('lower_arms')
 
     @state
@@ -60,6 +62,7 @@ class ChevalDeFrise(StatefulAutonomous):
         if self.drive.drive_distance(self.driveOnDistance):
             self.next_state('raise_arms')
 
+    @stateChaining.instant
     @state
     def raise_arms(self, initial_call):
         self.intake.set_arm_top()
@@ -73,7 +76,7 @@ class ChevalDeFrise(StatefulAutonomous):
             self.next_state('transition')
 
 
-class Portcullis(StatefulAutonomous):
+class Portcullis(stateChaining.ChainedAutonomous):
     DEFAULT = False
 
     intake = intake.Arm
@@ -83,6 +86,7 @@ class Portcullis(StatefulAutonomous):
         self.register_sd_var('A0_Arm_To_Position', 500)
         self.register_sd_var('A0_DriveThru_Speed', 0.4)
 
+    @stateChaining.instant
     @state
     def A0Start(self):
         self.next_state('A0_lower_arm')
@@ -112,14 +116,14 @@ class Portcullis(StatefulAutonomous):
         self.intake.set_arm_top()
         self.drive.angle_rotation(0)
         self.drive.move(self.A0_DriveThru_Speed, 0)
-class Charge(StatefulAutonomous):
+class Charge(stateChaining.ChainedAutonomous):
     DEFAULT = False
 
     @timed_state(duration = 1.75)
     def E0Start(self, initial_call):
         self.drive.move(1,0)
 
-class Default(StatefulAutonomous):
+class Default(stateChaining.ChainedAutonomous):
     DEFAULT = False
 
     @state
@@ -1,5 +1,6 @@
 from robotpy_ext.autonomous import state, timed_state, StatefulAutonomous
 from components import intake, drive as Drive
+from common import parallel
 from networktables.util import ntproperty
 from networktables import NetworkTable
 
@@ -16,18 +17,44 @@ class LowBar(StatefulAutonomous):
         self.register_sd_var('Ramp_Distance', 6)
         self.register_sd_var('Max_Drive_Speed', .5)
 
-    @timed_state(duration = 1, next_state='drive_forward', first = True)
-    def lower_arm(self, initial_call):
+        # The arm goes down while the robot drives to the bar, and back to
+        # the middle while it drives up the ramp
+        self.to_bar = parallel.Parallel() \
+            .add('arm', self._lower_arm, timeout=1) \
+            .add('drive', self._drive_forward, start_when=self._arm_nearly_down)
+        self.to_ramp = parallel.Parallel() \
+            .add('drive', self._drive_to_ramp) \
+            .add('arm', self._lower_to_shoot, timeout=1)
 
-        self.drive.reset_drive_encoders()
+    def on_enable(self):
+        StatefulAutonomous.on_enable(self)
+        self.drive.precompute_profiles(self.Max_Drive_Speed, self.Drive_Distance*12, self.Ramp_Distance*12)
+
+    def _lower_arm(self, initial_call):
         self.intake.set_arm_bottom()
+        return self.intake.on_target()
 
-        if self.intake.on_target():
-            self.next_state('drive_forward')
+    def _arm_nearly_down(self, elapsed):
+        # The bar is a ways off, so the arm can finish on the way
+        return elapsed > 1 or self.intake.will_be_on_target(.5)
 
-    @state
-    def drive_forward(self):
-        if self.drive.drive_distance(self.Drive_Distance*12, max_speed=self.Max_Drive_Speed):
+    def _drive_forward(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+        return self.drive.drive_distance(self.Drive_Distance*12, max_speed=self.Max_Drive_Speed)
+
+    def _drive_to_ramp(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+        return self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed)
+
+    def _lower_to_shoot(self, initial_call):
+        self.intake.set_arm_middle()
+        return self.intake.ready_to_fire()
+
+    @state(first=True)
+    def drive_forward(self, initial_call):
+        if self.to_bar.run(initial_call):
             self.next_state('rotate')
     @state
     def rotate(self):
@@ -37,17 +64,7 @@ class LowBar(StatefulAutonomous):
             self.next_state('drive_to_ramp')
     @state
     def drive_to_ramp(self, initial_call):
-        if initial_call:
-            self.drive.reset_drive_encoders()
-
-        if self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed):
-            self.next_state('lower_to_shoot')
-
-    @timed_state(duration = 1, next_state='shoot')
-    def lower_to_shoot(self):
-        self.intake.set_arm_middle()
-
-        if self.intake.on_target():
+        if self.to_ramp.run(initial_call):
             self.next_state('shoot')
 
 
@@ -72,18 +89,56 @@ class CameraLowBar(StatefulAutonomous):
         self.register_sd_var('RotateSpeed', .4)
         self.register_sd_var('RotateAngle', 46)
 
-    @timed_state(duration = 1, next_state='drive_under_bar', first=True)
-    def lower_arm(self, initial_call):
-        self.drive.reset_drive_encoders()
+        # The arm goes down while the robot drives under the bar, and to the
+        # middle while it drives to the ramp
+        self.under_bar = parallel.Parallel() \
+            .add('arm', self._lower_arm, timeout=1) \
+            .add('drive', self._drive_under_bar, start_when=self._arm_nearly_down)
+        self.camera_to_ramp = parallel.Parallel() \
+            .add('drive', self._camera_drive) \
+            .add('arm', self._lower_to_shoot, timeout=1)
+        self.to_ramp = parallel.Parallel() \
+            .add('drive', self._drive_to_ramp) \
+            .add('arm', self._lower_to_shoot, timeout=1)
+
+    def on_enable(self):
+        StatefulAutonomous.on_enable(self)
+        self.drive.precompute_profiles(self.Max_Drive_Speed, self.Drive_Bar_Distance*12, self.Ramp_Distance*12)
+
+    def _lower_arm(self, initial_call):
         self.intake.set_arm_bottom()
+        return self.intake.on_target()
 
-        if self.intake.on_target():
-            self.next_state('drive_under_bar')
-    @state
-    def drive_under_bar(self, state_tm):
-        if state_tm > 1.5:
+    def _arm_nearly_down(self, elapsed):
+        # The bar is a ways off, so the arm can finish on the way
+        return elapsed > 1 or self.intake.will_be_on_target(.5)
+
+    def _drive_under_bar(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+        if self.under_bar.elapsed('drive') > 1.5:
             self.intake.set_target_position(1000)
-        if self.drive.drive_distance(self.Drive_Bar_Distance*12, max_speed=self.Max_Drive_Speed):
+        return self.drive.drive_distance(self.Drive_Bar_Distance*12, max_speed=self.Max_Drive_Speed)
+
+    def _camera_drive(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+        self.drive.align_to_tower()
+        return self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed)
+
+    def _drive_to_ramp(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+            self.drive.disable_camera_tracking()
+        return self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed)
+
+    def _lower_to_shoot(self, initial_call):
+        self.intake.set_arm_middle()
+        return self.intake.ready_to_fire()
+
+    @state(first=True)
+    def drive_under_bar(self, initial_call):
+        if self.under_bar.run(initial_call):
             self.next_state('drive_forward')
 
     @state
@@ -123,28 +178,19 @@ class CameraLowBar(StatefulAutonomous):
 
     @state
     def camera_drive(self, initial_call):
-        if initial_call:
-            self.drive.reset_drive_encoders()
-
-        self.drive.align_to_tower()
-
-        if self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed):
+        if self.camera_to_ramp.run(initial_call):
             self.next_state('lower_to_shoot')
 
     @state
     def drive_to_ramp(self, initial_call):
-        if initial_call:
-            self.drive.reset_drive_encoders()
-            self.drive.disable_camera_tracking()
-
-        if self.drive.drive_distance(self.Ramp_Distance*12, max_speed=self.Max_Drive_Speed):
+        if self.to_ramp.run(initial_call):
             self.next_state('lower_to_shoot')
 
     @timed_state(duration = 1, next_state='shoot')
     def lower_to_shoot(self):
         self.intake.set_arm_middle()
 
-        if self.drive.align_to_tower() and self.intake.on_target():
+        if self.drive.align_to_tower() and self.intake.ready_to_fire():
             self.next_state('shoot')
 
 
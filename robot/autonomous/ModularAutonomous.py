@@ -1,7 +1,8 @@
-from robotpy_ext.autonomous import state, timed_state
+from robotpy_ext.autonomous import state, timed_state, StatefulAutonomous
 from .GenericAutonomous import LowBar, ChevalDeFrise, Portcullis, Charge, Default
 from automations import targetGoal
 from components import intake as Intake, drive as Drive
+from common import mailbox, parallel, splinePath, stateChaining
 from networktables.networktable import NetworkTable
 from networktables.util import ntproperty
 from magicbot.magic_tunable import tunable
@@ -12,6 +13,7 @@ class ModularAutonomous(LowBar, ChevalDeFrise, Portcullis, Charge, Default):
     DEFAULT = False
 
     sd = NetworkTable
+    dashboard = mailbox.DashboardInputs
     intake = Intake.Arm
     drive = Drive.Drive
     targetGoal = targetGoal.TargetGoal
@@ -19,19 +21,57 @@ class ModularAutonomous(LowBar, ChevalDeFrise, Portcullis, Charge, Default):
 
     opposite = tunable(120)
     Ramp_Distance = tunable(6)
+    Follow_Path = tunable(False)
 
     def initialize(self):
         LowBar.initialize(self)
         Portcullis.initialize(self)
 
+        # Paths to the goal, by (angleConst, opposite)
+        self.paths = {}
+
+    def prepare(self):
+        """
+            Makes the paths for the current distance, so nothing is left to
+            do when auto starts. The robot calls this while it's disabled,
+            and only for the selected mode, so it isn't part of startup.
+        """
+        for angleConst in (1, -1):
+            self.get_path(angleConst)
+
+    def get_path(self, angleConst):
+        """
+            :returns: A path from where the robot is after crossing its
+                      defense to where it should shoot from, in the robot's
+                      own frame at the start of the path
+        """
+        key = (angleConst, self.opposite)
+        path = self.paths.get(key)
+        if path is None:
+            path = splinePath.SplinePath((0, 0, 0), (50, self.opposite*angleConst, -45*angleConst))
+            self.paths[key] = path
+        return path
+
+    def on_enable(self):
+        StatefulAutonomous.on_enable(self)
+        self.drive.precompute_profiles(.9, self.Drive_Distance*12, self.A0_Drive_Encoder_Distance*12,
+                                       math.sqrt(2500 + self.opposite**2))
+        for angleConst in (1, -1):
+            self.drive.precompute_profiles(.9, self.get_path(angleConst).length)
+
+    @stateChaining.instant
     @state(first=True)
     def startModularAutonomous(self):
-        print(self.sd.getValue('robotDefense', 'Default') + 'Start')
-        self.intake.manualZero()
+        defense = self.dashboard.get('robotDefense')
+        print(defense + 'Start')
+        # Unless the arm's calibration was kept from before, it starts up
+        if not self.intake.isCalibrated:
+            self.intake.manualZero()
         self.drive.reset_gyro_angle()
-        self.next_state(self.sd.getValue('robotDefense', 'LowBar') + 'Start')
-        self.position = int(self.sd.getValue('robotPosition', '1'))
+        self.next_state(defense + 'Start')
+        self.position = int(self.dashboard.get('robotPosition'))
 
+    @stateChaining.instant
     @state
     def transition(self):
         if self.position == 3:
@@ -42,9 +82,22 @@ class ModularAutonomous(LowBar, ChevalDeFrise, Portcullis, Charge, Default):
         self.drive_distance = math.sqrt(2500 + self.opposite**2)
         if self.position == 1 or self.position == 4:
             self.next_state('drive_to_wall')
+        elif self.Follow_Path:
+            self.path = self.get_path(self.angleConst)
+            # The gyro and the pose both start at the start of the path
+            self.drive.reset_gyro_angle()
+            self.drive.reset_pose()
+            self.next_state('follow_path')
         else:
             self.next_state('rotate')
 
+    @state
+    def follow_path(self):
+        # The path only ends on distance, so finish the turn to its heading
+        # the same way the rotate/drive version does
+        if self.drive.follow_path(self.path):
+            self.next_state('rotate_back')
+
     @state
     def rotate(self):
         if self.drive.angle_rotation(self.rotateAngle):
@@ -80,31 +133,44 @@ class BallModularAutonomous(ModularAutonomous):
     DEFAULT = False
 
     sd = NetworkTable
+    dashboard = mailbox.DashboardInputs
     intake = Intake.Arm
     drive = Drive.Drive
 
     def initialize(self):
-        LowBar.initialize(self)
-        Portcullis.initialize(self)
+        ModularAutonomous.initialize(self)
 
         self.register_sd_var('Drive_Distance', -5)
         self.register_sd_var('Rotate_Angle', 180)
         self.register_sd_var('Collect_Distance', 0.5)
 
+        # The arm goes to the middle on the way to the ball
+        self.to_ball = parallel.Parallel() \
+            .add('drive', self._drive_to_ball) \
+            .add('arm', self._arm_to_collect)
+
+    def _drive_to_ball(self, initial_call):
+        if initial_call:
+            self.drive.reset_drive_encoders()
+        return self.drive.drive_distance(self.Drive_Distance)
+
+    def _arm_to_collect(self, initial_call):
+        self.intake.set_arm_middle()
+        return self.intake.on_target()
+
+    @stateChaining.instant
     @state(first=True)
     def startModularAutonomous(self):
-        print(self.sd.getValue('robotDefense', 'Default') + 'Start')
-        self.intake.manualZero()
+        print(self.dashboard.get('robotDefense') + 'Start')
+        # Unless the arm's calibration was kept from before, it starts up
+        if not self.intake.isCalibrated:
+            self.intake.manualZero()
         self.drive.reset_gyro_angle()
         self.next_state('drive_to_ball')
 
     @timed_state(duration = 4, next_state='lower_arms')
     def drive_to_ball(self, initial_call):
-        if initial_call:
-            self.drive.reset_drive_encoders()
-            self.intake.set_arm_middle()
-
-        if self.drive.drive_distance(self.Drive_Distance) and self.intake.on_target():
+        if self.to_ball.run(initial_call):
             self.next_state('collect')
 
     @state
@@ -130,7 +196,9 @@ class BallModularAutonomous(ModularAutonomous):
             self.drive.reset_gyro_angle()
 
         if self.drive.angle_rotation(self.Rotate_Angle):
-            self.next_state(self.sd.getValue('robotDefense', 'LowBar') + 'Start')
-            self.position = int(self.sd.getValue('robotPosition', '1'))
-            print('test '+(self.sd.getValue('robotDefense', 'LowBar') + 'Start'))
-            print('test '+self.sd.getValue('robotPosition', '1'))
+            defense = self.dashboard.get('robotDefense')
+            position = self.dashboard.get('robotPosition')
+            self.next_state(defense + 'Start')
+            self.position = int(position)
+            print('test '+(defense + 'Start'))
+            print('test '+position)
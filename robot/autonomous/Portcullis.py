@@ -1,5 +1,6 @@
 from robotpy_ext.autonomous import state, timed_state, StatefulAutonomous
 from components import intake, drive as Drive
+from common import parallel
 import wpilib
 from networktables import NetworkTable
 
@@ -14,19 +15,27 @@ class DirectPortcullis(StatefulAutonomous):
         self.register_sd_var('Arm_To_Position', 1000)
         self.register_sd_var('DriveThru_Speed', 0.4)
 
-    @timed_state(duration = 2, next_state='drive_forward', first = True)
-    def lower_arm(self, initial_call):
+        # The arm goes down while the robot drives up to the portcullis
+        self.to_portcullis = parallel.Parallel() \
+            .add('arm', self._lower_arm, timeout=2) \
+            .add('drive', self._drive_forward, start_when=self._arm_nearly_down)
+
+    def _lower_arm(self, initial_call):
         self.intake.set_arm_bottom()
+        return self.intake.on_target()
 
-        if self.intake.on_target():
-            self.next_state('drive_forward')
+    def _arm_nearly_down(self, elapsed):
+        # The portcullis is a ways off, so the arm can finish on the way
+        return elapsed > 2 or self.intake.will_be_on_target(.5)
 
-    @state
-    def drive_forward(self, initial_call):
+    def _drive_forward(self, initial_call):
         if initial_call:
             self.drive.reset_drive_encoders()
+        return self.drive.drive_distance(self.Drive_Encoder_Distance*12)
 
-        if self.drive.drive_distance(self.Drive_Encoder_Distance*12):
+    @state(first=True)
+    def drive_forward(self, initial_call):
+        if self.to_portcullis.run(initial_call):
             self.next_state('raise_arm')
 
     @timed_state(duration = 0.5, next_state='drive_thru')
@@ -0,0 +1,65 @@
+import json
+import os
+import time
+
+import wpilib
+
+
+def default_path():
+    """
+        /home/lvuser/calibration.json on the robot. The simulator has no
+        absolute sensors to check saved calibrations against, so it doesn't
+        keep any.
+    """
+    if wpilib.RobotBase.isSimulation():
+        return None
+    return '/home/lvuser/calibration.json'
+
+
+class CalibrationStore:
+    """
+        Keeps calibrations across reboots, in a small JSON file. The file is
+        always replaced whole (written next to it, then renamed over it), so
+        losing power in the middle of a save leaves the old one intact.
+    """
+
+    def __init__(self, path):
+        """:param path: File to keep them in, None to not keep anything"""
+        self.path = path
+        self.data = self._read()
+
+    def get(self, name):
+        """:returns: The saved dict for name, or None"""
+        return self.data.get(name)
+
+    def put(self, name, values, when=None):
+        """
+            Saves a dict for name, along with the time it was calibrated
+
+            :param when: time.time() when it was calibrated, if not now
+        """
+        values = dict(values)
+        values['time'] = time.time() if when is None else when
+        self.data[name] = values
+
+        if self.path is None:
+            return
+
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as fp:
+            json.dump(self.data, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp, self.path)
+
+    def _read(self):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+        except ValueError:
+            return {}
+
+        return data if isinstance(data, dict) else {}
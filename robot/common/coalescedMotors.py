@@ -0,0 +1,124 @@
+import wpilib
+
+
+class _Coalescing:
+    """
+        Shared logic for the motor controllers below: remembers the last
+        value of each command that was sent, and skips sending it again
+        unless it changed or the keepalive period has passed.
+
+        Only skipped configuration (PID) and sensor position writes save
+        CAN frames, and only those are counted in suppressed_frames. The
+        Talon sends its control frame (mode and output) on a timer whether
+        or not set() is called, so a skipped set() only saves the call into
+        the HAL. Those are counted in suppressed_sets.
+    """
+
+    #: Unchanged outputs are resent at least this often (seconds), so
+    #: that motor safety and the controller's own timeouts stay happy.
+    #: This is half of the default MotorSafety expiration.
+    keepalive = 0.05
+
+    #: Unchanged configuration (PID) is resent this often
+    config_keepalive = 0.5
+
+    def _coalescing_init(self):
+        self._last = {}
+        self.sent_frames = 0
+        self.suppressed_frames = 0
+        self.suppressed_sets = 0
+
+    def _should_send(self, command, value, period):
+        now = wpilib.Timer.getFPGATimestamp()
+        last = self._last.get(command)
+
+        if last is not None and last[0] == value and now - last[1] < period:
+            return False
+
+        self._last[command] = (value, now)
+        return True
+
+    def _should_set(self, value):
+        if self._should_send('set', value, self.keepalive):
+            return True
+        self.suppressed_sets += 1
+        return False
+
+    def _forget(self):
+        """The controller was stopped, so the next command must go out"""
+        self._last.clear()
+
+    def last_output(self):
+        """The last value passed to set(), or 0 if the controller was stopped since"""
+        last = self._last.get('set')
+        return 0 if last is None else last[0]
+
+
+class CoalescedCANTalon(_Coalescing, wpilib.CANTalon):
+    """A CANTalon that doesn't send set, mode, PID or sensor position commands that wouldn't change anything"""
+
+    def __init__(self, deviceNumber, *args, **kwargs):
+        self._coalescing_init()
+        wpilib.CANTalon.__init__(self, deviceNumber, *args, **kwargs)
+
+    def set(self, outputValue, syncGroup=0):
+        if self._should_set(outputValue):
+            wpilib.CANTalon.set(self, outputValue, syncGroup)
+        else:
+            self.feed()
+
+    def changeControlMode(self, controlMode):
+        if controlMode == self.controlMode:
+            self.suppressed_sets += 1
+            return
+
+        # The Talon stays disabled until the next set(), so that can't be skipped
+        self._last.pop('set', None)
+        wpilib.CANTalon.changeControlMode(self, controlMode)
+
+    def setPID(self, p, i, d, f=0, izone=0, closeLoopRampRate=0, profile=None):
+        if self._should_send(('pid', profile), (p, i, d, f, izone, closeLoopRampRate), self.config_keepalive):
+            self.sent_frames += 1
+            wpilib.CANTalon.setPID(self, p, i, d, f, izone, closeLoopRampRate, profile)
+        else:
+            self.suppressed_frames += 1
+
+    def setPosition(self, pos):
+        # The sensor moves on its own, so what was last written says nothing
+        # about what it reads now. Only skip it when it already reads pos,
+        # like while the arm sits on a limit switch.
+        if self.getPosition() == pos:
+            self.suppressed_frames += 1
+            return
+        self.sent_frames += 1
+        wpilib.CANTalon.setPosition(self, pos)
+
+    def stopMotor(self):
+        self._forget()
+        wpilib.CANTalon.stopMotor(self)
+
+    def disable(self):
+        self._forget()
+        wpilib.CANTalon.disable(self)
+
+
+class CoalescedTalon(_Coalescing, wpilib.Talon):
+    """A PWM Talon that only updates its output when the value changes"""
+
+    def __init__(self, channel):
+        self._coalescing_init()
+        wpilib.Talon.__init__(self, channel)
+
+    def set(self, speed, syncGroup=0):
+        if self._should_set(speed):
+            wpilib.Talon.set(self, speed, syncGroup)
+        else:
+            self.feed()
+
+    def stopMotor(self):
+        self._forget()
+        wpilib.Talon.stopMotor(self)
+
+    def disable(self):
+        self._forget()
+        wpilib.Talon.disable(self)
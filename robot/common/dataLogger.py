@@ -0,0 +1,158 @@
+import json
+import struct
+import threading
+
+MAGIC = b'MATCHLOG'
+
+
+def read_header(fp):
+    """
+        :param fp: A log file, open for binary reading at the start
+        :returns: (header dict, offset of the first record)
+    """
+    start = len(MAGIC) + 4
+    prefix = fp.read(start)
+    if prefix[:len(MAGIC)] != MAGIC:
+        raise ValueError("%s is not a log" % getattr(fp, 'name', fp))
+
+    header_length, = struct.unpack('<I', prefix[len(MAGIC):])
+    header = json.loads(fp.read(header_length).decode())
+    return header, start + header_length
+
+
+class DataLogger:
+    """
+        Writes fixed size binary samples to a file without ever blocking
+        the control loop on the disk.
+
+        Samples are packed straight into a preallocated ring buffer, and a
+        background thread writes whatever has built up to the file every
+        flush_period seconds. If the disk falls so far behind that the
+        buffer fills up, new samples are dropped (and counted) rather than
+        waiting for it.
+
+        Only one thread may call log().
+    """
+
+    def __init__(self, path, fields, info=None, capacity=1024, flush_period=.1):
+        """
+            :param path: File to write, replaced if it exists
+            :param fields: (name, struct code) for each value in a sample,
+                           e.g. ('yaw', 'f') or ('state', '24s')
+            :param info: Extra things to put in the header
+            :param capacity: Samples the buffer holds
+        """
+        self.fields = fields
+        self.format = '<' + ''.join(code for _, code in fields)
+        self.record_struct = struct.Struct(self.format)
+        self.capacity = capacity
+        self.flush_period = flush_period
+
+        self.buffer = bytearray(capacity * self.record_struct.size)
+
+        # Only log() changes written, and only the writer thread changes
+        # flushed, so neither needs a lock
+        self.written = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        header = dict(info or {})
+        header['format'] = self.format
+        header['fields'] = [name for name, _ in fields]
+        header = json.dumps(header).encode()
+
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='DataLogger')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def log(self, *values):
+        """Adds a sample. Never blocks."""
+        written = self.written
+        if written - self.flushed >= self.capacity:
+            self.dropped += 1
+            return
+
+        self.record_struct.pack_into(self.buffer, (written % self.capacity) * self.record_struct.size, *values)
+        self.written = written + 1
+
+    def close(self):
+        """Writes out everything that's left and closes the file"""
+        self.stopping.set()
+        self.thread.join()
+        self.file.close()
+
+    def _run(self):
+        while not self.stopping.wait(self.flush_period):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        flushed = self.flushed
+        count = self.written - flushed
+        if count == 0:
+            return
+
+        size = self.record_struct.size
+        view = memoryview(self.buffer)
+        start = flushed % self.capacity
+        end = start + count
+
+        # The samples may wrap around the end of the buffer
+        if end <= self.capacity:
+            self.file.write(view[start * size:end * size])
+        else:
+            self.file.write(view[start * size:])
+            self.file.write(view[:(end - self.capacity) * size])
+        self.file.flush()
+
+        self.flushed = flushed + count
+
+
+def load(path):
+    """
+        Reads a log for analysis. Needs NumPy, which the robot doesn't
+        have, so this is for laptops.
+
+        :returns: (header dict, NumPy structured array with a field for each
+                  value in the samples)
+    """
+    import numpy as np
+
+    with open(path, 'rb') as fp:
+        header, offset = read_header(fp)
+        fmt = header['format']
+
+        dtype = np.dtype([(name, _numpy_code(fmt[0], code))
+                          for name, code in zip(header['fields'], _codes(fmt[1:]))])
+        assert dtype.itemsize == struct.calcsize(fmt)
+
+        fp.seek(offset)
+        data = fp.read()
+
+    # A partly written last sample (robot lost power) is ignored
+    count = len(data) // dtype.itemsize
+    return header, np.frombuffer(data, dtype, count)
+
+
+def _numpy_code(byte_order, code):
+    """NumPy's name for a struct code. They agree, except for strings."""
+    if code.endswith('s'):
+        return 'S' + code[:-1]
+    return byte_order + code
+
+
+def _codes(fmt):
+    """Splits a struct format like 'dB24s' into ['d', 'B', '24s']"""
+    codes = []
+    count = ''
+    for c in fmt:
+        if c.isdigit():
+            count += c
+        else:
+            codes.append(count + c)
+            count = ''
+    return codes
@@ -6,18 +6,31 @@ class DriveEncoders:
         from the encoders mounted on the drive motors
     """
 
-    def __init__(self, motor, isReversed = False):
-        """:type motor: wpilib.CANTalon()"""
+    def __init__(self, motor, isReversed = False, position = None):
+        """
+            :type motor: wpilib.CANTalon()
+            :param position: Function that returns the raw encoder position.
+                             Defaults to reading it from the motor.
+        """
 
         self.motor = motor
         if(isReversed):
             self.mod = -1
         else:
             self.mod = 1
-        self.initialValue = self.mod * self.motor.getAnalogInPosition()
+
+        if position is None:
+            position = self.motor.getAnalogInPosition
+        self.position = position
+
+        self.initialValue = self.mod * self.position()
+
+    def get_total(self):
+        """Position that isn't affected by zero(), for things that track changes over time"""
+        return self.mod * self.position()
 
     def get(self):
-        return (self.mod * self.motor.getAnalogInPosition()) - self.initialValue
+        return (self.mod * self.position()) - self.initialValue
 
     def zero(self):
-        self.initialValue = self.mod * self.motor.getAnalogInPosition()
\ No newline at end of file
+        self.initialValue = self.mod * self.position()
@@ -0,0 +1,145 @@
+import json
+import os
+
+import wpilib
+
+#: Every loop while the button is down
+HELD = 'held'
+#: Once, when the button goes down
+PRESSED = 'pressed'
+#: Once, when the button comes back up
+RELEASED = 'released'
+#: Every loop from one press until the next
+TOGGLED = 'toggled'
+#: When the button goes down, and then once every period while it's held,
+#: like robotpy_ext's ButtonDebouncer
+DEBOUNCED = 'debounced'
+
+MODES = (HELD, PRESSED, RELEASED, TOGGLED, DEBOUNCED)
+
+
+class Binding:
+
+    __slots__ = ('stick', 'bit', 'mode', 'action', 'when', 'group', 'period', 'on', 'last')
+
+    def __init__(self, stick, button, mode, action, when=None, group=None, period=.5):
+        self.stick = stick
+        self.bit = 1 << (button - 1)
+        self.mode = mode
+        self.action = action
+        self.when = when
+        self.group = group
+        self.period = period
+
+        # TOGGLED state, and when DEBOUNCED last fired
+        self.on = False
+        self.last = float('-inf')
+
+
+class InputBindings:
+    """
+        Runs actions when joystick buttons are used, from a table of
+        bindings instead of a chain of ifs.
+
+        Each loop, update() reads all of the buttons on each joystick with
+        one call, works out which went down or up since the last loop, and
+        runs the bindings in table order. Only the first binding to fire in
+        a group runs each loop, like an if/elif chain.
+
+        A binding is a dict, so the table can be loaded from JSON::
+
+            {"stick": 0, "button": 1, "mode": "debounced", "action": "switch_direction",
+             "when": "no_fms", "group": "arm", "period": 0.5}
+
+        stick is the joystick's index in the joysticks passed in, and
+        action and when are names from the actions and conditions passed in.
+        Only stick, button, mode and action are needed.
+    """
+
+    def __init__(self, joysticks, table, actions, conditions=None):
+        """
+            :param joysticks: The joysticks that sticks refer to
+            :param table: List of bindings
+            :param actions: Action name to a function that takes no arguments
+            :param conditions: Condition name to a function that returns
+                               whether bindings with that condition can fire
+        """
+        conditions = conditions or {}
+
+        self.ds = wpilib.DriverStation.getInstance()
+        self.ports = [stick.port for stick in joysticks]
+        self.buttons = [0] * len(joysticks)
+        self.previous = [0] * len(joysticks)
+        self.fired = set()
+
+        self.bindings = []
+        for spec in table:
+            if spec['mode'] not in MODES:
+                raise ValueError("Unknown binding mode %s" % spec['mode'])
+            if spec['action'] not in actions:
+                raise ValueError("Unknown binding action %s" % spec['action'])
+            if not 0 <= spec['stick'] < len(joysticks):
+                raise ValueError("No joystick %s for %s" % (spec['stick'], spec['action']))
+
+            when = spec.get('when')
+            if when is not None:
+                if when not in conditions:
+                    raise ValueError("Unknown binding condition %s" % when)
+                when = conditions[when]
+
+            self.bindings.append(Binding(spec['stick'], spec['button'], spec['mode'], actions[spec['action']],
+                                         when, spec.get('group'), spec.get('period', .5)))
+
+    def update(self):
+        """Called once per loop"""
+        buttons = self.buttons
+        previous = self.previous
+        for i, port in enumerate(self.ports):
+            previous[i] = buttons[i]
+            buttons[i] = self.ds.getStickButtons(port).buttons
+
+        fired = self.fired
+        fired.clear()
+        now = None
+
+        for binding in self.bindings:
+            group = binding.group
+            if group is not None and group in fired:
+                continue
+
+            bit = binding.bit
+            down = buttons[binding.stick] & bit
+            was_down = previous[binding.stick] & bit
+            mode = binding.mode
+
+            if mode == HELD:
+                active = down
+            elif mode == PRESSED:
+                active = down and not was_down
+            elif mode == RELEASED:
+                active = was_down and not down
+            elif mode == TOGGLED:
+                if down and not was_down:
+                    binding.on = not binding.on
+                active = binding.on
+            else:
+                active = False
+                if down:
+                    if now is None:
+                        now = wpilib.Timer.getFPGATimestamp()
+                    if now - binding.last > binding.period:
+                        binding.last = now
+                        active = True
+
+            if active and (binding.when is None or binding.when()):
+                binding.action()
+                if group is not None:
+                    fired.add(group)
+
+
+def load(path, default):
+    """:returns: The bindings in the JSON file at path if there is one, otherwise default"""
+    if not os.path.exists(path):
+        return default
+    with open(path) as fp:
+        return json.load(fp)
@@ -0,0 +1,154 @@
+import collections
+import math
+import time
+
+
+class Histogram:
+    """
+        Counts durations in buckets that get 10% wider each time, from 10us
+        to a second, so percentiles are good to about 10% and adding a
+        sample is cheap no matter how many there are.
+    """
+
+    smallest = 1e-5
+    largest = 1.0
+    growth = 1.1
+
+    def __init__(self):
+        self.log_growth = math.log(self.growth)
+        # Bucket i holds durations up to smallest * growth**i
+        self.buckets = [0] * (int(math.log(self.largest / self.smallest) / self.log_growth) + 2)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.buckets)):
+            self.buckets[i] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, duration):
+        if duration <= self.smallest:
+            i = 0
+        else:
+            i = min(int(math.log(duration / self.smallest) / self.log_growth) + 1, len(self.buckets) - 1)
+
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, p):
+        """
+            :param p: 0 to 100
+            :returns: The duration that p percent of the samples were at or under
+        """
+        if self.count == 0:
+            return 0
+
+        needed = self.count * p / 100
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= needed:
+                return min(self.smallest * self.growth ** i, self.max)
+        return self.max
+
+
+class LoopTimer:
+    """
+        Times the parts of each control loop with a monotonic clock, and
+        keeps a histogram for each part and for the whole loop. Loops that
+        take longer than the budget are counted as overruns.
+
+        The p50/p99/max of each part goes to the SmartDashboard under Loop/
+        once per publish_period, and summary() has all of it for printing.
+    """
+
+    publish_period = 1
+
+    def __init__(self, budget, telemetry=None):
+        """
+            :param budget: Seconds each loop has, control_loop_wait_time
+            :type telemetry: common.telemetry.Telemetry
+        """
+        self.budget = budget
+        self.telemetry = telemetry
+        self.clock = time.monotonic
+
+        self.histograms = collections.OrderedDict()
+        self.loop = Histogram()
+        self.period = Histogram()
+
+        self.loop_time = 0
+        self.overruns = 0
+        self.last_tick = None
+        self.next_publish = 0
+
+    def start(self):
+        """:returns: A start time for stop()"""
+        return self.clock()
+
+    def stop(self, name, start):
+        """Adds the time since start to name's histogram, and to this loop's total"""
+        duration = self.clock() - start
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(duration)
+
+        self.loop_time += duration
+
+    def tick(self):
+        """Called once at the end of each loop"""
+        now = self.clock()
+
+        self.loop.add(self.loop_time)
+        if self.loop_time > self.budget:
+            self.overruns += 1
+        self.loop_time = 0
+
+        if self.last_tick is not None:
+            self.period.add(now - self.last_tick)
+        self.last_tick = now
+
+        if self.telemetry is not None and now >= self.next_publish:
+            self.next_publish = now + self.publish_period
+            self.publish()
+
+    def reset(self):
+        """Starts over, at the beginning of each mode"""
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.loop.reset()
+        self.period.reset()
+        self.loop_time = 0
+        self.overruns = 0
+        self.last_tick = None
+
+    def publish(self):
+        put = self.telemetry.put
+        for name, histogram in self._all():
+            put('Loop/%s p50' % name, round(histogram.percentile(50) * 1000, 2))
+            put('Loop/%s p99' % name, round(histogram.percentile(99) * 1000, 2))
+            put('Loop/%s max' % name, round(histogram.max * 1000, 2))
+        put('Loop/Overruns', self.overruns)
+
+    def summary(self):
+        """:returns: A table of everything, in milliseconds"""
+        lines = ['%-16s %8s %8s %8s %8s' % ('', 'count', 'p50', 'p99', 'max')]
+        for name, histogram in self._all():
+            lines.append('%-16s %8d %8.2f %8.2f %8.2f' % (name, histogram.count,
+                                                          histogram.percentile(50) * 1000,
+                                                          histogram.percentile(99) * 1000,
+                                                          histogram.max * 1000))
+        lines.append('%d of %d loops went over %.0fms' % (self.overruns, self.loop.count, self.budget * 1000))
+        return '\n'.join(lines)
+
+    def _all(self):
+        for item in self.histograms.items():
+            yield item
+        yield 'loop', self.loop
+        yield 'period', self.period
@@ -0,0 +1,75 @@
+import collections
+
+import wpilib
+
+
+class Mailbox:
+    """
+        Hands (timestamp, key, value) messages from one other thread, like
+        a NetworkTables listener, to the control loop, which drains them
+        once per loop. deque's append and popleft are atomic, so neither
+        side ever takes a lock or waits on the other.
+
+        If the control loop stops draining it, the oldest messages are
+        dropped.
+    """
+
+    def __init__(self, size=64):
+        self.queue = collections.deque(maxlen=size)
+
+    def post(self, key, value):
+        """Called from the other thread"""
+        self.queue.append((wpilib.Timer.getFPGATimestamp(), key, value))
+
+    def on_nt_change(self, source, key, value, isNew):
+        """Pass this to NetworkTable.addTableListener"""
+        self.post(key, value)
+
+    def drain(self):
+        """Yields the messages that came in since the last drain, oldest first"""
+        queue = self.queue
+        while queue:
+            yield queue.popleft()
+
+    def clear(self):
+        self.queue.clear()
+
+
+class DashboardInputs:
+    """
+        The values of the SmartDashboard keys the robot code reads, kept
+        up to date by a NetworkTables listener through a :class:`Mailbox`.
+        The control loop calls update() at the start of each loop, and
+        get() is then just a dict lookup.
+    """
+
+    def __init__(self, table):
+        """:type table: NetworkTable"""
+        self.table = table
+        self.mailbox = Mailbox()
+        self.values = {}
+        self.handlers = {}
+
+    def watch(self, key, default, on_change=None):
+        """
+            Starts following a key. Its current value is looked up right
+            away, so do this at startup, not in the loop.
+
+            :param on_change: Called with the new value, by update(), each
+                              time the key changes
+        """
+        self.values[key] = self.table.getValue(key, default)
+        if on_change is not None:
+            self.handlers[key] = on_change
+        self.table.addTableListener(self.mailbox.on_nt_change, False, key)
+
+    def update(self):
+        """Takes in the changes since the last loop"""
+        for _, key, value in self.mailbox.drain():
+            self.values[key] = value
+            handler = self.handlers.get(key)
+            if handler is not None:
+                handler(value)
+
+    def get(self, key):
+        return self.values[key]
@@ -0,0 +1,260 @@
+import mmap
+import os
+import shutil
+import struct
+import time
+
+import wpilib
+
+from . import dataLogger
+
+MODES = {
+    'disabled': 0,
+    'autonomous': 1,
+    'teleop': 2,
+}
+
+JOYSTICK_AXES = 4
+
+#: Motor outputs that get recorded, by their attribute name on MyRobot
+OUTPUTS = ('lf_motor', 'lr_motor', 'rf_motor', 'rr_motor', 'leftArm', 'rightArm',
+           'leftBall', 'winchMotor', 'kickMotor')
+
+#: StateMachine components whose state gets recorded, by attribute name on MyRobot
+STATE_MACHINES = ('shootBall', 'targetGoal', 'lightSwitch')
+
+#: Longest state name that fits in the log
+STATE_LENGTH = 24
+
+EXTENSION = '.matchlog'
+
+
+def _fields(joystick_count):
+    fields = [('timestamp', 'd'), ('mode', 'B')]
+
+    for stick in range(joystick_count):
+        for axis in range(JOYSTICK_AXES):
+            fields.append(('joystick%d_axis%d' % (stick, axis), 'f'))
+        fields.append(('joystick%d_buttons' % stick, 'H'))
+
+    fields += [
+        ('yaw', 'f'),
+        ('yaw_rate', 'f'),
+        ('lf_drive', 'd'),
+        ('rf_drive', 'd'),
+        ('arm_position', 'd'),
+        ('arm_velocity', 'f'),
+        ('arm_analog', 'd'),
+        ('arm_fwd_limit', '?'),
+        ('arm_rev_limit', '?'),
+        ('ultrasonic', 'f'),
+        ('back_distance', 'f'),
+    ]
+
+    for name in OUTPUTS:
+        fields.append((name, 'f'))
+    fields.append(('arm_control_mode', 'B'))
+
+    state = '%ds' % STATE_LENGTH
+    fields.append(('autonomous_state', state))
+    for name in STATE_MACHINES:
+        fields.append((name + '_state', state))
+
+    return fields
+
+
+def autonomous_state(mode):
+    """:returns: The name of the state a StatefulAutonomous mode is in, or ''"""
+    # StatefulAutonomous keeps this to itself
+    state = getattr(mode, '_StatefulAutonomous__state', None)
+    return state.name if state is not None else ''
+
+
+def default_directory():
+    """
+        Where logs go: /home/lvuser/logs on the robot, robot/logs in
+        simulation, and nowhere when running the unit tests (deploy runs
+        them too, as 'upload')
+    """
+    if wpilib.RobotBase.isSimulation():
+        from pyfrc import config
+        if config.mode in ('test', 'upload'):
+            return None
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+    return '/home/lvuser/logs'
+
+
+def remove_old_logs(directory, max_total_size, max_files):
+    """
+        Deletes the oldest logs until what's left is within both limits
+
+        :param max_total_size: In bytes
+
+        :returns: Names of the logs that were deleted
+    """
+    logs = []
+    for name in os.listdir(directory):
+        if name.endswith(EXTENSION):
+            path = os.path.join(directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            logs.append((st.st_mtime, name, st.st_size))
+
+    # Oldest first
+    logs.sort()
+    total = sum(size for _, _, size in logs)
+
+    removed = []
+    while logs and (total > max_total_size or len(logs) > max_files):
+        _, name, size = logs.pop(0)
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+        total -= size
+        removed.append(name)
+
+    return removed
+
+
+class MatchRecorder:
+    """
+        Records every enabled loop's inputs (joysticks and the sensor
+        snapshot), outputs (motor values) and the state of the autonomous
+        mode and each StateMachine, so a match can be replayed later with
+        sim.replay or analyzed with dataLogger.load.
+
+        Records go through a :class:`.DataLogger`, so the loop never waits
+        on the disk. Read them back with :class:`MatchLog`.
+    """
+
+    #: A log is ~230 bytes a loop, under 2 MB for a match. When a new log
+    #: is started, the oldest ones are deleted to keep under both of these.
+    #: The roboRIO's flash is small, and deploys fail when it's full.
+    max_total_size = 20 * 1024 * 1024
+    max_files = 20
+
+    #: A new log isn't started unless the disk has this much free
+    min_free_space = 50 * 1024 * 1024
+
+    def __init__(self, directory, joysticks, sensors, robot):
+        """
+            :param directory: Where to write logs, None to not record anything
+            :param joysticks: The joysticks, in port order
+            :type sensors: common.sensors.Sensors
+            :param robot: Has the motors named in OUTPUTS
+        """
+        self.directory = directory
+        self.joysticks = joysticks
+        self.sensors = sensors
+        self.ds = wpilib.DriverStation.getInstance()
+
+        self.fields = _fields(len(joysticks))
+
+        self.robot = robot
+        self.motors = [getattr(robot, name) for name in OUTPUTS]
+        self.arm = robot.leftArm
+        # The components don't exist yet, they're looked up in start()
+        self.state_machines = []
+
+        self.logger = None
+        self.mode = MODES['disabled']
+
+    def start(self, mode):
+        """Starts a new log file, for 'autonomous' or 'teleop'"""
+        self.stop()
+        if self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        removed = remove_old_logs(self.directory, self.max_total_size, self.max_files - 1)
+        if removed:
+            print("Deleted %d old match logs" % len(removed))
+
+        free = shutil.disk_usage(self.directory).free
+        if free < self.min_free_space:
+            print("Not recording a match log, only %.1f MB free" % (free / (1024 * 1024)))
+            return
+
+        name = '%s-%s%s' % (time.strftime('%Y%m%d-%H%M%S'), mode, EXTENSION)
+
+        self.mode = MODES[mode]
+        self.state_machines = [getattr(self.robot, name) for name in STATE_MACHINES]
+        self.logger = dataLogger.DataLogger(os.path.join(self.directory, name), self.fields, {'mode': mode})
+
+    def stop(self):
+        if self.logger is not None:
+            if self.logger.dropped:
+                print("Match log dropped %d records" % self.logger.dropped)
+            self.logger.close()
+            self.logger = None
+
+    def record(self):
+        """Called once per loop, after the components have run"""
+        if self.logger is None:
+            return
+
+        s = self.sensors.get()
+        values = [s.timestamp, self.mode]
+
+        for stick in self.joysticks:
+            for axis in range(JOYSTICK_AXES):
+                values.append(stick.getRawAxis(axis))
+            values.append(self.ds.getStickButtons(stick.port).buttons)
+
+        values += [s.yaw, s.yaw_rate, s.lf_drive, s.rf_drive,
+                   s.arm_position, s.arm_velocity, s.arm_analog,
+                   s.arm_fwd_limit, s.arm_rev_limit,
+                   s.ultrasonic, s.back_distance]
+
+        for motor in self.motors:
+            values.append(motor.last_output())
+        values.append(self.arm.getControlMode())
+
+        automodes = getattr(self.robot, '_automodes', None)
+        mode = automodes.active_mode if automodes is not None else None
+        values.append(autonomous_state(mode).encode())
+        for machine in self.state_machines:
+            values.append(machine.current_state.encode())
+
+        self.logger.log(*values)
+
+
+class MatchLog:
+    """
+        A recorded log, memory-mapped so that records are only read as
+        they're used. Records come back as dicts of field name to value.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as fp:
+            header, self.offset = dataLogger.read_header(fp)
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.fields = header['fields']
+        self.mode = header['mode']
+        self.record_struct = struct.Struct(header['format'])
+
+        # A partly written last record (robot lost power) is ignored
+        self.count = (len(self.map) - self.offset) // self.record_struct.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+
+        values = self.record_struct.unpack_from(self.map, self.offset + index * self.record_struct.size)
+        return dict(zip(self.fields, values))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self):
+        self.map.close()
@@ -0,0 +1,104 @@
+import math
+
+
+class TrapezoidalProfile:
+    """
+        A trapezoidal velocity profile: accelerate at a constant rate,
+        cruise, then decelerate to a stop right at the end. Short moves
+        that never reach cruise velocity become triangles.
+
+        Moves start from rest, unless they're given an initial velocity
+        (like when the target changes partway through another move). If
+        that's away from the target, or too fast to stop in time, the
+        profile stops first and then makes a move from rest from there.
+
+        All of the math is done in the constructor, so sample() is cheap
+        enough to call every loop.
+    """
+
+    def __init__(self, distance, max_velocity, max_acceleration, initial_velocity=0):
+        """
+            :param distance: Length of the move (may be negative)
+            :param max_velocity: Cruise velocity, in distance units per second
+            :param max_acceleration: In distance units per second squared
+            :param initial_velocity: Velocity at the start, in the same
+                                     direction as distance when positive
+        """
+        self.distance = distance
+        self.direction = d = -1 if distance < 0 else 1
+        self.initial_velocity = initial_velocity
+        self.max_acceleration = max_acceleration
+
+        distance = abs(distance)
+        # Initial velocity towards the target
+        u = initial_velocity * d
+
+        #: The move from rest that comes after stopping, if it has to stop first
+        self.after_stop = None
+        if u < 0 or u * u > 2 * max_acceleration * distance:
+            self.stop_time = abs(u) / max_acceleration
+            self.stop_distance = d * u * abs(u) / (2 * max_acceleration)
+            self.after_stop = TrapezoidalProfile(self.distance - self.stop_distance, max_velocity, max_acceleration)
+            self.total_time = self.stop_time + self.after_stop.total_time
+            return
+
+        # Up (or down) to cruise velocity, cruise, and back down to 0
+        accel_time = abs(max_velocity - u) / max_acceleration
+        accel_distance = (u + max_velocity) / 2 * accel_time
+        decel_distance = max_velocity ** 2 / (2 * max_acceleration)
+
+        if accel_distance + decel_distance > distance:
+            # Triangle profile, never gets up to cruise velocity
+            max_velocity = math.sqrt(max_acceleration * distance + u * u / 2)
+            accel_time = (max_velocity - u) / max_acceleration
+            accel_distance = (u + max_velocity) / 2 * accel_time
+            decel_distance = distance - accel_distance
+
+        if max_velocity > 0:
+            cruise_time = (distance - accel_distance - decel_distance) / max_velocity
+        else:
+            cruise_time = 0
+
+        self.max_velocity = max_velocity
+        self.accel_time = accel_time
+        self.accel_distance = accel_distance
+        # Negative when it starts out faster than cruise velocity
+        self.initial_acceleration = max_acceleration if max_velocity >= u else -max_acceleration
+        self.cruise_end = accel_time + cruise_time
+        self.decel_time = max_velocity / max_acceleration
+        self.total_time = self.cruise_end + self.decel_time
+
+    def sample(self, t):
+        """
+            :param t: Seconds since the start of the move
+            :returns: (position, velocity, acceleration) at that time
+        """
+        a = self.max_acceleration
+        d = self.direction
+
+        if self.after_stop is not None:
+            if t >= self.stop_time:
+                position, velocity, acceleration = self.after_stop.sample(t - self.stop_time)
+                return self.stop_distance + position, velocity, acceleration
+
+            # Slowing down to a stop
+            v = self.initial_velocity
+            if t <= 0:
+                return 0, v, 0
+            stopping = -a if v > 0 else a
+            return v * t + 0.5 * stopping * t * t, v + stopping * t, stopping
+
+        u = self.initial_velocity * d
+        if t <= 0:
+            return 0, d * u, 0
+        elif t < self.accel_time:
+            a0 = self.initial_acceleration
+            return d * (u * t + 0.5 * a0 * t * t), d * (u + a0 * t), d * a0
+        elif t < self.cruise_end:
+            v = self.max_velocity
+            return d * (self.accel_distance + v * (t - self.accel_time)), d * v, 0
+        elif t < self.total_time:
+            left = self.total_time - t
+            return self.distance - d * 0.5 * a * left * left, d * a * left, -d * a
+
+        return self.distance, 0, 0
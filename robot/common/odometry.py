@@ -0,0 +1,56 @@
+import math
+
+
+class Odometry:
+    """
+        Keeps track of where the robot is, by combining how far the drive
+        wheels have turned with the gyro heading each loop.
+
+        Positions are in inches: x is forward and y is to the right of
+        where the pose was last reset. The heading is in degrees,
+        clockwise positive like the navX.
+    """
+
+    def __init__(self, ticks_per_inch):
+        self.ticks_per_inch = ticks_per_inch
+
+        self.last_left = None
+        self.last_right = None
+        self.last_yaw = None
+
+        self.reset()
+
+    def reset(self, x=0, y=0, heading=0):
+        self.x = x
+        self.y = y
+        self.heading = heading
+
+    def yaw_reset(self):
+        """Call this when the gyro is zeroed, so the heading doesn't jump"""
+        self.last_yaw = 0
+
+    def update(self, left, right, yaw):
+        """
+            :param left: Left encoder ticks. This must keep counting, don't
+                         pass in a value that gets zeroed.
+            :param right: Right encoder ticks
+            :param yaw: Gyro yaw, in degrees
+        """
+        if self.last_yaw is None or self.last_left is None:
+            self.last_left = left
+            self.last_right = right
+            self.last_yaw = yaw
+            return
+
+        distance = ((left - self.last_left) + (right - self.last_right)) / (2 * self.ticks_per_inch)
+        turn = (yaw - self.last_yaw + 180) % 360 - 180
+
+        # Assume we drove along an arc, so use the heading halfway through it
+        heading = math.radians(self.heading + turn / 2)
+        self.x += distance * math.cos(heading)
+        self.y += distance * math.sin(heading)
+        self.heading = (self.heading + turn + 180) % 360 - 180
+
+        self.last_left = left
+        self.last_right = right
+        self.last_yaw = yaw
@@ -0,0 +1,131 @@
+import wpilib
+
+#: Join once every branch is done
+ALL = 'all'
+#: Join as soon as any branch is done
+ANY = 'any'
+
+
+class _Branch:
+
+    __slots__ = ('name', 'function', 'start_when', 'timeout', 'started', 'done')
+
+    def __init__(self, name, function, start_when, timeout):
+        self.name = name
+        self.function = function
+        self.start_when = start_when
+        self.timeout = timeout
+
+        self.started = None
+        self.done = False
+
+
+class Parallel:
+    """
+        Runs several branches at the same time inside one autonomous state,
+        so that (say) the arm moves while the robot drives, instead of one
+        state waiting for the other::
+
+            self.to_bar = parallel.Parallel() \\
+                .add('arm', self._lower_arm, timeout=1) \\
+                .add('drive', self._drive_forward)
+
+            @state(first=True)
+            def drive_forward(self, initial_call):
+                if self.to_bar.run(initial_call):
+                    self.next_state('rotate')
+
+        A branch is a function that takes initial_call, like a state does,
+        and returns True once it's done. Each loop, run() calls the branches
+        that have started and aren't done, in the order they were added.
+        A done branch isn't called again, but whatever it last told its
+        component to do (like the arm's target) still stands.
+    """
+
+    def __init__(self, join=ALL):
+        """
+            :param join: ALL, ANY, or the name of the branch (or a tuple of
+                         names) that has to be done for run() to return True
+        """
+        if isinstance(join, str) and join not in (ALL, ANY):
+            join = (join,)
+        self.join = join
+        self.branches = []
+        self.start_time = None
+
+    def add(self, name, function, start_when=None, timeout=None):
+        """
+            :param function: Called with initial_call, returns True when done
+            :param start_when: Called with the seconds since the Parallel
+                               started, the branch waits until it returns True
+            :param timeout: Seconds after it starts that the branch counts as
+                            done anyway, like a timed_state
+            :returns: self, so adds can be chained
+        """
+        if self.find(name) is not None:
+            raise ValueError("There's already a branch called %s" % name)
+        self.branches.append(_Branch(name, function, start_when, timeout))
+        return self
+
+    def find(self, name):
+        for branch in self.branches:
+            if branch.name == name:
+                return branch
+        return None
+
+    def reset(self):
+        """Starts over, the next run() starts the branches again"""
+        self.start_time = None
+        for branch in self.branches:
+            branch.started = None
+            branch.done = False
+
+    def run(self, initial_call=False):
+        """
+            Called once per loop from the state.
+
+            :param initial_call: Starts over when True, so pass the state's
+            :returns: Whether the branches have joined
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        if initial_call or self.start_time is None:
+            self.reset()
+            self.start_time = now
+
+        for branch in self.branches:
+            if branch.done:
+                continue
+
+            first = branch.started is None
+            if first:
+                if branch.start_when is not None and not branch.start_when(now - self.start_time):
+                    continue
+                branch.started = now
+
+            if branch.function(first) or \
+                    (branch.timeout is not None and now - branch.started >= branch.timeout):
+                branch.done = True
+
+        return self.joined()
+
+    def joined(self):
+        if self.join == ALL:
+            return all(branch.done for branch in self.branches)
+        elif self.join == ANY:
+            return any(branch.done for branch in self.branches)
+        return all(self.is_done(name) for name in self.join)
+
+    def is_done(self, name):
+        branch = self.find(name)
+        if branch is None:
+            raise ValueError("No branch called %s" % name)
+        return branch.done
+
+    def elapsed(self, name):
+        """:returns: Seconds since the branch started, None if it hasn't"""
+        branch = self.find(name)
+        if branch is None:
+            raise ValueError("No branch called %s" % name)
+        if branch.started is None:
+            return None
+        return wpilib.Timer.getFPGATimestamp() - branch.started
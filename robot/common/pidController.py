@@ -0,0 +1,147 @@
+class PIDController:
+    """
+        A PID controller that runs in our own loop, for things the Talons
+        can't close the loop on (like the drive heading).
+
+        - The integral is clamped, and stops accumulating while the output
+          is saturated in the same direction, so it can't wind up
+        - The derivative is low-pass filtered, and can come straight from a
+          rate sensor instead of differentiating the error
+        - The output is clamped, and slew rate limited
+        - on_target() only returns True once the error *and* the rate have
+          stayed inside their tolerances for hold_time, and the time it
+          took to get there is kept in settle_time
+    """
+
+    def __init__(self, P, I=0, D=0,
+                 output_limit=1,
+                 integral_limit=None,
+                 derivative_filter=.5,
+                 slew_rate=None,
+                 tolerance=0,
+                 rate_tolerance=None,
+                 hold_time=0,
+                 continuous=None,
+                 reset_after=.25):
+        """
+            :param output_limit: Output is clamped to +/- this
+            :param integral_limit: Maximum contribution of the I term to the output
+            :param derivative_filter: Low pass filter constant for the D term, 1 means no filtering
+            :param slew_rate: Maximum change in output per second, None for no limit
+            :param tolerance: Error must be within this to be on target
+            :param rate_tolerance: Rate must be within this to be on target, None to ignore it
+            :param hold_time: Seconds it must stay in tolerance to be on target
+            :param continuous: If the input wraps around (like a heading in
+                               degrees), the size of one full turn
+            :param reset_after: Start over if update() isn't called for this many seconds
+        """
+        self.P = P
+        self.I = I
+        self.D = D
+
+        self.output_limit = output_limit
+        self.integral_limit = integral_limit
+        self.derivative_filter = derivative_filter
+        self.slew_rate = slew_rate
+
+        self.tolerance = tolerance
+        self.rate_tolerance = rate_tolerance
+        self.hold_time = hold_time
+
+        self.continuous = continuous
+        self.reset_after = reset_after
+
+        self.setpoint = None
+        self.reset()
+
+    def set_gains(self, P, I, D):
+        self.P = P
+        self.I = I
+        self.D = D
+
+    def reset(self):
+        """Forgets everything, the next update() starts a new move"""
+        self.integral = 0
+        self.derivative = 0
+        self.output = 0
+        self.last_error = None
+        self.last_time = None
+
+        # When it last came into tolerance, None while it's out
+        self.settled_since = None
+        self.start_time = None
+        #: Seconds from the start of the move until it was first on target
+        self.settle_time = None
+
+    def on_target(self):
+        return self.settled_since is not None and \
+            self.last_time - self.settled_since >= self.hold_time
+
+    def update(self, setpoint, measurement, now, rate=None):
+        """
+            :param setpoint: Where we want to be
+            :param measurement: Where we are
+            :param now: Current time, in seconds
+            :param rate: Rate of change of the measurement, if a sensor
+                         provides it. Used for the D term and the settle check.
+            :returns: Controller output
+        """
+        if self.last_time is not None and now - self.last_time > self.reset_after:
+            self.reset()
+
+        # A real change in setpoint is a new move. Small changes (like a
+        # camera refining its estimate) aren't.
+        if self.setpoint is None or abs(setpoint - self.setpoint) > self.tolerance:
+            self.reset()
+        self.setpoint = setpoint
+
+        if self.start_time is None:
+            self.start_time = now
+
+        error = setpoint - measurement
+        if self.continuous is not None:
+            half = self.continuous / 2
+            error = (error + half) % self.continuous - half
+
+        dt = 0 if self.last_time is None else now - self.last_time
+
+        if dt > 0:
+            # Only integrate when it would not push a saturated output further
+            saturated = abs(self.output) >= self.output_limit and (error > 0) == (self.output > 0)
+            if self.I and not saturated:
+                self.integral += error * dt
+                if self.integral_limit is not None:
+                    limit = abs(self.integral_limit / self.I)
+                    self.integral = max(min(limit, self.integral), -limit)
+
+            if rate is not None:
+                raw_derivative = -rate
+            else:
+                raw_derivative = (error - self.last_error) / dt
+            self.derivative += self.derivative_filter * (raw_derivative - self.derivative)
+
+        output = self.P * error + self.I * self.integral + self.D * self.derivative
+        output = max(min(self.output_limit, output), -self.output_limit)
+
+        # A new move starts from rest too, so the first update can't jump
+        if self.slew_rate is not None:
+            step = self.slew_rate * dt
+            output = max(min(self.output + step, output), self.output - step)
+
+        self.output = output
+        self.last_error = error
+        self.last_time = now
+
+        # Settle detection
+        if rate is None:
+            rate = -self.derivative
+        if abs(error) <= self.tolerance and \
+           (self.rate_tolerance is None or abs(rate) <= self.rate_tolerance):
+            if self.settled_since is None:
+                self.settled_since = now
+            if self.settle_time is None and self.on_target():
+                self.settle_time = now - self.start_time
+        else:
+            self.settled_since = None
+
+        return output
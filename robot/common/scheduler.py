@@ -0,0 +1,145 @@
+import time
+
+import hal
+import wpilib
+
+#: Always runs, like anything that sets motor outputs
+CRITICAL = 0
+#: Deferred to the next tick when this one is already past its deadline
+NORMAL = 1
+#: Deferred when it would take this tick past its deadline, like telemetry
+LOW = 2
+
+
+class _Task:
+
+    __slots__ = ('name', 'function', 'every', 'offset', 'priority', 'cost', 'pending', 'shed')
+
+    def __init__(self, name, function, every, offset, priority):
+        self.name = name
+        self.function = function
+        self.every = every
+        self.offset = offset
+        self.priority = priority
+
+        # How long it usually takes
+        self.cost = 0
+        # Was due, but got deferred
+        self.pending = False
+        self.shed = 0
+
+
+class Scheduler:
+    """
+        Runs the control loop at a fixed rate, with tasks that can each run
+        at their own slower rate.
+
+        Ticks are at exact multiples of the period from start(), so the
+        time the loop takes doesn't add up into drift. When a tick runs so
+        long that it misses the next ones, they're skipped and counted
+        rather than run back to back to catch up.
+
+        Tasks that aren't CRITICAL are shed when a tick is running out of
+        time: they're deferred to the next tick that has room for them, and
+        counted, so motor outputs still go out on time.
+
+        Usage::
+
+            scheduler.start()
+            while enabled:
+                scheduler.run_tick()
+                scheduler.wait()
+    """
+
+    def __init__(self, period):
+        """:param period: Seconds between ticks"""
+        self.period = period
+
+        # Like PreciseDelay: in the simulator, time is whatever wpilib says it is
+        if hal.HALIsSimulation():
+            self.now = wpilib.Timer.getFPGATimestamp
+            self.sleep = wpilib.Timer.delay
+        else:
+            self.now = time.monotonic
+            self.sleep = time.sleep
+
+        self.tasks = []
+        self.slow_tasks = 0
+
+        self.ticks = 0
+        self.missed = 0
+        self.shed = 0
+        self.next_time = 0
+
+    def add(self, name, function, rate=None, priority=CRITICAL):
+        """
+            Adds a task. Tasks run in the order they're added, so add the
+            ones that set motor outputs first.
+
+            :param rate: Times per second to run it, None for every tick
+            :param priority: CRITICAL, NORMAL or LOW
+        """
+        every = max(1, int(round(1 / (rate * self.period)))) if rate else 1
+
+        # Spread the slow tasks out, so they don't all land on the same tick
+        offset = 0
+        if every > 1:
+            offset = self.slow_tasks % every
+            self.slow_tasks += 1
+
+        self.tasks.append(_Task(name, function, every, offset, priority))
+
+    def start(self):
+        """Called when the loop starts, the first tick is now"""
+        self.ticks = 0
+        self.next_time = self.now()
+
+    def run_tick(self):
+        """Runs the tasks that are due this tick, as long as there's time"""
+        ticks = self.ticks
+        now = self.now
+        deadline = self.next_time + self.period
+
+        for task in self.tasks:
+            if not task.pending and (ticks + task.offset) % task.every:
+                continue
+
+            if task.priority == CRITICAL:
+                task.function()
+                continue
+
+            # A LOW task that was already put off only waits for a tick
+            # that isn't late, so it can't be put off forever
+            start = now()
+            needed = task.cost if task.priority == LOW and not task.pending else 0
+            if start + needed > deadline:
+                task.pending = True
+                task.shed += 1
+                self.shed += 1
+                continue
+
+            task.pending = False
+            task.function()
+            task.cost += (now() - start - task.cost) * .2
+
+        self.ticks = ticks + 1
+
+    def shed_counts(self):
+        """:returns: {task name: times it was deferred}, for the tasks that were"""
+        return {task.name: task.shed for task in self.tasks if task.shed}
+
+    def wait(self):
+        """Sleeps until the next tick"""
+        self.next_time += self.period
+        late = self.now() - self.next_time
+
+        if late < 0:
+            self.sleep(-late)
+        else:
+            # Skip the ticks that have already gone by. Slow tasks still
+            # count them, so they keep their rate in real time.
+            skipped = int(late / self.period)
+            if skipped:
+                self.missed += skipped
+                self.ticks += skipped
+                self.next_time += skipped * self.period
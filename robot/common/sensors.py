@@ -0,0 +1,184 @@
+import wpilib
+
+
+class SensorSnapshot:
+    """Every sensor value the robot code uses, all read at the same time"""
+
+    __slots__ = (
+        'timestamp',
+        'yaw',
+        'yaw_rate',
+        'lf_drive',
+        'rf_drive',
+        'arm_position',
+        'arm_velocity',
+        'arm_analog',
+        'arm_fwd_limit',
+        'arm_rev_limit',
+        'ultrasonic',
+        'back_distance',
+    )
+
+
+class Sensors:
+    """
+        Reads each sensor once per control loop. The first time anything
+        asks for the snapshot in a loop, all of the sensors are read into
+        a :class:`SensorSnapshot`, and everyone else in that loop gets the
+        same values without going back out to the CAN bus or SPI.
+    """
+
+    #: Number of yaw samples kept, a bit over a second of loops
+    yaw_history_size = 64
+
+    #: The yaw rate is worked out over at least this many seconds of yaw
+    #: history. The navX only updates at 60Hz, so the change over a single
+    #: loop is mostly noise.
+    yaw_rate_window = .05
+
+    def __init__(self, navX, lf_motor, rf_motor, arm_motor, ultrasonic, back_sensor):
+        """
+            :type navX: navx.AHRS
+            :type lf_motor: wpilib.CANTalon
+            :type rf_motor: wpilib.CANTalon
+            :type arm_motor: wpilib.CANTalon
+            :type ultrasonic: wpilib.AnalogInput
+            :type back_sensor: distance_sensors.SharpIRGP2Y0A41SK0F
+        """
+        self.navX = navX
+        self.lf_motor = lf_motor
+        self.rf_motor = rf_motor
+        self.arm_motor = arm_motor
+        self.ultrasonic = ultrasonic
+        self.back_sensor = back_sensor
+
+        # The most recent snapshot. Other threads should only ever look at
+        # this, never call get()
+        self.latest = None
+        self.fresh = False
+
+        # When set, snapshots come from here instead of the hardware
+        self.source = None
+
+        # Ring buffer of (timestamp, yaw), so that things like the camera
+        # can find out which way the robot was pointing a little while ago.
+        # Each slot is replaced with a whole tuple, so other threads never
+        # see half of a sample.
+        self.yaw_history = [None] * self.yaw_history_size
+        self.yaw_head = 0
+
+    def get(self):
+        """
+            :returns: This loop's sensor values
+            :rtype: SensorSnapshot
+        """
+        if not self.fresh:
+            self.latest = self._read() if self.source is None else self.source()
+            self._record_yaw(self.latest.timestamp, self.latest.yaw)
+            self.fresh = True
+        return self.latest
+
+    def next_tick(self):
+        """Called at the end of each loop, so the next get() reads the hardware again"""
+        self.fresh = False
+
+    def reader(self, name):
+        """Returns a function that returns one value from the current snapshot"""
+        get = self.get
+        return lambda: getattr(get(), name)
+
+    def reset_yaw(self):
+        """Zeroes the gyro, and the yaw in this loop's snapshot along with it"""
+        self.navX.reset()
+        # Old samples are from before the reset, and would be way off
+        self.yaw_history = [None] * self.yaw_history_size
+        self.yaw_head = 0
+        if self.latest is not None:
+            self.latest.yaw = 0
+            self._record_yaw(self.latest.timestamp, 0)
+
+    def yaw_at(self, t):
+        """
+            Safe to call from other threads.
+
+            :param t: FPGA timestamp, in seconds
+            :returns: What the yaw was at that time, interpolated between the
+                      samples on either side of it. Times older than the
+                      history get the oldest sample, newer ones the latest.
+        """
+        history = self.yaw_history
+        head = self.yaw_head
+        size = len(history)
+
+        newer = None
+        for i in range(1, size + 1):
+            sample = history[(head - i) % size]
+            # Ran out, or the main thread wrapped around on us
+            if sample is None or (newer is not None and sample[0] > newer[0]):
+                break
+
+            if sample[0] <= t:
+                if newer is None or newer[0] == sample[0]:
+                    return sample[1]
+
+                t0, yaw0 = sample
+                t1, yaw1 = newer
+                turn = (yaw1 - yaw0 + 180) % 360 - 180
+                yaw = yaw0 + turn * (t - t0) / (t1 - t0)
+                return (yaw + 180) % 360 - 180
+
+            newer = sample
+
+        if newer is not None:
+            return newer[1]
+        return self.latest.yaw if self.latest is not None else 0
+
+    def _yaw_rate(self, t, yaw):
+        """
+            :returns: How fast the yaw is changing, in degrees per second,
+                      from the newest sample at least yaw_rate_window old
+        """
+        history = self.yaw_history
+        head = self.yaw_head
+        size = len(history)
+
+        oldest = None
+        for i in range(1, size + 1):
+            sample = history[(head - i) % size]
+            if sample is None or (oldest is not None and sample[0] > oldest[0]):
+                break
+            oldest = sample
+            if t - sample[0] >= self.yaw_rate_window:
+                break
+
+        if oldest is None or t <= oldest[0]:
+            return 0
+        return ((yaw - oldest[1] + 180) % 360 - 180) / (t - oldest[0])
+
+    def _record_yaw(self, t, yaw):
+        head = self.yaw_head
+        self.yaw_history[head] = (t, yaw)
+        self.yaw_head = (head + 1) % len(self.yaw_history)
+
+    def _read(self):
+        s = SensorSnapshot()
+        s.timestamp = wpilib.Timer.getFPGATimestamp()
+
+        s.yaw = self.navX.getYaw()
+        # navX.getRate() is the change between the last two navX samples,
+        # not degrees per second like it says
+        s.yaw_rate = self._yaw_rate(s.timestamp, s.yaw)
+
+        s.lf_drive = self.lf_motor.getAnalogInPosition()
+        s.rf_drive = self.rf_motor.getAnalogInPosition()
+
+        arm = self.arm_motor
+        s.arm_position = arm.getEncPosition()
+        s.arm_velocity = arm.getEncVelocity()
+        s.arm_analog = arm.getAnalogInPosition()
+        s.arm_fwd_limit = arm.isFwdLimitSwitchClosed()
+        s.arm_rev_limit = arm.isRevLimitSwitchClosed()
+
+        s.ultrasonic = self.ultrasonic.getVoltage()
+        s.back_distance = self.back_sensor.getDistance()
+        return s
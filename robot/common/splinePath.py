@@ -0,0 +1,90 @@
+import bisect
+import math
+
+
+class SplinePath:
+    """
+        A smooth path between two poses, made from a cubic Hermite spline.
+        Poses are (x, y, heading), in the same frame as the drive odometry:
+        inches, x forward, y right, heading in degrees clockwise.
+
+        The spline is sampled into points with their distance along the
+        path when the path is created, so following it only needs lookups.
+    """
+
+    def __init__(self, start, end, spacing=2):
+        """
+            :param start: Pose the path starts at
+            :param end: Pose the path ends at
+            :param spacing: Rough distance between sampled points, in inches
+        """
+        x0, y0, h0 = start
+        x1, y1, h1 = end
+
+        # Tangents as long as the chord give a nicely rounded curve
+        chord = math.hypot(x1 - x0, y1 - y0)
+        mx0, my0 = chord * math.cos(math.radians(h0)), chord * math.sin(math.radians(h0))
+        mx1, my1 = chord * math.cos(math.radians(h1)), chord * math.sin(math.radians(h1))
+
+        count = max(int(chord / spacing), 2)
+        xs = []
+        ys = []
+        for i in range(count + 1):
+            t = i / count
+            t2 = t * t
+            t3 = t2 * t
+            h00 = 2 * t3 - 3 * t2 + 1
+            h10 = t3 - 2 * t2 + t
+            h01 = -2 * t3 + 3 * t2
+            h11 = t3 - t2
+            xs.append(h00 * x0 + h10 * mx0 + h01 * x1 + h11 * mx1)
+            ys.append(h00 * y0 + h10 * my0 + h01 * y1 + h11 * my1)
+
+        distances = [0]
+        for i in range(1, len(xs)):
+            distances.append(distances[-1] + math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1]))
+
+        self.xs = xs
+        self.ys = ys
+        self.distances = distances
+        self.length = distances[-1]
+        self.end = end
+
+    def closest(self, x, y, hint=0, window=15):
+        """
+            :param hint: Index to start looking from. Progress along the path
+                         only goes forward, so pass in the last result.
+            :returns: Index of the sampled point nearest to (x, y)
+        """
+        xs = self.xs
+        ys = self.ys
+        best = hint
+        best_distance = None
+
+        for i in range(hint, min(hint + window, len(xs))):
+            d = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+            if best_distance is None or d < best_distance:
+                best = i
+                best_distance = d
+
+        return best
+
+    def point_at(self, distance):
+        """
+            :returns: (x, y) at that distance along the path. Past the end,
+                      the path carries on in a straight line along the final
+                      heading, so the follower lines up with it as it arrives.
+        """
+        if distance >= self.length:
+            x, y, heading = self.end
+            extra = distance - self.length
+            return (x + extra * math.cos(math.radians(heading)),
+                    y + extra * math.sin(math.radians(heading)))
+
+        distances = self.distances
+        i = max(bisect.bisect_right(distances, distance), 1)
+        span = distances[i] - distances[i - 1]
+        f = (distance - distances[i - 1]) / span if span else 0
+
+        return (self.xs[i - 1] + f * (self.xs[i] - self.xs[i - 1]),
+                self.ys[i - 1] + f * (self.ys[i] - self.ys[i - 1]))
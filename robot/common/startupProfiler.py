@@ -0,0 +1,128 @@
+"""
+    Shows where the time goes while the robot code starts up. Run the
+    robot with ROBOT_PROFILE_STARTUP=1 in the environment, and when
+    robotInit is done it prints how long each module took to import and
+    how long each part of robotInit took.
+
+    Nothing is measured unless that's set.
+"""
+
+import os
+import sys
+import time
+
+#: The profiler, if this run is being profiled
+profiler = None
+
+
+class _TimedLoader:
+    """Wraps a module's loader, to time running the module's code"""
+
+    def __init__(self, loader, profiler, name):
+        self.loader = loader
+        self.profiler = profiler
+        self.name = name
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler._exec(self.name, self.loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class StartupProfiler:
+
+    def __init__(self):
+        self.clock = time.monotonic
+        self.started = self.clock()
+
+        # [name, seconds including the modules it imported, seconds in those]
+        self.imports = []
+        self.stack = []
+
+        self.sections = []
+        self.open_sections = {}
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        # Let the real finders find it, then time its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self, name)
+                return spec
+        return None
+
+    def _exec(self, name, loader, module):
+        record = [name, 0, 0]
+        self.stack.append(record)
+        start = self.clock()
+        try:
+            loader.exec_module(module)
+        finally:
+            record[1] = self.clock() - start
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][2] += record[1]
+            self.imports.append(record)
+
+    def begin(self, name):
+        self.open_sections[name] = self.clock()
+
+    def end(self, name):
+        self.sections.append((name, self.clock() - self.open_sections.pop(name)))
+
+    def report(self, count=25):
+        lines = ['Startup took %.3fs' % (self.clock() - self.started)]
+        for name, seconds in self.sections:
+            lines.append('  %-40s %8.1fms' % (name, seconds * 1000))
+
+        lines.append('Slowest imports (ms, by time in the module itself):')
+        lines.append('  %-40s %8s %8s' % ('', 'self', 'total'))
+        for name, total, children in sorted(self.imports, key=lambda r: r[2] - r[1])[:count]:
+            lines.append('  %-40s %8.1f %8.1f' % (name, (total - children) * 1000, total * 1000))
+
+        lines.append('%d modules imported, %.3fs in all' % (len(self.imports),
+                                                             sum(total - children for _, total, children in self.imports)))
+        return '\n'.join(lines)
+
+
+def start_if_requested():
+    """Call this before importing anything else"""
+    global profiler
+    if os.environ.get('ROBOT_PROFILE_STARTUP') and profiler is None:
+        profiler = StartupProfiler()
+        profiler.install()
+
+
+def begin(name):
+    """Starts timing part of startup"""
+    if profiler is not None:
+        profiler.begin(name)
+
+
+def end(name):
+    if profiler is not None:
+        profiler.end(name)
+
+
+def finish():
+    """Stops profiling, and prints the report"""
+    global profiler
+    if profiler is not None:
+        profiler.uninstall()
+        print(profiler.report())
+        profiler = None
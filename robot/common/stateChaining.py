@@ -0,0 +1,77 @@
+"""
+    Lets a state that only decides where to go next hand off to the next
+    state in the same loop, instead of costing a loop of its own.
+
+    Mark those states with :func:`instant`, on top of the state decorator::
+
+        class LowBar(stateChaining.ChainedAutonomous):
+
+            @stateChaining.instant
+            @state
+            def LowBarStart(self):
+                self.next_state('lower_arm')
+
+    When an instant state moves to another state, ChainedAutonomous (or
+    ChainedStateMachine, for automations) runs the next one straight away,
+    up to max_chain states per loop so states that keep moving to each
+    other can't hang the loop. Other states still take a loop each.
+
+    Components only act on what they've been told in their own execute(),
+    so an instant state can still set something that sticks, like the
+    arm's target. It just shouldn't command anything that has to be sent
+    every loop, like Drive.move(), since the next state's commands win.
+"""
+
+from magicbot import StateMachine
+from robotpy_ext.autonomous import StatefulAutonomous
+
+
+def instant(state):
+    """Marks a state that the next state can run right after, in the same loop"""
+    run = state.run
+
+    def instant_run(self, tm, state_tm, initial_call):
+        self._instant_state_ran = True
+        run(self, tm, state_tm, initial_call)
+
+    state.run = instant_run
+    state.instant = True
+    return state
+
+
+class ChainedAutonomous(StatefulAutonomous):
+    """A StatefulAutonomous that runs through instant states without waiting a loop"""
+
+    #: Most states that can run in one loop
+    max_chain = 8
+
+    def on_iteration(self, tm):
+        for _ in range(self.max_chain):
+            self._instant_state_ran = False
+            StatefulAutonomous.on_iteration(self, tm)
+
+            # Keep going if an instant state picked a state that hasn't run yet
+            state = self._StatefulAutonomous__state
+            if not self._instant_state_ran or state is None or state.ran:
+                break
+
+
+class ChainedStateMachine(StateMachine):
+    """A magicbot StateMachine that runs through instant states without waiting a loop"""
+
+    #: Most states that can run in one loop
+    max_chain = 8
+
+    def execute(self):
+        # execute() forgets that engage() was called this loop, so it has
+        # to be put back for the states after the first
+        should_engage = self._StateMachine__should_engage
+
+        for _ in range(self.max_chain):
+            self._instant_state_ran = False
+            StateMachine.execute(self)
+
+            state = self._StateMachine__state
+            if not self._instant_state_ran or state is None or state.ran:
+                break
+            self._StateMachine__should_engage = should_engage
@@ -0,0 +1,98 @@
+import wpilib
+
+_unset = object()
+
+# What _Channel.should_send() decides
+_SEND = 0
+_SKIP = 1
+#: Changed, but too soon after the last send
+_WAIT = 2
+
+
+class _Channel:
+    """Send state for a single SmartDashboard key"""
+
+    __slots__ = ('deadband', 'period', 'last', 'next_time')
+
+    def __init__(self, deadband, period):
+        self.deadband = deadband
+        self.period = period
+        self.last = _unset
+        self.next_time = 0
+
+    def should_send(self, value, now):
+        last = self.last
+        if last is not _unset:
+            if value == last:
+                return _SKIP
+            if self.deadband and abs(value - last) < self.deadband:
+                return _SKIP
+            if now < self.next_time:
+                return _WAIT
+
+        self.last = value
+        self.next_time = now + self.period
+        return _SEND
+
+
+class Telemetry:
+    """
+        Batches up the values that components want to show on the
+        SmartDashboard. Components register the keys they publish, call
+        put() as often as they like, and once per loop the robot calls
+        flush(), which only writes the values that changed.
+    """
+
+    def __init__(self, table):
+        """:type table: NetworkTable"""
+        self.table = table
+
+        self.channels = {}
+        self.pending = {}
+
+        # Lets us see how much NetworkTables traffic we're saving
+        self.sent = 0
+        self.suppressed = 0
+
+    def register(self, key, deadband=0, rate=None):
+        """
+            Registers a key. Keys that are never registered are sent every
+            time their value changes.
+
+            :param key: SmartDashboard key
+            :param deadband: Numeric values must change by at least this much to be resent
+            :param rate: Maximum number of updates per second, None for no limit
+        """
+        if key not in self.channels:
+            self.channels[key] = _Channel(deadband, 1.0 / rate if rate else 0)
+
+    def put(self, key, value):
+        """Queues a value to be sent on the next flush"""
+        self.pending[key] = value
+
+    def flush(self):
+        """Sends everything that changed since the last flush, as one batch"""
+        if not self.pending:
+            return
+
+        now = wpilib.Timer.getFPGATimestamp()
+        channels = self.channels
+        # Rate limited values are kept for a later flush, so the last
+        # value always gets there even if nothing is put after it
+        waiting = {}
+
+        for key, value in self.pending.items():
+            channel = channels.get(key)
+            if channel is None:
+                channel = channels[key] = _Channel(0, 0)
+
+            decision = channel.should_send(value, now)
+            if decision == _SEND:
+                self.table.putValue(key, value)
+                self.sent += 1
+            else:
+                self.suppressed += 1
+                if decision == _WAIT:
+                    waiting[key] = value
+
+        self.pending = waiting
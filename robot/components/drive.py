@@ -3,9 +3,11 @@ import wpilib
 from robotpy_ext.common_drivers import navx, distance_sensors
 from networktables import NetworkTable
 from networktables.util import ntproperty
-from common import driveEncoders
+from common import driveEncoders, mailbox, motionProfile, odometry, pidController, sensors, telemetry
 from . import winch
 import math
+import logging
+logger = logging.getLogger('drive')
 
 # Define constants. This way if we need to change something we don't have to change it 50 times.
 ENCODER_ROTATION = 1023
@@ -25,6 +27,8 @@ class Drive:
     sd = NetworkTable
     back_sensor = distance_sensors.SharpIRGP2Y0A41SK0F
     winch = winch.Winch
+    telemetry = telemetry.Telemetry
+    sensors = sensors.Sensors
 
     target_angle = ntproperty('/components/autoaim/target_angle', 0)
     enable_camera = ntproperty('/camera/enabled', False)
@@ -35,14 +39,60 @@ class Drive:
         self.sd = NetworkTable.getTable('/SmartDashboard')
         self.angle_P = self.sd.getAutoUpdateValue('Drive/Angle_P', .055)
         self.angle_I = self.sd.getAutoUpdateValue('Drive/Angle_I', 0)
+        self.angle_D = self.sd.getAutoUpdateValue('Drive/Angle_D', .002)
+        self.angle_settle_rate = self.sd.getAutoUpdateValue('Drive/Angle Settle Rate', 5)
+        self.angle_hold_time = self.sd.getAutoUpdateValue('Drive/Angle Hold Time', .04)
         self.drive_constant = self.sd.getAutoUpdateValue('Drive/Drive_Constant', .0001)
         self.rotate_max = self.sd.getAutoUpdateValue('Drive/Max Gyro Rotate Speed', .37)
+        # Seconds between the camera grabbing a frame and its result showing up
+        self.camera_latency = self.sd.getAutoUpdateValue('Drive/Camera Latency', .08)
+
+        # Motion profiled drive_distance. Velocities are in inches/second
+        self.profile_enabled = self.sd.getAutoUpdateValue('Drive/Profile Enabled', True)
+        self.profile_full_speed = self.sd.getAutoUpdateValue('Drive/Profile Full Speed', 60)
+        self.profile_max_accel = self.sd.getAutoUpdateValue('Drive/Profile Max Accel', 150)
+        self.profile_kA = self.sd.getAutoUpdateValue('Drive/Profile kA', .002)
+        self.profile_P = self.sd.getAutoUpdateValue('Drive/Profile P', .05)
+        self.profile_tolerance = self.sd.getAutoUpdateValue('Drive/Profile Tolerance', 3)
+        # Once the profile is over, P alone is too weak to overcome friction
+        # that close to the target, so the output never drops below this.
+        # If the robot still isn't there this long after, give up on it.
+        self.profile_min_output = self.sd.getAutoUpdateValue('Drive/Profile Min Output', .12)
+        self.profile_timeout = self.sd.getAutoUpdateValue('Drive/Profile Timeout', 1)
+
+        # Path following
+        self.path_lookahead = self.sd.getAutoUpdateValue('Drive/Path Lookahead', 18)
+        self.path_turn_P = self.sd.getAutoUpdateValue('Drive/Path Turn P', .02)
+
+        self.profiles = {}
+        self.active_profile = None
+        self.active_path = None
+
+        self.angle_pid = pidController.PIDController(self.angle_P.value,
+                                                     integral_limit=.2,
+                                                     slew_rate=3,
+                                                     tolerance=3,
+                                                     continuous=360)
+
+        self.odometry = odometry.Odometry(self._get_inches_to_ticks(1))
 
         self.enabled = False
         self.align_angle = None
+        # Camera results, from the NetworkTables thread
+        self.camera_mailbox = mailbox.Mailbox()
         self.align_print_timer = wpilib.Timer()
         self.align_print_timer.start()
 
+    def setup(self):
+        self.telemetry.register('Drive/NavX | Yaw', deadband=.5, rate=10)
+        self.telemetry.register('Drive/Encoder', rate=10)
+        self.telemetry.register('Drive/backCamera')
+        self.telemetry.register('Drive/Ultrasonic', deadband=.01, rate=5)
+        self.telemetry.register('Drive/Rotate Settle Time')
+        self.telemetry.register('Drive/Pose X', deadband=.5, rate=10)
+        self.telemetry.register('Drive/Pose Y', deadband=.5, rate=10)
+        self.telemetry.register('Drive/Pose Heading', deadband=.5, rate=10)
+
     def on_enable(self):
         """
             Constructor.
@@ -56,10 +106,10 @@ class Drive:
         # Hack for one-time initialization because magicbot doesn't support it
         if not self.enabled:
             nt = NetworkTable.getTable('components/autoaim')
-            nt.addTableListener(self._align_angle_updated, True, 'target_angle')
+            nt.addTableListener(self.camera_mailbox.on_nt_change, True, 'target_angle')
 
         self.isTheRobotBackwards = False
-        self.iErr = 0
+        self.angle_pid.reset()
         # set defaults here
         self.y = 0
         self.rotation = 0
@@ -98,10 +148,11 @@ class Drive:
         self.gyro_enabled = value
 
     def return_gyro_angle(self):
-        return self.navX.getYaw()
+        return self.sensors.get().yaw
 
     def reset_gyro_angle(self):
-        self.navX.reset()
+        self.sensors.reset_yaw()
+        self.odometry.yaw_reset()
 
     def set_angle_constant(self, constant):
         self.angle_constant = constant
@@ -109,7 +160,22 @@ class Drive:
     def reset_drive_encoders(self):
         self.lf_encoder.zero()
         self.rf_encoder.zero()
+        self.active_profile = None
+        self.active_path = None
+
 
+    def get_pose(self):
+        """
+            :returns: Where the robot is, as (x, y, heading). x is forward and y
+                      to the right in inches, heading is clockwise in degrees,
+                      all relative to the last reset_pose()
+        """
+        o = self.odometry
+        return o.x, o.y, o.heading
+
+    def reset_pose(self, x=0, y=0, heading=0):
+        """Sets where the robot currently is. Doesn't touch the encoders or the gyro."""
+        self.odometry.reset(x, y, heading)
 
     def return_drive_encoder_position(self):
         return self.lf_encoder.get()
@@ -121,9 +187,142 @@ class Drive:
         return target_position
 
     def drive_distance(self, inches, max_speed=.9):
+        if self.profile_enabled.value:
+            return self.profiled_drive(inches, max_speed)
 
         return self.encoder_drive(self._get_inches_to_ticks(inches), max_speed)
 
+    def _make_profile(self, inches, max_speed):
+        return motionProfile.TrapezoidalProfile(inches,
+                                                self.profile_full_speed.value * max_speed,
+                                                self.profile_max_accel.value)
+
+    def precompute_profiles(self, max_speed, *distances):
+        """
+            Works out the profiles for moves that autonomous is going to
+            make, so that it doesn't have to happen once the robot is moving.
+
+            :param max_speed: The max_speed that will be passed to drive_distance
+            :param distances: Distances in inches, starting from a reset encoder
+        """
+        for inches in distances:
+            self.profiles[(inches, max_speed)] = self._make_profile(inches, max_speed)
+
+    def profiled_drive(self, inches, max_speed):
+        """
+            Drives to a position (in inches from where the encoders were last
+            reset) following a trapezoidal motion profile, using velocity and
+            acceleration feedforward with a little P on the position error.
+
+            :returns: True once the profile is finished and the robot is at
+                      the target, or 'Drive/Profile Timeout' seconds after
+                      the profile finished if it never gets there
+        """
+        now = self.sensors.get().timestamp
+        ticks_per_inch = self._get_inches_to_ticks(1)
+        position = self.return_drive_encoder_position() / ticks_per_inch
+
+        key = (inches, max_speed)
+        active = self.active_profile
+
+        # Start a new move if the target changed or nobody asked for a while
+        if active is None or active[0] != key or now - active[4] > .25:
+            profile = None
+            if abs(position) < 1:
+                profile = self.profiles.get(key)
+            if profile is None:
+                profile = self._make_profile(inches - position, max_speed)
+            active = [key, profile, position, now, now]
+            self.active_profile = active
+
+        _, profile, start, start_time, _ = active
+        active[4] = now
+
+        t = now - start_time
+        setpoint, velocity, acceleration = profile.sample(t)
+        error = start + setpoint - position
+
+        if t >= profile.total_time:
+            if abs(inches - position) < self.profile_tolerance.value:
+                self.active_profile = None
+                return True
+            if t >= profile.total_time + self.profile_timeout.value:
+                logger.warning("Gave up driving to %.1f inches, stopped at %.1f", inches, position)
+                self.active_profile = None
+                return True
+
+        y = velocity / self.profile_full_speed.value + \
+            acceleration * self.profile_kA.value + \
+            error * self.profile_P.value
+
+        if t >= profile.total_time:
+            min_output = self.profile_min_output.value
+            if abs(y) < min_output:
+                y = math.copysign(min_output, error)
+
+        self.y = max(min(max_speed, y), -max_speed)
+        return False
+
+    def follow_path(self, path, max_speed=.9):
+        """
+            Drives along a :class:`.SplinePath` without stopping, using the
+            odometry pose. Speed along the path follows a trapezoidal motion
+            profile, and steering is pure pursuit: always turn towards the
+            point on the path a little ahead of the robot.
+
+            The path must be in the same frame as get_pose(), so call
+            reset_pose() where the path starts.
+
+            This only ends on distance, the robot can still be a few degrees
+            off the final heading of the path when it returns True.
+
+            :returns: True once the robot has reached the end of the path, or
+                      'Drive/Profile Timeout' seconds after the profile
+                      finished if it never gets there
+        """
+        now = self.sensors.get().timestamp
+        x, y, heading = self.get_pose()
+
+        active = self.active_path
+        if active is None or active[0] is not path or now - active[2] > .25:
+            profile = self.profiles.get((path.length, max_speed))
+            if profile is None:
+                profile = self._make_profile(path.length, max_speed)
+            active = [path, now, now, 0, profile]
+            self.active_path = active
+
+        path, start_time, _, index, profile = active
+        active[2] = now
+
+        index = path.closest(x, y, index)
+        active[3] = index
+        travelled = path.distances[index]
+
+        t = now - start_time
+        setpoint, velocity, acceleration = profile.sample(t)
+
+        if t >= profile.total_time:
+            if path.length - travelled < self.profile_tolerance.value:
+                self.active_path = None
+                return True
+            if t >= profile.total_time + self.profile_timeout.value:
+                logger.warning("Gave up following the path, %.1f inches short of the end", path.length - travelled)
+                self.active_path = None
+                return True
+
+        y_out = velocity / self.profile_full_speed.value + \
+            acceleration * self.profile_kA.value + \
+            (setpoint - travelled) * self.profile_P.value
+        self.y = max(min(max_speed, y_out), -max_speed)
+
+        tx, ty = path.point_at(travelled + self.path_lookahead.value)
+        bearing = math.degrees(math.atan2(ty - y, tx - x))
+        error = (bearing - heading + 180) % 360 - 180
+
+        rotate_max = self.rotate_max.value
+        self.rotation = max(min(rotate_max, error * self.path_turn_P.value), -rotate_max)
+        return False
+
     def encoder_drive(self, target_position, max_speed):
         target_offset = target_position - self.return_drive_encoder_position()
 
@@ -137,45 +336,58 @@ class Drive:
     def angle_rotation(self, target_angle):
         """
             Adjusts the robot so that it points at a particular angle. Returns True
-            if the robot is near the target angle, False otherwise
+            if the robot has settled at the target angle, False otherwise
 
             :param target_angle: Angle to point at, in degrees
 
-            :returns: True if near angle, False if gyro is not enabled or not within 1º of target
+            :returns: True if settled, False if gyro is not enabled or the robot
+                      isn't within 3º of the target and holding still
         """
         if not self.gyro_enabled:
             return False
 
-        angleOffset = target_angle - self.return_gyro_angle()
-        if abs(angleOffset) > 3:
-            self.iErr += angleOffset
-            self.rotation = angleOffset * self.angle_P.value + self.angle_I.value * self.iErr
-            self.rotation = max(min(self.rotate_max.value, self.rotation), -self.rotate_max.value)
+        snapshot = self.sensors.get()
 
-            return False
-        self.iErr = 0
-        return True
+        pid = self.angle_pid
+        pid.set_gains(self.angle_P.value, self.angle_I.value, self.angle_D.value)
+        pid.output_limit = self.rotate_max.value
+        pid.rate_tolerance = self.angle_settle_rate.value
+        pid.hold_time = self.angle_hold_time.value
+
+        rotation = pid.update(target_angle, snapshot.yaw, snapshot.timestamp, snapshot.yaw_rate)
+
+        if pid.on_target():
+            self.telemetry.put('Drive/Rotate Settle Time', pid.settle_time)
+            return True
+
+        self.rotation = rotation
+        return False
 
     def enable_camera_tracking(self):
         self.enable_camera = True
 
     def disable_camera_tracking(self):
         self.enable_camera = False
+        self.camera_mailbox.clear()
         self.align_angle = None
         self.align_angle_nt = 0
 
     def align_to_tower(self):
+        self._update_align_angle()
         if self.align_angle is not None:
             return self.angle_rotation(self.align_angle)
         else:
             return False
 
-    def _align_angle_updated(self, source, key, value, isNew):
-        self.align_angle = value + self.return_gyro_angle()
-        self.align_angle_nt = self.align_angle
+    def _update_align_angle(self):
+        # The camera measured the offset from where the robot was pointing
+        # when the frame was taken, not where it's pointing now
+        for received, _, value in self.camera_mailbox.drain():
+            self.align_angle = value + self.sensors.yaw_at(received - self.camera_latency.value)
+            self.align_angle_nt = self.align_angle
 
     def wall_goto(self):
-        y = (self.back_sensor.getDistance() - 16.0)/35
+        y = (self.sensors.get().back_distance - 16.0)/35
         y = max(min(.6, y), -.6)
 
         self.y = y
@@ -195,6 +407,9 @@ class Drive:
 
     def execute(self):
         """Actually makes the robot drive"""
+        self._update_align_angle()
+        self.odometry.update(self.lf_encoder.get_total(), self.rf_encoder.get_total(), self.sensors.get().yaw)
+
         backwards = -1 if self.isTheRobotBackwards else 1
 
         if(self.winch.isExtended and self.isTheRobotBackwards):
@@ -209,7 +424,11 @@ class Drive:
         self.update_sd()
 
     def update_sd(self):
-        self.sd.putValue('Drive/NavX | Yaw', self. navX.getYaw())
-        self.sd.putValue('Drive/Encoder', self.return_drive_encoder_position())
-        self.sd.putValue('Drive/backCamera', self.isTheRobotBackwards)
-        self.sd.putValue('Drive/Ultrasonic', self.ultrasonic.getVoltage())
\ No newline at end of file
+        snapshot = self.sensors.get()
+        self.telemetry.put('Drive/NavX | Yaw', snapshot.yaw)
+        self.telemetry.put('Drive/Encoder', self.return_drive_encoder_position())
+        self.telemetry.put('Drive/backCamera', self.isTheRobotBackwards)
+        self.telemetry.put('Drive/Ultrasonic', snapshot.ultrasonic)
+        self.telemetry.put('Drive/Pose X', self.odometry.x)
+        self.telemetry.put('Drive/Pose Y', self.odometry.y)
+        self.telemetry.put('Drive/Pose Heading', self.odometry.heading)
\ No newline at end of file
@@ -1,5 +1,9 @@
+import collections
+import math
+import time
 import wpilib
 from networktables.networktable import NetworkTable
+from common import calibrationStore, motionProfile, sensors, telemetry
 import logging
 logger = logging.getLogger('arm')
 
@@ -16,10 +20,26 @@ class Arm:
     leftArm = wpilib.CANTalon
     rightArm = wpilib.CANTalon
     leftBall = wpilib.Talon
+    telemetry = telemetry.Telemetry
+    sensors = sensors.Sensors
+    calibration = calibrationStore.CalibrationStore
+
+    #: Number of (timestamp, position, velocity) samples kept for on_target(),
+    #: which is longer than 'Arm/On Target Time' can usefully be
+    history_size = 10
+
+    #: Seconds to wait after the robot starts up before checking the saved
+    #: calibration, so the Talon has sent its sensor values by then
+    calibration_load_delay = .25
+
+    #: Seconds the arm has to be stopped before its position is saved
+    calibration_still_time = .25
 
     def __init__(self):
         self.isCalibrating = False
         self.isCalibrated = False
+        # When the arm was last homed, the time.time() kind
+        self.calibrated_at = None
 
         self.sd = NetworkTable.getTable('SmartDashboard')
 
@@ -29,14 +49,128 @@ class Arm:
             self.sd.getAutoUpdateValue('Arm/Top', -20),
         ]
         self.position_threshold = self.sd.getAutoUpdateValue('Arm/On Target Threshold', 25)
+        # The arm is only on target once it's stopped there, not while it
+        # swings through. Talons report velocity in ticks per 100ms.
+        self.velocity_threshold = self.sd.getAutoUpdateValue('Arm/On Target Velocity', 10)
+        self.settle_time = self.sd.getAutoUpdateValue('Arm/On Target Time', .04)
+        # Shooting starts this long before the arm gets to the middle, in
+        # ShootBall and in the autonomous modes
+        self.fire_lead_time = self.sd.getAutoUpdateValue('Arm/Fire Lead Time', .15)
+        self.history = collections.deque(maxlen=self.history_size)
         self.wanted_pid = (
             self.sd.getAutoUpdateValue('Arm/P', 2),
             self.sd.getAutoUpdateValue('Arm/I', 0),
             self.sd.getAutoUpdateValue('Arm/D', 0)
         )
 
+        # Moves follow a trapezoidal profile, in encoder ticks. The Talon's
+        # position loop tracks it, so the setpoints are moved against
+        # gravity by however far the P alone would sag.
+        self.profile_enabled = self.sd.getAutoUpdateValue('Arm/Profile Enabled', True)
+        self.cruise_velocity = self.sd.getAutoUpdateValue('Arm/Cruise Velocity', 1800)
+        self.max_acceleration = self.sd.getAutoUpdateValue('Arm/Max Acceleration', 8000)
+        # Output that holds the arm up when it's sticking straight out
+        self.gravity_ff = self.sd.getAutoUpdateValue('Arm/Gravity FF', .13)
+        self.horizontal_position = self.sd.getAutoUpdateValue('Arm/Horizontal Position', 2490)
+        self.ticks_per_degree = self.sd.getAutoUpdateValue('Arm/Ticks Per Degree', 27.6)
+
+        # [target, profile, start position, start time]
+        self.active_profile = None
+
         self.calibrate_timer = wpilib.Timer()
 
+        # A saved calibration is only trusted if the arm's analog sensor
+        # still reads what it did when it was saved. Older than the max age
+        # just gets a warning.
+        self.calibration_tolerance = self.sd.getAutoUpdateValue('Arm/Calibration Analog Tolerance', 5)
+        self.calibration_max_age = self.sd.getAutoUpdateValue('Arm/Calibration Max Age', 12 * 60 * 60)
+
+    def setup(self):
+        self.telemetry.register('Arm/Manual Value')
+        self.telemetry.register('Arm/Encoder', deadband=5, rate=10)
+        self.telemetry.register('Arm/Reverse Limit Switch')
+        self.telemetry.register('Arm/Forward Limit Switch')
+        self.telemetry.register('Arm/Calibrated')
+        self.telemetry.register('Arm/Position', deadband=2, rate=10)
+        self.telemetry.register('Arm/Burnout')
+        self.telemetry.register('Arm/Target Position')
+        self.telemetry.register('Arm/Setpoint', deadband=2, rate=10)
+
+        # The Talon's sensor values aren't in yet, so the saved calibration
+        # is checked in the first loop that's late enough, see disabled()
+        self.started = wpilib.Timer.getFPGATimestamp()
+        self.calibration_loaded = False
+        self.save_pending = False
+        self.still_since = None
+
+    def _load_calibration(self):
+        """
+            Skips homing at boot if the arm hasn't moved since its encoder
+            position was saved. If the Talon lost the position since then
+            (it was power cycled), the saved one is put back.
+        """
+        self.calibration_loaded = True
+        saved = self.calibration.get('arm')
+        if saved is None:
+            return
+
+        analog = self.sensors.get().arm_analog
+        if abs(analog - saved['analog']) > self.calibration_tolerance.value:
+            logger.info("The arm has moved since its calibration was saved, it will home")
+            return
+
+        if self.leftArm.getEncPosition() != saved['position']:
+            self.leftArm.setPosition(saved['position'])
+
+        self.isCalibrated = True
+        self.calibrated_at = saved['time']
+        logger.info("Using the saved arm calibration, position %s", saved['position'])
+
+        # The roboRIO's clock isn't set until the driver station connects,
+        # so after a reboot the age can be anything. It's only a warning,
+        # the analog sensor is what says the arm hasn't moved.
+        age = time.time() - saved['time']
+        if age > self.calibration_max_age.value:
+            logger.warning("The saved arm calibration is %.1f hours old", age / 3600)
+
+    def save_calibration(self):
+        """
+            Saves where the arm is for the next boot, once it has stopped.
+            The arm drops when the robot is disabled, so this waits for
+            disabled() to see it sitting still.
+        """
+        self.save_pending = True
+        self.still_since = None
+
+    def _save_calibration(self):
+        self.save_pending = False
+        if not self.isCalibrated:
+            return
+
+        # The age is how long since it was homed, not since it was saved
+        snapshot = self.sensors.get()
+        self.calibration.put('arm', {
+            'position': snapshot.arm_position,
+            'analog': snapshot.arm_analog,
+        }, self.calibrated_at)
+
+    def disabled(self):
+        """Called every loop while the robot is disabled"""
+        snapshot = self.sensors.get()
+
+        if not self.calibration_loaded:
+            if snapshot.timestamp - self.started >= self.calibration_load_delay:
+                self._load_calibration()
+            return
+
+        if self.save_pending:
+            if snapshot.arm_velocity != 0:
+                self.still_since = None
+            elif self.still_since is None:
+                self.still_since = snapshot.timestamp
+            elif snapshot.timestamp - self.still_since >= self.calibration_still_time:
+                self._save_calibration()
+
     def on_enable(self):
         """
         :type motor: wpilib.CANTalon()
@@ -59,11 +193,18 @@ class Arm:
 
         self.current_pid = (0, 0, 0)
         self.new_pid = None
+        self.active_profile = None
 
         self.leftArm.changeControlMode(wpilib.CANTalon.ControlMode.PercentVbus)
         self.rightArm.changeControlMode(wpilib.CANTalon.ControlMode.Follower)
         self.rightArm.reverseOutput(True)
 
+        # Enabled before disabled() got to it
+        if not self.calibration_loaded:
+            self._load_calibration()
+        # Moving again, so the position from before doesn't need saving
+        self.save_pending = False
+
         self.leftBallSpeed = 0
 
     def set_arm_top(self):
@@ -83,7 +224,7 @@ class Arm:
         :returns: Tote lift encoder position
         :rtype: int
         """
-        return self.leftArm.getEncPosition()
+        return self.sensors.get().arm_position
     def get_target_position(self):
         return self.target_position
 
@@ -156,20 +297,138 @@ class Arm:
         self.want_auto = True
         self.target_position = position
 
+    def _update_history(self):
+        """Adds this loop's sample, if it isn't in the history already"""
+        snapshot = self.sensors.get()
+        history = self.history
+        if not history or history[-1][0] != snapshot.timestamp:
+            history.append((snapshot.timestamp, snapshot.arm_position, snapshot.arm_velocity))
+
     def on_target(self):
         """
-        :returns:  Is the encoder at the set target
+        :returns: Is the arm stopped at the set target. The samples from
+                  the last 'Arm/On Target Time' seconds all have to be
+                  close enough and slow enough.
         :rtype: Bool
         """
-        if abs(self.get_position()-self.target_position)< self.position_threshold.value:
-            return True
-        elif self.target_index == 0 and self.leftArm.isFwdLimitSwitchClosed():
+        if self.target_position is None:
+            return False
+
+        snapshot = self.sensors.get()
+        if self.target_index == 0 and snapshot.arm_fwd_limit:
             return True
-        elif self.target_index == 2 and self.leftArm.isRevLimitSwitchClosed():
+        elif self.target_index == 2 and snapshot.arm_rev_limit:
             return True
 
+        self._update_history()
+        history = self.history
+
+        target = self.target_position
+        position_threshold = self.position_threshold.value
+        velocity_threshold = self.velocity_threshold.value
+        settle_time = self.settle_time.value
+        newest = history[-1][0]
+        for timestamp, position, velocity in reversed(history):
+            if abs(position - target) >= position_threshold or abs(velocity) > velocity_threshold:
+                return False
+            if newest - timestamp >= settle_time:
+                return True
+
+        # Hasn't been there long enough yet
         return False
 
+    def time_to_target(self):
+        """
+        :returns: Roughly how many seconds until the arm gets to the target,
+                  0 if it's on target, None if there's no target
+        """
+        if self.target_position is None:
+            return None
+        if self.on_target():
+            return 0
+
+        snapshot = self.sensors.get()
+        target = self.target_position
+
+        # Until the profile's done, the arm can't be there
+        active = self.active_profile
+        if active is not None and active[0] == target:
+            left = active[1].total_time - (snapshot.timestamp - active[3])
+            if left > 0:
+                return left
+
+        # After that, assume it keeps closing at the speed it's going, or
+        # at cruise velocity if it's stopped or going the wrong way
+        error = target - snapshot.arm_position
+        if abs(error) < self.position_threshold.value:
+            distance = 0
+        else:
+            distance = abs(error) - self.position_threshold.value
+
+        speed = snapshot.arm_velocity * 10
+        if speed * error <= 0:
+            speed = self.cruise_velocity.value
+
+        # Plus the time it has to stay put for on_target()
+        return distance / max(abs(speed), 1) + self.settle_time.value
+
+    def will_be_on_target(self, within):
+        """
+        :param within: Seconds
+        :returns: Will the arm be on target that soon. Lets states start
+                  the next thing while the arm finishes its move.
+        """
+        remaining = self.time_to_target()
+        return remaining is not None and remaining <= within
+
+    def ready_to_fire(self):
+        """
+        :returns: Will the arm be on target within 'Arm/Fire Lead Time'
+        """
+        return self.will_be_on_target(self.fire_lead_time.value)
+
+    def _get_setpoint(self):
+        """
+            :returns: What to send the Talon this loop to get to target_position
+        """
+        target = self.target_position
+        snapshot = self.sensors.get()
+
+        if not self.profile_enabled.value:
+            self.active_profile = None
+            return target
+
+        active = self.active_profile
+        if active is None or active[0] != target:
+            start = snapshot.arm_position
+            velocity = 0
+
+            # If the target changes partway through a move, the new move
+            # carries on from where the old one was and how fast it was
+            # going, instead of jumping to a stop
+            if active is not None:
+                _, old_profile, old_start, old_start_time = active
+                t = snapshot.timestamp - old_start_time
+                if t < old_profile.total_time:
+                    position, velocity, _ = old_profile.sample(t)
+                    start = old_start + position
+
+            profile = motionProfile.TrapezoidalProfile(target - start, self.cruise_velocity.value,
+                                                       self.max_acceleration.value, velocity)
+            active = [target, profile, start, snapshot.timestamp]
+            self.active_profile = active
+
+        _, profile, start, start_time = active
+        position = start + profile.sample(snapshot.timestamp - start_time)[0]
+
+        # The Talon's output is P * error, with 1023 as full output
+        p = self.current_pid[0]
+        if p > 0:
+            angle = math.radians((self.horizontal_position.value - position) / self.ticks_per_degree.value)
+            position -= self.gravity_ff.value * math.cos(angle) * 1023 / p
+
+        return position
+
     def overide_calibrate(self):
         """in case of calibration faliure, this can be called to ignore it."""
         self.leftArm.set(0)
@@ -177,6 +436,7 @@ class Arm:
 
         self.leftArm.changeControlMode(wpilib.CANTalon.ControlMode.Position)
         self.isCalibrated = True
+        self.calibrated_at = time.time()
 
 
     def _calibrate(self):
@@ -191,7 +451,7 @@ class Arm:
                 self.set_manual(0)
                 self.mode = ArmMode.MANUAL
 
-            if not self.leftArm.isRevLimitSwitchClosed():
+            if not self.sensors.get().arm_rev_limit:
                 self.leftArm.changeControlMode(wpilib.CANTalon.ControlMode.PercentVbus)
                 self.leftArm.set(-1)
 
@@ -204,6 +464,7 @@ class Arm:
                 self.leftArm.changeControlMode(wpilib.CANTalon.ControlMode.Position)
                 self.isCalibrated = True
                 self.isCalibrating = False
+                self.calibrated_at = time.time()
 
     def intake(self):
         self.leftBallSpeed = reverse
@@ -216,10 +477,13 @@ class Arm:
         self.leftArm.setPosition(0)
 
         self.isCalibrated = True
+        self.calibrated_at = time.time()
 
 
     def execute(self):
         """Actually does stuff"""
+        self._update_history()
+
         #self.rightArm.reverseOutput(self.rightArmReverse)
         if self.want_manual:
             self.mode = ArmMode.MANUAL
@@ -242,6 +506,7 @@ class Arm:
         if self.mode == ArmMode.MANUAL:
             self.leftArm.set(self.manual_value)
             self.target_index = -1
+            self.active_profile = None
 
         elif self.mode == ArmMode.AUTO:
             self._calibrate()
@@ -252,15 +517,18 @@ class Arm:
                 if self.current_pid != self.new_pid:
                     self.leftArm.setPID(*self.new_pid)
                     self.current_pid = self.new_pid
-                self.leftArm.set(self.target_position)
+                setpoint = self._get_setpoint()
+                self.leftArm.set(setpoint)
+                self.telemetry.put('Arm/Setpoint', setpoint)
 
         else:
             self.leftArm.set(0)
 
-        if self.leftArm.isFwdLimitSwitchClosed():
+        snapshot = self.sensors.get()
+        if snapshot.arm_fwd_limit:
             self.leftArm.setPosition(3600)
 
-        if self.leftArm.isRevLimitSwitchClosed():
+        if snapshot.arm_rev_limit:
             self.leftArm.setPosition(0)
 
         self.rightArm.set(self.leftArm.getDeviceID())
@@ -278,16 +546,16 @@ class Arm:
 
     def update_sd(self, name):
         """Puts refreshed values to SmartDashboard"""
-        self.sd.putValue('Arm/Manual Value', self.manual_value)
-        self.sd.putValue('Arm/Encoder', self.leftArm.getEncPosition())
-        self.sd.putValue('Arm/Reverse Limit Switch', self.leftArm.isRevLimitSwitchClosed())
-        self.sd.putValue('Arm/Forward Limit Switch', self.leftArm.isFwdLimitSwitchClosed())
-        self.sd.putValue('Arm/Calibrated', self.isCalibrated)
-        self.sd.putValue('Arm/Position', self.leftArm.getAnalogInPosition())
-        self.sd.putValue('Arm/Burnout', ArmMode.AUTO == ArmMode.MANUAL)
-
+        snapshot = self.sensors.get()
+        self.telemetry.put('Arm/Manual Value', self.manual_value)
+        self.telemetry.put('Arm/Encoder', snapshot.arm_position)
+        self.telemetry.put('Arm/Reverse Limit Switch', snapshot.arm_rev_limit)
+        self.telemetry.put('Arm/Forward Limit Switch', snapshot.arm_fwd_limit)
+        self.telemetry.put('Arm/Calibrated', self.isCalibrated)
+        self.telemetry.put('Arm/Position', snapshot.arm_analog)
+        self.telemetry.put('Arm/Burnout', ArmMode.AUTO == ArmMode.MANUAL)
 
         if self.target_position is None:
-            self.sd.getAutoUpdateValue('Arm/Target Position', -1)
+            self.telemetry.put('Arm/Target Position', -1)
         else:
-            self.sd.getAutoUpdateValue('Arm/Target Position', self.target_index)
+            self.telemetry.put('Arm/Target Position', self.target_index)
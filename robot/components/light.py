@@ -1,5 +1,8 @@
 import wpilib
+from common.scheduler import NORMAL
 class Light:
+    execute_rate = 5
+    execute_priority = NORMAL
 
     flashlight = wpilib.Relay
 
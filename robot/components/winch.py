@@ -2,6 +2,7 @@ import wpilib
 from networktables.networktable import NetworkTable
 
 class Winch:
+    execute_rate = 20
 
     winchMotor = wpilib.Talon
     kickMotor = wpilib.Talon
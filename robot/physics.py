@@ -1,10 +1,34 @@
 
+import collections
 import math
 
 from networktables.util import ntproperty
-from pyfrc.physics.drivetrains import four_motor_drivetrain
+from sim import motorModel
 import wpilib
 
+# The physics always moves forward in steps of this many seconds, no
+# matter how often update_sim is called, so runs are repeatable at any
+# simulation speed
+PHYSICS_STEP = .002
+
+# Drivetrain: two CIMs per side, geared for the same 5 ft/s top speed the
+# simulation has always used
+ROBOT_MASS = 54                                 # kg
+WHEEL_RADIUS = 7.639 / 2 * .0254                # m
+TOP_SPEED = 5 * .3048                           # m/s
+WHEELBASE = 2                                   # ft
+DRIFT = -.004                                   # rad/s, the robot pulls to the left while driving
+ANALOG_TICKS_PER_INCH = (50 / 12 * 1023) / (math.pi * 7.639)
+
+# Arm: two 775pros (Talon 25 and its follower) geared for about 2000
+# encoder ticks per second, with gravity pulling it down
+ARM_TICKS_PER_RAD = 1440 / (2 * math.pi)
+ARM_TRAVEL = 2764                               # ticks from stowed to the floor
+ARM_FREE_SPEED = 2046 / ARM_TICKS_PER_RAD       # rad/s at the encoder
+ARM_INERTIA = 1.7                               # kg*m^2 at the encoder shaft
+ARM_GRAVITY = 40                                # N*m at the encoder shaft, arm horizontal
+
+
 class PhysicsEngine:
 
     # Transmit data to robot via NetworkTables
@@ -15,18 +39,30 @@ class PhysicsEngine:
     camera_enabled = ntproperty('/camera/enabled', False)
 
     camera_update_rate = 1/15.0
+    # Results show up this long after the frame is taken, like the real camera
+    camera_latency = .08
     target_location = (0, 16)
 
     def __init__(self, controller):
         self.controller = controller
 
-        self.armAct = 500
-        self.prev_armAct = 500
+        drive_motors = motorModel.cim(2)
+        drive_gearing = drive_motors.free_speed * WHEEL_RADIUS / TOP_SPEED
+        side_inertia = ROBOT_MASS / 2 * WHEEL_RADIUS ** 2
+        self.left_side = motorModel.GearedMechanism(drive_motors, drive_gearing, side_inertia)
+        self.right_side = motorModel.GearedMechanism(drive_motors, drive_gearing, side_inertia)
+
+        arm_motors = motorModel.pro775(2)
+        self.arm = motorModel.GearedMechanism(arm_motors, arm_motors.free_speed / ARM_FREE_SPEED, ARM_INERTIA)
+        self.arm.position = 500 / ARM_TICKS_PER_RAD
+
+        # Time that hasn't been simulated yet, less than one PHYSICS_STEP
+        self.leftover_time = 0
 
         self.controller.add_device_gyro_channel('navxmxp_spi_4_angle')
-        self.iErr = 0
 
         self.last_cam_update = -10
+        self.camera_results = collections.deque()
 
 
     """
@@ -39,61 +75,34 @@ class PhysicsEngine:
         tm_diff -- Diff between current time and time when last checked
     """
     def update_sim(self, hal_data, now, tm_diff):
-        # Simulate the arm
         try:
             armDict = hal_data['CAN'][25] # armDict is the dictionary of variables assigned to CANTalon 25
             lfDict = hal_data['CAN'][5]
             rfDict = hal_data['CAN'][15]
 
-            armPercentVal = int(armDict['value']*tm_diff*2) # Encoder position increaser when in PercentVbus mode based on time and thrust value
-            posVal = int(tm_diff*1023) # Encoder Position difference when in Position mode based on time
-            armDict['limit_switch_closed_for'] = True
-            armDict['limit_switch_closed_rev'] = True
-
-            lWheelPercentVal = int(lfDict['value']*tm_diff*10)
-            rWheelPercentVal = int(rfDict['value']*tm_diff*10)
-        except:
-            pass
-
-        else:
-
-            if armDict['mode_select'] == wpilib.CANTalon.ControlMode.PercentVbus: # If manual operation
-                self.armAct += armPercentVal # Add the calculated encoder change value to the 'actual value'
-                armDict['enc_position'] += armPercentVal # Add the calculated encoder change value to the recorded encoder value
-            elif armDict['mode_select'] == wpilib.CANTalon.ControlMode.Position: #If in auto mode
-                if armDict['enc_position'] < armDict['value']: #If the current position is less than the target position
-                    armDict['enc_position'] += posVal # Add calculated encoder value to recorded value
-                    self.armAct += posVal
-                else: # If the current position is more than the target position
-                    armDict['enc_position'] -= posVal # Subtract calculated encoder position
-                    self.armAct -=posVal
-            if self.armAct in range(-50, 0): # If the measured encoder value is within this range
-                armDict['limit_switch_closed_rev'] = False # Fake closing the limit switch
-                armDict['enc_position'] = 0
-            if self.armAct in range(2700, 2800):
-                armDict['limit_switch_closed_for'] = False
-                armDict['enc_position'] = 2764
-
-            lfDict['analog_in_position']+=lWheelPercentVal
-            rfDict['analog_in_position']+=rWheelPercentVal
-
-            #armDict['enc_position'] = max(min(armDict['enc_position'], 1440), 0) # Keep encoder between these values
-            self.armAct = max(min(self.armAct, 2764), 0)
-            armDict['enc_velocity'] = ((self.armAct - self.prev_armAct) / tm_diff)/1440
-            self.prev_armAct = self.armAct
-
-
-        # Simulate the drivetrain
-        lf_motor = -hal_data['CAN'][5]['value']/1023
-        lr_motor = -hal_data['CAN'][10]['value']/1023
-        rf_motor = -hal_data['CAN'][15]['value']/1023
-        rr_motor = -hal_data['CAN'][20]['value']/1023
-
-        fwd, rcw = four_motor_drivetrain(lr_motor, rr_motor, lf_motor, rf_motor, speed=5)
-        if abs(fwd) > 0.1:
-            rcw += -(0.2*tm_diff)
-
-        self.controller.drive(fwd, rcw, tm_diff)
+            # Motor outputs don't change between calls, so only read them once
+            left_voltage = (lfDict['value'] + hal_data['CAN'][10]['value']) / 2 / 1023 * 12
+            right_voltage = -(rfDict['value'] + hal_data['CAN'][20]['value']) / 2 / 1023 * 12
+        except KeyError:
+            return
+
+        self.leftover_time += tm_diff
+        while self.leftover_time >= PHYSICS_STEP:
+            self.leftover_time -= PHYSICS_STEP
+            self._step_drivetrain(lfDict, rfDict, left_voltage, right_voltage, PHYSICS_STEP)
+            self._step_arm(armDict, PHYSICS_STEP)
+
+        # The limit switches read False when they're pressed
+        ticks = self.arm.position * ARM_TICKS_PER_RAD
+        armDict['limit_switch_closed_rev'] = ticks > 5
+        armDict['limit_switch_closed_for'] = ticks < 2700
+        if ticks <= 5:
+            armDict['enc_position'] = 0
+        elif ticks >= 2700:
+            armDict['enc_position'] = ARM_TRAVEL
+
+        # Talons report velocity in ticks per 100ms
+        armDict['enc_velocity'] = self.arm.velocity * ARM_TICKS_PER_RAD / 10
 
         # Simulate the camera approaching the tower
         # -> this is a very simple approximation, should be good enough
@@ -110,6 +119,8 @@ class PhysicsEngine:
             distance = math.hypot(dx, dy)
 
             target_present = False
+            target_angle_offset = None
+            target_height = None
 
             if distance > 6 and distance < 17:
                 # determine the absolute angle
@@ -125,8 +136,67 @@ class PhysicsEngine:
                     # target 'height' is a number between -18 and 18, where
                     # the value is related to the distance away. -11 is ideal.
 
-                    self.target_angle = offset
-                    self.target_height = -(-(distance*3)+30)
+                    target_angle_offset = offset
+                    target_height = -(-(distance*3)+30)
+
+            self.camera_results.append((now + self.camera_latency, target_present,
+                                        target_angle_offset, target_height))
+            self.last_cam_update = now
 
+        # Publish the results whose processing time is up
+        while self.camera_results and self.camera_results[0][0] <= now:
+            _, target_present, offset, height = self.camera_results.popleft()
+            if target_present:
+                self.target_angle = offset
+                self.target_height = height
             self.target_present = target_present
-            self.last_cam_update = now
\ No newline at end of file
+
+    def _step_drivetrain(self, lfDict, rfDict, left_voltage, right_voltage, dt):
+        left_before = self.left_side.position
+        right_before = self.right_side.position
+
+        self.left_side.step(left_voltage, dt)
+        self.right_side.step(right_voltage, dt)
+
+        # Encoders count in inches of wheel travel
+        left_inches = (self.left_side.position - left_before) * WHEEL_RADIUS / .0254
+        right_inches = (self.right_side.position - right_before) * WHEEL_RADIUS / .0254
+        lfDict['analog_in_position'] += left_inches * ANALOG_TICKS_PER_INCH
+        rfDict['analog_in_position'] -= right_inches * ANALOG_TICKS_PER_INCH
+
+        # Side speeds in ft/s
+        l = self.left_side.velocity * WHEEL_RADIUS / .3048
+        r = self.right_side.velocity * WHEEL_RADIUS / .3048
+
+        fwd = (l + r) / 2
+        rcw = (l - r) / WHEELBASE
+        if abs(fwd) > 0.1:
+            rcw += DRIFT
+
+        self.controller.drive(fwd, rcw, dt)
+
+    def _step_arm(self, armDict, dt):
+        mode = armDict['mode_select']
+        if mode == wpilib.CANTalon.ControlMode.PercentVbus:
+            output = armDict['value'] / 1023
+        elif mode == wpilib.CANTalon.ControlMode.Position:
+            # The Talon's own position loop, on its own encoder
+            error = armDict['value'] - armDict['enc_position']
+            output = max(min(1, armDict['profile0_p'] * error / 1023), -1)
+        else:
+            output = 0
+
+        arm = self.arm
+        before = arm.position
+
+        # Stowed straight up at 0, about 10 degrees below horizontal at the bottom
+        angle = math.radians(90 - arm.position * ARM_TICKS_PER_RAD / ARM_TRAVEL * 100)
+        arm.step(output * 12, dt, ARM_GRAVITY * math.cos(angle))
+
+        # Hard stops
+        travel = ARM_TRAVEL / ARM_TICKS_PER_RAD
+        if arm.position < 0 or arm.position > travel:
+            arm.position = max(min(travel, arm.position), 0)
+            arm.velocity = 0
+
+        armDict['enc_position'] += (arm.position - before) * ARM_TICKS_PER_RAD
\ No newline at end of file
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 
+# Before everything else, so that it can time everything else
+from common import startupProfiler
+startupProfiler.start_if_requested()
+
+import functools
+import os
+
 import magicbot
 import wpilib
 
-from robotpy_ext.control.button_debouncer import ButtonDebouncer
 from components import drive, intake, winch, light
 from automations import shootBall, portcullis, lightOff, targetGoal
-from common import driveEncoders
+from common import calibrationStore, coalescedMotors, driveEncoders, inputBindings, loopTimer, mailbox, matchRecorder, scheduler, sensors, telemetry
 from networktables.util import ntproperty
 
 
@@ -14,6 +20,36 @@ from robotpy_ext.common_drivers import navx, distance_sensors
 
 from networktables.networktable import NetworkTable
 
+#: Which buttons do what in teleop. Sticks are 0 for joystick1 and 1 for
+#: joystick2. A bindings.json next to this file replaces the whole table.
+BINDINGS = [
+    {'stick': 0, 'button': 1, 'mode': 'debounced', 'action': 'switch_direction'},
+
+    {'stick': 1, 'button': 5, 'mode': 'held', 'action': 'outtake', 'group': 'ball'},
+    {'stick': 1, 'button': 4, 'mode': 'held', 'action': 'intake', 'group': 'ball'},
+    {'stick': 1, 'button': 1, 'mode': 'debounced', 'action': 'shoot'},
+
+    # There's two sets of arm buttons. The first automatically raises and lowers the arm the
+    # proper amount, whereas the second will let you manually raise and lower it more precise amounts.
+    {'stick': 1, 'button': 3, 'mode': 'debounced', 'action': 'raise_arm', 'group': 'arm'},
+    {'stick': 1, 'button': 2, 'mode': 'debounced', 'action': 'lower_arm', 'group': 'arm'},
+    {'stick': 0, 'button': 3, 'mode': 'held', 'action': 'manual_arm_up'},
+    {'stick': 0, 'button': 2, 'mode': 'held', 'action': 'manual_arm_down'},
+
+    {'stick': 0, 'button': 6, 'mode': 'debounced', 'action': 'light_switch', 'when': 'light_idle'},
+    {'stick': 0, 'button': 5, 'mode': 'held', 'action': 'target'},
+
+    {'stick': 0, 'button': 7, 'mode': 'held', 'action': 'deploy_winch'},
+    {'stick': 0, 'button': 8, 'mode': 'held', 'action': 'winch'},
+
+    {'stick': 0, 'button': 9, 'mode': 'held', 'action': 'creep_forward', 'when': 'backwards'},
+
+    # Practice only
+    {'stick': 0, 'button': 10, 'mode': 'held', 'action': 'rotate_35', 'when': 'no_fms', 'group': 'practice'},
+    {'stick': 0, 'button': 9, 'mode': 'held', 'action': 'rotate_0', 'when': 'no_fms', 'group': 'practice'},
+    {'stick': 1, 'button': 10, 'mode': 'held', 'action': 'align_to_tower', 'when': 'no_fms', 'group': 'practice'},
+]
+
 
 class MyRobot(magicbot.MagicRobot):
     # Shorten a bunch of things
@@ -25,67 +61,252 @@ class MyRobot(magicbot.MagicRobot):
     intake = intake.Arm
     drive = drive.Drive
 
+    #: The base rate is for drive and arm control, and for everything that
+    #: commands them: Drive zeroes its outputs every time it runs, so they
+    #: all have to run at the same rate. Slower components say how often
+    #: they want to run with an execute_rate (per second), and ones that
+    #: can wait when the loop is short on time have an execute_priority.
+    control_loop_wait_time = 0.02
+
     enable_camera_logging = ntproperty('/camera/logging_enabled', True)
     auto_aim_button = ntproperty('/SmartDashboard/Drive/autoAim', False, writeDefault = False)
 
     """Create basic components (motor controllers, joysticks, etc.)"""
     def createObjects(self):
+        startupProfiler.begin('createObjects')
         self.joystick1 = wpilib.Joystick(0)
         self.joystick2 = wpilib.Joystick(1)
 
-        self.lf_motor = wpilib.CANTalon(5)
-        self.lr_motor = wpilib.CANTalon(10)
-        self.rf_motor = wpilib.CANTalon(15)
-        self.rr_motor = wpilib.CANTalon(20)
+        # Motor controllers only send a frame when the command actually changes
+        self.lf_motor = coalescedMotors.CoalescedCANTalon(5)
+        self.lr_motor = coalescedMotors.CoalescedCANTalon(10)
+        self.rf_motor = coalescedMotors.CoalescedCANTalon(15)
+        self.rr_motor = coalescedMotors.CoalescedCANTalon(20)
 
         self.robot_drive = wpilib.RobotDrive(self.lf_motor, self.lr_motor, self.rf_motor, self.rr_motor)
 
-        self.leftArm = wpilib.CANTalon(25)
-        self.rightArm = wpilib.CANTalon(30)
+        self.leftArm = coalescedMotors.CoalescedCANTalon(25)
+        self.rightArm = coalescedMotors.CoalescedCANTalon(30)
+
+        self.leftBall = coalescedMotors.CoalescedTalon(9)
 
-        self.leftBall = wpilib.Talon(9)
+        self.winchMotor = coalescedMotors.CoalescedTalon(0)
+        self.kickMotor = coalescedMotors.CoalescedTalon(1)
 
-        self.winchMotor = wpilib.Talon(0)
-        self.kickMotor = wpilib.Talon(1)
+        self.can_motors = (self.lf_motor, self.lr_motor, self.rf_motor, self.rr_motor,
+                           self.leftArm, self.rightArm)
 
         self.flashlight = wpilib.Relay(0)
         self.lightTimer = wpilib.Timer()
         self.turningOffState = 0
-        self.lastState = False
-
-        self.rf_encoder = driveEncoders.DriveEncoders(self.robot_drive.frontRightMotor, True)
-        self.lf_encoder = driveEncoders.DriveEncoders(self.robot_drive.frontLeftMotor)
 
         self.back_sensor = distance_sensors.SharpIRGP2Y0A41SK0F(0)
         self.ultrasonic = wpilib.AnalogInput(1)
 
         self.navX = navx.AHRS.create_spi()
 
-        self.sd = NetworkTable.getTable('SmartDashboard')
+        # Everything reads the sensors through here, so each one is only read once per loop
+        self.sensors = sensors.Sensors(self.navX, self.lf_motor, self.rf_motor, self.leftArm,
+                                       self.ultrasonic, self.back_sensor)
 
-        self.control_loop_wait_time = 0.025
-        self.reverseButton = ButtonDebouncer(self.joystick1, 1)
+        self.rf_encoder = driveEncoders.DriveEncoders(self.robot_drive.frontRightMotor, True,
+                                                      self.sensors.reader('rf_drive'))
+        self.lf_encoder = driveEncoders.DriveEncoders(self.robot_drive.frontLeftMotor, False,
+                                                      self.sensors.reader('lf_drive'))
 
-        self.shoot = ButtonDebouncer(self.joystick2, 1)
-        self.raiseButton = ButtonDebouncer(self.joystick2, 3)
-        self.lowerButton = ButtonDebouncer(self.joystick2, 2)
-        self.lightButton = ButtonDebouncer(self.joystick1, 6)
+        self.sd = NetworkTable.getTable('SmartDashboard')
+        self.telemetry = telemetry.Telemetry(self.sd)
+
+        # Calibrations that are still good after a reboot
+        self.calibration = calibrationStore.CalibrationStore(calibrationStore.default_path())
+        self.telemetry.register('Robot/Suppressed CAN Frames', rate=1)
+
+        # Dashboard values come in on the NetworkTables thread, and are picked
+        # up at the start of each loop
+        self.dashboard = mailbox.DashboardInputs(self.sd)
+        self.dashboard.watch('robotDefense', 'LowBar')
+        self.dashboard.watch('robotPosition', '1')
+        self.dashboard.watch('LightBulb', False, self._light_bulb_changed)
+
+        # Every enabled loop is recorded, so matches can be replayed in the simulator
+        self.recorder = matchRecorder.MatchRecorder(matchRecorder.default_directory(),
+                                                    (self.joystick1, self.joystick2), self.sensors, self)
+
+        self.robot_table = NetworkTable.getTable('/robot')
+
+        self.scheduler = scheduler.Scheduler(self.control_loop_wait_time)
+        self.loop_timer = loopTimer.LoopTimer(self.control_loop_wait_time, self.telemetry)
+        startupProfiler.end('createObjects')
+
+    def robotInit(self):
+        startupProfiler.begin('robotInit')
+        magicbot.MagicRobot.robotInit(self)
+
+        # Now that the components exist, there's something for the buttons to do
+        actions = {
+            'switch_direction': self.drive.switch_direction,
+            'outtake': self.intake.outtake,
+            'intake': self.intake.intake,
+            'shoot': self.shootBall.shoot,
+            'raise_arm': self.intake.raise_arm,
+            'lower_arm': self.intake.lower_arm,
+            'manual_arm_up': functools.partial(self.intake.set_manual, -1),
+            'manual_arm_down': functools.partial(self.intake.set_manual, 1),
+            'light_switch': self.lightSwitch.switch,
+            'target': self.targetGoal.target,
+            'deploy_winch': self.winch.deploy_winch,
+            'winch': self.winch.winch,
+            'creep_forward': functools.partial(self.drive.move, .5, 0),
+            'rotate_35': functools.partial(self.drive.angle_rotation, 35),
+            'rotate_0': functools.partial(self.drive.angle_rotation, 0),
+            'align_to_tower': self._align_to_tower,
+        }
+        conditions = {
+            'light_idle': lambda: self.turningOffState == 0,
+            'backwards': lambda: self.drive.isTheRobotBackwards,
+            'no_fms': lambda: not self.ds.isFMSAttached(),
+        }
+        table = inputBindings.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bindings.json'),
+                                   BINDINGS)
+        self.bindings = inputBindings.InputBindings((self.joystick1, self.joystick2), table, actions, conditions)
+
+        # The components exist now
+        for component in self._components:
+            name = component.__class__.__name__
+            self.scheduler.add(name, functools.partial(self._run_timed, name, component.execute),
+                               getattr(component, 'execute_rate', None),
+                               getattr(component, 'execute_priority', scheduler.CRITICAL))
+
+        # The recorder runs every loop, late or not, because the late loops
+        # are the ones worth looking at, and a replay needs every loop. It
+        # only copies values, the disk write happens on its own thread.
+        self.scheduler.add('recorder', functools.partial(self._run_timed, 'recorder', self.recorder.record))
+
+        # Everything that can wait goes last
+        self.scheduler.add('telemetry', functools.partial(self._run_timed, 'telemetry', self._flush_telemetry),
+                           rate=10, priority=scheduler.LOW)
+
+        startupProfiler.end('robotInit')
+        startupProfiler.finish()
 
     def autonomous(self):
+        """Same as MagicRobot's, but run by the scheduler"""
+        self.recorder.start('autonomous')
+        self.loop_timer.reset()
+        self.sensors.next_tick()
         self.drive.reset_gyro_angle()
-        magicbot.MagicRobot.autonomous(self)
+
+        self.robot_table.putString('mode', 'auto')
+        self.robot_table.putBoolean('is_ds_attached', self.ds.isDSAttached())
+
+        self._on_mode_enable_components()
+
+        automodes = self._automodes
+        timer = wpilib.Timer()
+        timer.start()
+        try:
+            automodes._on_autonomous_enable()
+        except:
+            self.onException(forceReport=True)
+
+        self.scheduler.start()
+        while self.isAutonomous() and self.isEnabled():
+            self.dashboard.update()
+            try:
+                automodes._on_iteration(timer.get())
+            except:
+                self.onException()
+
+            self._execute_components()
+            self.scheduler.wait()
+
+        try:
+            automodes._on_autonomous_disable()
+        except:
+            self.onException(forceReport=True)
+
+        self._on_mode_disable_components()
+
+    def operatorControl(self):
+        """Same as MagicRobot's, but run by the scheduler"""
+        self.robot_table.putString('mode', 'teleop')
+        self.robot_table.putBoolean('is_ds_attached', self.ds.isDSAttached())
+
+        self._on_mode_enable_components()
+        try:
+            self.teleopInit()
+        except:
+            self.onException(forceReport=True)
+
+        self.scheduler.start()
+        while self.isOperatorControl() and self.isEnabled():
+            self.dashboard.update()
+            try:
+                self.teleopPeriodic()
+            except:
+                self.onException()
+
+            self._execute_components()
+            self.scheduler.wait()
+
+        self._on_mode_disable_components()
+
+    def _execute_components(self):
+        self.scheduler.run_tick()
+        self.sensors.next_tick()
+        self.loop_timer.tick()
+
+    def _run_timed(self, name, function):
+        # Exceptions are handled the same as MagicRobot does for execute()
+        start = self.loop_timer.start()
+        try:
+            function()
+        except:
+            self.onException()
+        self.loop_timer.stop(name, start)
+
+    def _flush_telemetry(self):
+        self.telemetry.put('Robot/Suppressed CAN Frames', sum(m.suppressed_frames for m in self.can_motors))
+        self.telemetry.put('Loop/Missed Ticks', self.scheduler.missed)
+        self.telemetry.put('Loop/Shed Tasks', self.scheduler.shed)
+
+        # Everything the components published since the last flush goes out at once
+        self.telemetry.flush()
+
+    def _light_bulb_changed(self, value):
+        # The dashboard's light button toggles the light whenever it changes
+        if self.isOperatorControl() and self.turningOffState == 0:
+            self.lightSwitch.switch()
 
     def disabledPeriodic(self):
         """Repeat periodically while robot is disabled. Usually emptied. Sometimes used to easily test sensors and other things."""
-        pass
+        self.dashboard.update()
+
+        # Get the selected autonomous mode ready, now that there's time
+        mode = self._automodes.chooser.getSelected()
+        if hasattr(mode, 'prepare'):
+            mode.prepare()
+
+        self.intake.disabled()
+
+        self.sensors.next_tick()
 
     def disabledInit(self):
         """Do once right away when robot is disabled."""
+        self.recorder.stop()
+        if self.loop_timer.loop.count:
+            print(self.loop_timer.summary())
+            for name, count in sorted(self.scheduler.shed_counts().items()):
+                print('%s was put off %d times' % (name, count))
         self.enable_camera_logging = True
         self.drive.disable_camera_tracking()
+        self.intake.save_calibration()
 
     def teleopInit(self):
         """Do when teleoperated mode is started."""
+        self.recorder.start('teleop')
+        self.loop_timer.reset()
+        self.sensors.next_tick()
         self.drive.reset_drive_encoders()
         self.sd.putValue('startTheTimer', True)
         self.intake.target_position = None
@@ -94,60 +315,21 @@ class MyRobot(magicbot.MagicRobot):
         self.drive.disable_camera_tracking()
         self.enable_camera_logging = False
 
+    def _align_to_tower(self):
+        self.drive.enable_camera_tracking()
+        self.drive.align_to_tower()
+
     def teleopPeriodic(self):
         """Do periodically while robot is in teleoperated mode."""
+        start = self.loop_timer.start()
 
         self.drive.move(-self.joystick1.getY(), self.joystick2.getX())
+        self.bindings.update()
 
-        if self.reverseButton.get():
-            self.drive.switch_direction()
-
-        if self.joystick2.getRawButton(5):
-            self.intake.outtake()
-        elif self.joystick2.getRawButton(4):
-            self.intake.intake()
-
-        if self.shoot.get():
-            self.shootBall.shoot()
-
-        """There's two sets of arm buttons. The first automatically raises and lowers the arm the proper amount, whereas the second will let you manually raise and lower it more precise amounts."""
-        if self.raiseButton.get():
-            self.intake.raise_arm()
-        elif self.lowerButton.get():
-            self.intake.lower_arm()
-
-        if self.joystick1.getRawButton(3):
-            self.intake.set_manual(-1)
-        if self.joystick1.getRawButton(2):
-            self.intake.set_manual(1)
-
-        lightButton = False
-        uiButton = self.sd.getValue('LightBulb', False)
-        if uiButton != self.lastState:
-            lightButton = True
-        self.lastState = uiButton
-        if (self.lightButton.get() or lightButton) and self.turningOffState == 0:
-            self.lightSwitch.switch()
-        if self.joystick1.getRawButton(5) or self.auto_aim_button:
+        if self.auto_aim_button:
             self.targetGoal.target()
 
-
-        if self.joystick1.getRawButton(7):
-            self.winch.deploy_winch()
-        if self.joystick1.getRawButton(8):
-            self.winch.winch()
-
-        if self.joystick1.getRawButton(9) and self.drive.isTheRobotBackwards:
-            self.drive.move(.5, 0)
-
-        if not self.ds.isFMSAttached():
-            if self.joystick1.getRawButton(10):
-                self.drive.angle_rotation(35)
-            elif self.joystick1.getRawButton(9): # Could be problematic if robot is backwards
-                self.drive.angle_rotation(0)
-            elif self.joystick2.getRawButton(10):
-                self.drive.enable_camera_tracking()
-                self.drive.align_to_tower()
+        self.loop_timer.stop('teleopPeriodic', start)
 
 if __name__ == '__main__':
     wpilib.run(MyRobot)
@@ -0,0 +1,4 @@
+"""
+    Tools for running the robot code in simulation without the pyfrc GUI.
+    ``config.json`` in this directory is still the pyfrc simulator config.
+"""
@@ -0,0 +1,475 @@
+"""
+    Simulates thousands of slightly different robots at once with NumPy, to
+    see how often an autonomous mode works when the motors, gyro and
+    encoders aren't quite what the code expects.
+
+    The robot code itself can only run one robot at a time, so autonomous
+    modes are described here as plans: lists of the same drive, rotate and
+    arm moves the modes make, run by vectorized copies of the controllers
+    in Drive and Arm. From the robot directory::
+
+        python -m sim.batch LowBar 5000 Drive_Distance=17
+
+    The controller settings are read from Drive and Arm, and the speeds of
+    the drivetrain and arm from physics.py, but the plans are written by
+    hand. Each one says which revision of its mode it follows,
+    and tests/batch_test.py fails when the mode changes, so the plan gets
+    looked at again.
+"""
+
+import hashlib
+import inspect
+import math
+import sys
+
+import numpy as np
+
+import physics
+from common import motionProfile
+
+_defaults = None
+
+
+def defaults():
+    """
+        :returns: The settings the plans and controllers use, from the
+                  SmartDashboard defaults in Drive and Arm and the loop
+                  period of MyRobot, so they can't get out of step
+    """
+    global _defaults
+    if _defaults is None:
+        from components import drive, intake
+        from robot import MyRobot
+
+        d = drive.Drive()
+        a = intake.Arm()
+        _defaults = {
+            'dt': MyRobot.control_loop_wait_time,
+            'ticks_per_inch': d._get_inches_to_ticks(1),
+
+            'full_speed': d.profile_full_speed.value,
+            'max_accel': d.profile_max_accel.value,
+            'kA': d.profile_kA.value,
+            'profile_P': d.profile_P.value,
+            'profile_tolerance': d.profile_tolerance.value,
+            'profile_min_output': d.profile_min_output.value,
+            'profile_timeout': d.profile_timeout.value,
+
+            'angle_P': d.angle_P.value,
+            'angle_D': d.angle_D.value,
+            'angle_slew': d.angle_pid.slew_rate,
+            'rotate_max': d.rotate_max.value,
+            'angle_tolerance': d.angle_pid.tolerance,
+            'settle_rate': d.angle_settle_rate.value,
+            'hold_time': d.angle_hold_time.value,
+
+            'arm_bottom': a.positions[0].value,
+            'arm_middle': a.positions[1].value,
+            'arm_top': a.positions[2].value,
+            'arm_threshold': a.position_threshold.value,
+        }
+    return _defaults
+
+
+class BatchRobot:
+    """
+        N copies of the drivetrain and arm, each with its own random motor
+        gains, drift, encoder noise and gyro bias. Positions are in inches,
+        x forward and y right of where the robot started, and headings are
+        clockwise, like the odometry in Drive.
+    """
+
+    #: Inches per second at full output, from physics.py
+    full_speed = physics.TOP_SPEED / .0254
+    wheelbase = physics.WHEELBASE * 12
+
+    #: Arm encoder ticks per second at full output, from physics.py
+    arm_speed = physics.ARM_FREE_SPEED * physics.ARM_TICKS_PER_RAD
+    arm_travel = physics.ARM_TRAVEL
+
+    def __init__(self, n, ticks_per_inch, seed=None, gain_spread=.03, drift=-.004, drift_spread=.01,
+                 encoder_noise=2, gyro_bias_spread=.2, arm_spread=.1):
+        """
+            :param ticks_per_inch: Drive encoder ticks per inch
+            :param gain_spread: Standard deviation of each side's motor gain (1 is perfect)
+            :param drift: Mean turn while driving, in radians per second
+            :param drift_spread: Standard deviation of the drift
+            :param encoder_noise: Standard deviation of the encoder reading, in ticks
+            :param gyro_bias_spread: Standard deviation of the gyro bias, in degrees per second
+            :param arm_spread: Standard deviation of the arm speed (1 is perfect)
+        """
+        self.n = n
+        self.ticks_per_inch = ticks_per_inch
+        self.rng = rng = np.random.RandomState(seed)
+
+        self.left_gain = rng.normal(1, gain_spread, n)
+        self.right_gain = rng.normal(1, gain_spread, n)
+        self.drift = rng.normal(drift, drift_spread, n)
+        self.gyro_bias = rng.normal(0, gyro_bias_spread, n)
+        self.arm_gain = rng.normal(1, arm_spread, n)
+        self.encoder_noise = encoder_noise
+
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.heading = np.zeros(n)
+        self.turn_rate = np.zeros(n)
+        self.left = np.zeros(n)
+        self.gyro_error = np.zeros(n)
+        self.gyro_zero = np.zeros(n)
+        self.arm = np.zeros(n)
+
+    def step(self, forward, rotation, arm_target, dt):
+        """
+            :param forward: Drive.y for each robot, positive is forward
+            :param rotation: Drive.rotation for each robot, positive is clockwise
+            :param arm_target: Arm position for each robot, NaN to leave it alone
+        """
+        left = np.clip(forward + rotation, -1, 1) * self.left_gain * self.full_speed
+        right = np.clip(forward - rotation, -1, 1) * self.right_gain * self.full_speed
+
+        speed = (left + right) / 2
+        turn_rate = (left - right) / self.wheelbase + np.where(np.abs(speed) > 1, self.drift, 0)
+
+        heading = self.heading + turn_rate * dt / 2
+        self.x += speed * dt * np.cos(heading)
+        self.y += speed * dt * np.sin(heading)
+        self.heading += turn_rate * dt
+        self.turn_rate = turn_rate
+
+        self.left += left * dt
+        self.gyro_error += self.gyro_bias * dt
+
+        moving = ~np.isnan(arm_target)
+        limit = self.arm_speed * self.arm_gain * dt
+        arm_step = np.clip(np.where(moving, arm_target, self.arm) - self.arm, -limit, limit)
+        self.arm = np.clip(self.arm + arm_step, 0, self.arm_travel)
+
+    def encoder(self):
+        """:returns: Left drive encoder, in ticks"""
+        return self.left * self.ticks_per_inch + self.rng.normal(0, self.encoder_noise, self.n)
+
+    def yaw(self):
+        """:returns: What the navX would read, in degrees"""
+        yaw = np.degrees(self.heading) + self.gyro_error - self.gyro_zero
+        return (yaw + 180) % 360 - 180
+
+    def yaw_rate(self):
+        """:returns: Like Sensors' yaw_rate, in degrees per second"""
+        return np.degrees(self.turn_rate) + self.gyro_bias
+
+    def reset_gyro(self, mask):
+        self.gyro_zero = np.where(mask, np.degrees(self.heading) + self.gyro_error, self.gyro_zero)
+
+
+#
+# Plan steps. Each one is a dict, with a timeout like a timed_state
+#
+
+def drive(inches, max_speed=.9, timeout=None):
+    """Drive.drive_distance, from wherever the robot is when the step starts"""
+    return {'kind': 'drive', 'inches': inches, 'max_speed': max_speed, 'timeout': timeout}
+
+
+def rotate(angle, timeout=None):
+    """Drive.angle_rotation, to an angle relative to the last gyro reset"""
+    return {'kind': 'rotate', 'angle': angle, 'timeout': timeout}
+
+
+def arm(position, wait=True, lead=0, timeout=None):
+    """
+        Arm.set_target_position
+
+        :param position: 'bottom', 'middle', 'top' or encoder ticks
+        :param wait: Wait for the arm to be on target, otherwise the next
+                     step starts right away while the arm keeps moving
+        :param lead: Go on this many seconds before the arm gets there,
+                     like Arm.will_be_on_target
+    """
+    return {'kind': 'arm', 'position': position, 'wait': wait, 'lead': lead, 'timeout': timeout}
+
+
+def reset_gyro():
+    return {'kind': 'reset_gyro', 'timeout': None}
+
+
+def move(forward, rotation, duration):
+    """Drive.move for a while"""
+    return {'kind': 'move', 'forward': forward, 'rotation': rotation, 'timeout': duration}
+
+
+def _sample_profile(profile, t):
+    """Vectorized TrapezoidalProfile.sample()"""
+    a = profile.max_acceleration
+    d = profile.direction
+    t = np.clip(t, 0, profile.total_time)
+    left = profile.total_time - t
+
+    accelerating = t < profile.accel_time
+    cruising = t < profile.cruise_end
+
+    position = np.where(accelerating, .5 * a * t * t,
+                        np.where(cruising, profile.accel_distance + profile.max_velocity * (t - profile.accel_time),
+                                 abs(profile.distance) - .5 * a * left * left))
+    velocity = np.where(accelerating, a * t, np.where(cruising, profile.max_velocity, a * left))
+    acceleration = np.where(accelerating, a, np.where(cruising | (left <= 0), 0, -a))
+    return d * position, d * velocity, d * acceleration
+
+
+class BatchResult:
+
+    def __init__(self, robot, completion_time, last_step):
+        #: When each robot finished the plan, NaN if it didn't
+        self.completion_time = completion_time
+        #: Index of the step each robot ended up in
+        self.last_step = last_step
+        self.x = robot.x
+        self.y = robot.y
+        self.heading = np.degrees(robot.heading)
+
+    @property
+    def success(self):
+        return ~np.isnan(self.completion_time)
+
+    def summary(self):
+        success = self.success
+        done = self.completion_time[success]
+        lines = ['%d robots, %.1f%% finished' % (len(success), 100 * success.mean())]
+        if len(done):
+            lines.append('Finish time: median %.2fs, 90%% %.2fs, worst %.2fs' %
+                         (np.median(done), np.percentile(done, 90), done.max()))
+        lines.append('Final x: %.1f +/- %.1f in, y: %.1f +/- %.1f in, heading: %.1f +/- %.1f deg' %
+                     (self.x.mean(), self.x.std(), self.y.mean(), self.y.std(),
+                      self.heading.mean(), self.heading.std()))
+        return '\n'.join(lines)
+
+
+def run_plan(plan, n=1000, length=15, seed=None, gains=None, **noise):
+    """
+        Runs a plan on n randomized robots at once.
+
+        :param plan: List of steps (drive, rotate, arm, reset_gyro, move)
+        :param length: Seconds to simulate
+        :param gains: Overrides for defaults(), including the loop period dt
+        :param noise: Passed to BatchRobot
+        :rtype: BatchResult
+    """
+    g = dict(defaults(), **(gains or {}))
+    dt = g['dt']
+    robot = BatchRobot(n, g['ticks_per_inch'], seed, **noise)
+
+    # Profiles are the same for every robot, so only work them out once
+    profiles = {}
+    for i, step in enumerate(plan):
+        if step['kind'] == 'drive':
+            profiles[i] = motionProfile.TrapezoidalProfile(step['inches'], g['full_speed'] * step['max_speed'],
+                                                           g['max_accel'])
+
+    step_index = np.zeros(n, dtype=int)
+    step_start = np.zeros(n)
+    start_position = np.zeros(n)
+    # When each robot came into tolerance on a rotate, NaN while it's out
+    settled_since = np.full(n, np.nan)
+    rotation_output = np.zeros(n)
+    arm_target = np.full(n, np.nan)
+    completion_time = np.full(n, np.nan)
+
+    for tick in range(int(round(length / dt))):
+        now = tick * dt
+        forward = np.zeros(n)
+        rotation = np.zeros(n)
+
+        # Like next_state(), a change of step takes effect on the next loop
+        current = step_index.copy()
+        encoder = robot.encoder()
+        position = (encoder - start_position) / robot.ticks_per_inch
+        yaw = robot.yaw()
+        state_tm = now - step_start
+
+        for i, step in enumerate(plan):
+            mask = current == i
+            if not mask.any():
+                continue
+
+            kind = step['kind']
+            if kind == 'drive':
+                profile = profiles[i]
+                setpoint, velocity, acceleration = _sample_profile(profile, state_tm)
+                error = setpoint - position
+                out = velocity / g['full_speed'] + acceleration * g['kA'] + error * g['profile_P']
+
+                over = state_tm >= profile.total_time
+                min_output = g['profile_min_output']
+                out = np.where(over & (np.abs(out) < min_output), np.copysign(min_output, error), out)
+
+                limit = step['max_speed']
+                forward = np.where(mask, np.clip(out, -limit, limit), forward)
+                done = over & (np.abs(step['inches'] - position) < g['profile_tolerance']) | \
+                    (state_tm >= profile.total_time + g['profile_timeout'])
+
+            elif kind == 'rotate':
+                error = (step['angle'] - yaw + 180) % 360 - 180
+                rate = robot.yaw_rate()
+                out = np.clip(g['angle_P'] * error - g['angle_D'] * rate, -g['rotate_max'], g['rotate_max'])
+                slew = g['angle_slew'] * dt
+                out = np.clip(out, rotation_output - slew, rotation_output + slew)
+                rotation_output = np.where(mask, out, rotation_output)
+
+                in_tolerance = (np.abs(error) <= g['angle_tolerance']) & (np.abs(rate) <= g['settle_rate'])
+                came_in = mask & in_tolerance & np.isnan(settled_since)
+                settled_since = np.where(came_in, now, settled_since)
+                settled_since = np.where(mask & ~in_tolerance, np.nan, settled_since)
+                with np.errstate(invalid='ignore'):
+                    done = now - settled_since >= g['hold_time']
+                rotation = np.where(mask & ~done, out, rotation)
+
+            elif kind == 'arm':
+                target = step['position']
+                if isinstance(target, str):
+                    target = g['arm_' + target]
+                arm_target = np.where(mask, target, arm_target)
+                if not step['wait']:
+                    done = np.ones(n, dtype=bool)
+                else:
+                    lead = step['lead'] * robot.arm_speed
+                    done = np.abs(robot.arm - target) < g['arm_threshold'] + lead
+                    if target >= robot.arm_travel:
+                        done |= robot.arm >= robot.arm_travel
+                    elif target <= 0:
+                        done |= robot.arm <= 0
+
+            elif kind == 'reset_gyro':
+                robot.reset_gyro(mask)
+                done = np.ones(n, dtype=bool)
+
+            elif kind == 'move':
+                forward = np.where(mask, step['forward'], forward)
+                rotation = np.where(mask, step['rotation'], rotation)
+                done = np.zeros(n, dtype=bool)
+
+            else:
+                raise ValueError("Unknown plan step %s" % kind)
+
+            if step['timeout'] is not None:
+                done = done | (state_tm >= step['timeout'])
+
+            advance = mask & done
+            if advance.any():
+                step_index[advance] += 1
+                step_start[advance] = now
+                start_position[advance] = encoder[advance]
+                settled_since[advance] = np.nan
+                rotation_output[advance] = 0
+
+        finished = (step_index >= len(plan)) & np.isnan(completion_time)
+        completion_time[finished] = now
+
+        robot.step(forward, rotation, arm_target, dt)
+
+    return BatchResult(robot, completion_time, step_index)
+
+
+#
+# Plans for the autonomous modes, with the same defaults as their tunables
+#
+
+def mode_revision(mode_class):
+    """
+        :returns: A short hash of the source of the mode and the autonomous
+                  classes it's built from, which changes whenever they do
+    """
+    source = ''.join(inspect.getsource(cls) for cls in mode_class.__mro__
+                     if cls.__module__.startswith('autonomous.'))
+    return hashlib.sha1(source.encode()).hexdigest()[:10]
+
+
+def mode_states(mode_class):
+    """:returns: Names of the states in a StatefulAutonomous mode"""
+    return sorted(name for name in dir(mode_class)
+                  if not name.startswith('__') and hasattr(getattr(mode_class, name), 'first'))
+
+
+def models(mode, revision, states):
+    """
+        Says which mode a plan follows
+
+        :param mode: 'module.Class' in the autonomous package
+        :param revision: mode_revision() of the mode when the plan was written
+        :param states: The states of the mode the plan goes through, in order
+    """
+    def decorator(plan):
+        plan.mode = mode
+        plan.revision = revision
+        plan.states = states
+        return plan
+    return decorator
+
+
+@models('LowBar.LowBar', '2872183d64', ('drive_forward', 'rotate', 'drive_to_ramp', 'shoot'))
+def lowbar_plan(Drive_Distance=18, Rotate_Angle=46, Ramp_Distance=6, Max_Drive_Speed=.5):
+    """LowBar.LowBar"""
+    return [
+        # drive_forward: the drive starts once the arm is nearly down
+        arm('bottom', lead=.5, timeout=1),
+        drive(Drive_Distance * 12, Max_Drive_Speed),
+        # rotate
+        arm('top', wait=False),
+        rotate(Rotate_Angle),
+        # drive_to_ramp: the arm goes to the middle on the way
+        arm('middle', wait=False),
+        drive(Ramp_Distance * 12, Max_Drive_Speed),
+    ]
+
+
+@models('ModularAutonomous.ModularAutonomous', 'a1c53d0992',
+        ('startModularAutonomous', 'LowBarStart', 'lower_arm', 'drive_forward', 'transition',
+         'rotate', 'drive_to_position', 'rotate_back'))
+def modular_plan(Drive_Distance=17.8, robotPosition=3, opposite=120):
+    """ModularAutonomous through the low bar, without path following"""
+    angleConst = 1 if robotPosition == 3 else -1
+    return [
+        reset_gyro(),
+        arm('bottom', lead=.5, timeout=1),
+        drive(Drive_Distance * 12),
+        rotate(math.degrees(math.atan(opposite / 50)) * angleConst),
+        drive(math.sqrt(2500 + opposite ** 2)),
+        rotate(-45 * angleConst),
+    ]
+
+
+@models('GenericAutonomous.Charge', '6a1850e2cd', ('E0Start',))
+def charge_plan():
+    """GenericAutonomous.Charge"""
+    return [move(1, 0, 1.75)]
+
+
+PLANS = {
+    'LowBar': lowbar_plan,
+    'Modular_Autonomous': modular_plan,
+    'Charge': charge_plan,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in PLANS:
+        print("Usage: python -m sim.batch {%s} [N] [name=value ...]" % ','.join(sorted(PLANS)))
+        return 1
+
+    # Drive and Arm are made to read their settings, and they need NetworkTables
+    from networktables import NetworkTable
+    NetworkTable.setTestMode()
+
+    n = 1000
+    tunables = {}
+    for arg in sys.argv[2:]:
+        if '=' in arg:
+            name, value = arg.split('=', 1)
+            tunables[name] = float(value)
+        else:
+            n = int(arg)
+
+    result = run_plan(PLANS[sys.argv[1]](**tunables), n)
+    print(result.summary())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
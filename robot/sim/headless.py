@@ -0,0 +1,195 @@
+"""
+    Runs an autonomous mode against physics.py as fast as the CPU allows.
+
+    This uses the same fake clock that pyfrc's unit tests use, so the robot
+    code (and the navX thread) sees exactly the timing it would on the real
+    robot, but nothing ever sleeps. From the robot directory::
+
+        python -m sim.headless Modular_Autonomous robotPosition=3 opposite=100 "Drive/Profile P=.08"
+"""
+
+import ast
+import json
+import math
+import os
+import sys
+
+ROBOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROBOT_PATH not in sys.path:
+    sys.path.insert(0, ROBOT_PATH)
+
+#: How long autonomous lasts in a match
+AUTONOMOUS_LENGTH = 15
+
+
+class Trace:
+    """What happened during one simulated autonomous run"""
+
+    def __init__(self, mode_name, tunables):
+        self.mode_name = mode_name
+        self.tunables = dict(tunables)
+
+        #: (time, x, y, angle) of the simulated robot on the field. Time is
+        #: seconds since autonomous started, x and y are feet, angle is degrees.
+        self.samples = []
+
+        #: (time, state name) for every state change. None means done() was called.
+        self.states = []
+
+    @property
+    def final_pose(self):
+        return self.samples[-1][1:] if self.samples else None
+
+    @property
+    def last_state(self):
+        return self.states[-1][1] if self.states else None
+
+    def time_entered(self, state_name):
+        """:returns: When the mode first entered that state, or None if it never did"""
+        for tm, name in self.states:
+            if name == state_name:
+                return tm
+        return None
+
+
+def _load_config():
+    with open(os.path.join(ROBOT_PATH, 'sim', 'config.json')) as fp:
+        return json.load(fp)
+
+
+def _apply_tunables(mode, tunables):
+    """
+        Each name is looked up as a register_sd_var value of the mode, then as
+        an attribute of the mode (like a magicbot tunable), and otherwise is
+        put on the SmartDashboard as is ('Drive/Profile P', 'robotPosition').
+    """
+    from networktables import NetworkTable
+    sd = NetworkTable.getTable('SmartDashboard')
+
+    for name, value in tunables.items():
+        sd_name = '%s\\%s' % (mode.MODE_NAME, name)
+        if sd.containsKey(sd_name):
+            sd.putValue(sd_name, value)
+        elif '/' not in name and hasattr(mode, name):
+            setattr(mode, name, value)
+        else:
+            sd.putValue(name, value)
+
+
+def run_autonomous(mode_name, tunables=None, length=AUTONOMOUS_LENGTH, robot_class=None, record=False):
+    """
+        Runs one autonomous mode from the start of a match.
+
+        :param mode_name: MODE_NAME of the autonomous mode
+        :param tunables: Values to set before autonomous starts, see _apply_tunables
+        :param length: Seconds of autonomous to simulate
+        :param robot_class: Defaults to MyRobot
+        :param record: Write a match log of the run, like the real robot does
+        :rtype: Trace
+    """
+    if tunables is None:
+        tunables = {}
+
+    # hal has to be imported before hal_impl, like wpilib does, or they
+    # import each other half initialized
+    import hal  # noqa: only imported first
+    import hal_impl.functions
+    from hal_impl import mode_helpers
+    from networktables import NetworkTable
+    from pyfrc import config
+    from pyfrc.physics.core import PhysicsInterface
+    from pyfrc.test_support import fake_time, pyfrc_fake_hooks
+    from pyfrc.test_support.controller import TestController
+
+    # Same setup as pyfrc's test plugin
+    config.mode = 'test'
+    NetworkTable.setTestMode()
+
+    clock = fake_time.FakeTime()
+    clock.set_time_limit(length + 10)
+    hal_impl.functions.hooks = pyfrc_fake_hooks.PyFrcFakeHooks(clock)
+    hal_impl.functions.reset_hal()
+
+    import wpilib
+    import wpilib._impl.utils
+
+    if robot_class is None:
+        from robot import MyRobot as robot_class
+
+    wpilib.RobotBase.initializeHardwareConfiguration()
+    wpilib.DriverStation.getInstance().release()
+    mode_helpers.notify_new_ds_data()
+
+    # The chooser doesn't overwrite a selection that's already there
+    NetworkTable.getTable('SmartDashboard/Autonomous Mode').putString('selected', mode_name)
+
+    control = TestController(clock)
+    robot = control._robot = robot_class()
+    physics = PhysicsInterface(ROBOT_PATH, clock, _load_config())
+
+    trace = Trace(mode_name, tunables)
+    start = [None]
+
+    def on_step(tm):
+        if start[0] is None:
+            # robotInit has run by now, so the modes exist
+            mode = robot._automodes.modes.get(mode_name)
+            if mode is None:
+                raise ValueError("There is no autonomous mode called %s" % mode_name)
+            _apply_tunables(mode, tunables)
+            # Like the unit tests, this doesn't record unless asked to
+            if record:
+                robot.recorder.directory = os.path.join(ROBOT_PATH, 'logs')
+            start[0] = tm
+
+            next_state = mode.next_state
+
+            def record_state(name):
+                trace.states.append((clock.get() - start[0], name))
+                next_state(name)
+
+            mode.next_state = record_state
+
+            physics._set_robot_enabled(True)
+            mode_helpers.set_autonomous(True)
+
+        physics._on_increment_time(tm)
+
+        x, y, angle = physics.get_position()
+        trace.samples.append((tm - start[0], x, y, math.degrees(angle)))
+
+        return tm - start[0] < length
+
+    try:
+        control.run_test(on_step)
+    finally:
+        clock.teardown()
+        wpilib._impl.utils.reset_wpilib()
+        NetworkTable._staticProvider.close()
+        NetworkTable._staticProvider = None
+
+    return trace
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python -m sim.headless MODE_NAME [name=value ...]")
+        return 1
+
+    tunables = {}
+    for arg in sys.argv[2:]:
+        name, value = arg.split('=', 1)
+        try:
+            tunables[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            tunables[name] = value
+
+    trace = run_autonomous(sys.argv[1], tunables)
+
+    for tm, name in trace.states:
+        print('%6.2fs  %s' % (tm, name))
+    print('Final position: x=%.2fft y=%.2fft angle=%.1f' % trace.final_pose)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
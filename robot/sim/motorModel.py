@@ -0,0 +1,78 @@
+"""
+    Simple models of DC motors and the things they drive, for physics.py.
+    Everything is in SI units: volts, amps, newton meters, radians.
+"""
+
+import math
+
+
+class DCMotor:
+    """
+        One or more identical brushed DC motors working together, described
+        by the numbers on their datasheet.
+    """
+
+    def __init__(self, stall_torque, stall_current, free_current, free_speed_rpm, count=1, nominal_voltage=12):
+        self.count = count
+        self.nominal_voltage = nominal_voltage
+        self.free_speed = free_speed_rpm * 2 * math.pi / 60
+
+        self.resistance = nominal_voltage / stall_current
+        self.kt = stall_torque / stall_current
+        # rad/s per volt of back EMF
+        self.kv = self.free_speed / (nominal_voltage - self.resistance * free_current)
+
+    def current(self, voltage, speed):
+        """:returns: Current through each motor at that voltage and motor speed"""
+        return (voltage - speed / self.kv) / self.resistance
+
+    def torque(self, voltage, speed):
+        """:returns: Torque from all of the motors together"""
+        return self.count * self.kt * self.current(voltage, speed)
+
+
+def cim(count=1):
+    return DCMotor(2.42, 133, 2.7, 5310, count)
+
+
+def pro775(count=1):
+    return DCMotor(.71, 134, .7, 18730, count)
+
+
+class GearedMechanism:
+    """
+        A motor turning a load through a gearbox. position and velocity are
+        of the output shaft. Call step() with a small fixed dt; semi-implicit
+        Euler is only stable while dt is well under the time constant.
+    """
+
+    def __init__(self, motor, gearing, inertia, friction=0):
+        """
+            :param gearing: Motor turns per output turn
+            :param inertia: Of the load at the output shaft, in kg*m^2
+            :param friction: Viscous friction at the output, in N*m per rad/s
+        """
+        self.motor = motor
+        self.gearing = gearing
+        self.inertia = inertia
+        self.friction = friction
+
+        self.position = 0.0
+        self.velocity = 0.0
+
+    @property
+    def time_constant(self):
+        """Seconds for the speed to get ~63% of the way to a new steady state"""
+        m = self.motor
+        return self.inertia * m.resistance * m.kv / (m.count * m.kt * self.gearing ** 2)
+
+    def step(self, voltage, dt, load_torque=0):
+        """
+            :param voltage: Applied to the motors
+            :param load_torque: Any other torque on the output, like gravity
+        """
+        torque = self.motor.torque(voltage, self.velocity * self.gearing) * self.gearing
+        torque += load_torque - self.friction * self.velocity
+
+        self.velocity += torque / self.inertia * dt
+        self.position += self.velocity * dt
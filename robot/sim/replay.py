@@ -0,0 +1,166 @@
+"""
+    Replays a teleop match log from the robot through MyRobot.teleopPeriodic
+    and the components, as fast as the CPU allows, and compares what the
+    code does now with what the motors did in the match. From the robot
+    directory::
+
+        python -m sim.replay logs/20160315-101500-teleop.matchlog
+
+    Joysticks and sensors come from the log. Anything the code reads from
+    NetworkTables (dashboard buttons, the camera) isn't recorded, so code
+    that depends on it may not replay exactly.
+"""
+
+import sys
+
+from common import matchRecorder, sensors
+from . import headless  # noqa: sets up the path to the robot code
+
+
+class _ReplayTime:
+    """Stands in for pyfrc's FakeTime: time only moves when the replay says so"""
+
+    def __init__(self):
+        self.time = 0
+
+    def get(self):
+        return self.time
+
+    def increment_time_by(self, time):
+        self.time += time
+
+
+class ReplayResult:
+
+    def __init__(self, outputs):
+        #: Names of the outputs in each tuple
+        self.outputs = outputs
+        #: Per loop, what the motors were set to in the match
+        self.recorded = []
+        #: Per loop, what they were set to in the replay
+        self.replayed = []
+
+    def differences(self, tolerance=1e-6):
+        """:returns: (loop, output name, recorded, replayed) wherever they differ"""
+        differences = []
+        for tick, (recorded, replayed) in enumerate(zip(self.recorded, self.replayed)):
+            for name, a, b in zip(self.outputs, recorded, replayed):
+                if abs(a - b) > tolerance:
+                    differences.append((tick, name, a, b))
+        return differences
+
+
+def _hal_axis(value):
+    """The joystick value the HAL needs so that the code reads back exactly value"""
+    raw = round(value * (127 if value > 0 else 128))
+    return raw / 128
+
+
+def _snapshot(record):
+    snapshot = sensors.SensorSnapshot()
+    for name in sensors.SensorSnapshot.__slots__:
+        setattr(snapshot, name, record[name])
+    return snapshot
+
+
+def replay(path, robot_class=None):
+    """
+        :param path: A teleop .matchlog
+        :param robot_class: Defaults to MyRobot
+        :rtype: ReplayResult
+    """
+    log = matchRecorder.MatchLog(path)
+    if log.mode != 'teleop':
+        raise ValueError("Only teleop logs can be replayed, %s is %s" % (path, log.mode))
+
+    import hal_impl.functions
+    from hal_impl import mode_helpers
+    from hal_impl.data import hal_data
+    from networktables import NetworkTable
+    from pyfrc import config
+    from pyfrc.test_support import pyfrc_fake_hooks
+
+    config.mode = 'test'
+    NetworkTable.setTestMode()
+
+    clock = _ReplayTime()
+    hal_impl.functions.hooks = pyfrc_fake_hooks.PyFrcFakeHooks(clock)
+    hal_impl.functions.reset_hal()
+
+    import wpilib
+    import wpilib._impl.utils
+
+    if robot_class is None:
+        from robot import MyRobot as robot_class
+
+    wpilib.RobotBase.initializeHardwareConfiguration()
+    ds = wpilib.DriverStation.getInstance()
+    ds.release()
+    mode_helpers.notify_new_ds_data()
+
+    outputs = matchRecorder.OUTPUTS + ('arm_control_mode',)
+    result = ReplayResult(outputs)
+
+    try:
+        robot = robot_class()
+        robot.robotInit()
+        robot.recorder.directory = None
+
+        joystick_count = len(robot.recorder.joysticks)
+        motors = [getattr(robot, name) for name in matchRecorder.OUTPUTS]
+
+        current = [None]
+        robot.sensors.source = lambda: _snapshot(current[0])
+
+        mode_helpers.set_teleop_mode(True)
+
+        for tick, record in enumerate(log):
+            current[0] = record
+            clock.time = record['timestamp']
+
+            for stick in range(joystick_count):
+                data = hal_data['joysticks'][stick]
+                for axis in range(matchRecorder.JOYSTICK_AXES):
+                    data['axes'][axis] = _hal_axis(record['joystick%d_axis%d' % (stick, axis)])
+
+                buttons = record['joystick%d_buttons' % stick]
+                data['buttons'] = [None] + [bool(buttons >> i & 1) for i in range(12)]
+            ds.getData()
+
+            # Same order as MyRobot.operatorControl
+            if tick == 0:
+                robot._on_mode_enable_components()
+                robot.teleopInit()
+
+            # Every loop started on time, as far as the scheduler knows
+            robot.scheduler.next_time = clock.time
+
+            robot.teleopPeriodic()
+            robot._execute_components()
+
+            result.recorded.append(tuple(record[name] for name in outputs))
+            result.replayed.append(tuple(m.last_output() for m in motors) + (robot.leftArm.getControlMode(),))
+    finally:
+        log.close()
+        wpilib._impl.utils.reset_wpilib()
+        NetworkTable._staticProvider.close()
+        NetworkTable._staticProvider = None
+
+    return result
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python -m sim.replay LOGFILE")
+        return 1
+
+    result = replay(sys.argv[1])
+    differences = result.differences()
+
+    print('%d loops replayed, %d outputs differ' % (len(result.recorded), len(differences)))
+    for tick, name, recorded, replayed in differences[:20]:
+        print('  loop %5d  %-12s match %8.3f  replay %8.3f' % (tick, name, recorded, replayed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+    Runs an autonomous mode in the headless simulator over lots of tunable
+    values at once, one simulation per process, and ranks the results.
+
+    From the robot directory, try every combination of a grid::
+
+        python -m sim.sweep Modular_Autonomous target robotPosition=3 opposite=80,100,120 Ramp_Distance=4,6,8
+
+    or 200 random picks from ranges::
+
+        python -m sim.sweep LowBar target --random 200 Drive_Distance=15:20 Rotate_Angle=45:65
+"""
+
+import argparse
+import ast
+import collections
+import itertools
+import math
+import multiprocessing
+import random
+import sys
+
+from . import headless
+
+Result = collections.namedtuple('Result', [
+    'tunables',
+    'completion_time',  # When the mode got to end_state, or None
+    'finished',         # True if that was within autonomous
+    'pose_error',       # Feet between the final position and the target, or None
+    'last_state',
+    'error',            # The exception, if the simulation blew up
+])
+
+
+def grid(space):
+    """
+        :param space: {name: [values]}
+        :returns: Every combination, as tunables dicts
+    """
+    names = sorted(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_sample(space, count, seed=None):
+    """
+        :param space: {name: (low, high) or [values]}. Ranges of ints pick
+                      ints, other ranges pick floats.
+        :returns: count random tunables dicts
+    """
+    rng = random.Random(seed)
+    names = sorted(space)
+    for _ in range(count):
+        tunables = {}
+        for name in names:
+            choices = space[name]
+            if isinstance(choices, tuple):
+                low, high = choices
+                if isinstance(low, int) and isinstance(high, int):
+                    tunables[name] = rng.randint(low, high)
+                else:
+                    tunables[name] = rng.uniform(low, high)
+            else:
+                tunables[name] = rng.choice(choices)
+        yield tunables
+
+
+def _run(job):
+    mode_name, end_state, target, tunables = job
+
+    try:
+        trace = headless.run_autonomous(mode_name, tunables)
+    except Exception as e:
+        return Result(tunables, None, False, None, None, repr(e))
+
+    completion_time = trace.time_entered(end_state)
+    finished = completion_time is not None and completion_time <= headless.AUTONOMOUS_LENGTH
+
+    pose_error = None
+    if target is not None and trace.final_pose is not None:
+        x, y, _ = trace.final_pose
+        pose_error = math.hypot(x - target[0], y - target[1])
+
+    return Result(tunables, completion_time, finished, pose_error, trace.last_state, None)
+
+
+def rank(results):
+    """Best first: finished runs before unfinished ones, then fastest, then closest"""
+    def key(r):
+        return (not r.finished,
+                r.completion_time if r.completion_time is not None else math.inf,
+                r.pose_error if r.pose_error is not None else math.inf)
+    return sorted(results, key=key)
+
+
+def sweep(mode_name, end_state, configurations, target=None, processes=None, fixed=None):
+    """
+        :param mode_name: MODE_NAME of the autonomous mode
+        :param end_state: The state that means the mode got where it was going
+        :param configurations: Iterable of tunables dicts, see grid() and random_sample()
+        :param target: (x, y) on the field in feet to measure the final position against
+        :param processes: Defaults to one per core
+        :param fixed: Tunables that are the same for every run
+        :returns: Results, best first
+    """
+    jobs = []
+    for tunables in configurations:
+        if fixed:
+            tunables = dict(fixed, **tunables)
+        jobs.append((mode_name, end_state, target, tunables))
+
+    # wpilib is full of global state, so every simulation gets a fresh process
+    with multiprocessing.Pool(processes, maxtasksperchild=1) as pool:
+        results = list(pool.imap_unordered(_run, jobs))
+
+    return rank(results)
+
+
+def _parse_value(value):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('mode_name')
+    parser.add_argument('end_state')
+    parser.add_argument('tunables', nargs='+',
+                        help='name=a,b,c to try each value, name=low:high for a range, name=a to fix it')
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help='Run N random picks instead of the whole grid')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--target', default=None, metavar='X,Y',
+                        help='Field position in feet that the robot should end up at')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    space = {}
+    fixed = {}
+    for arg in args.tunables:
+        name, value = arg.split('=', 1)
+        if ':' in value:
+            low, high = value.split(':')
+            space[name] = (_parse_value(low), _parse_value(high))
+        elif ',' in value:
+            space[name] = [_parse_value(v) for v in value.split(',')]
+        else:
+            fixed[name] = _parse_value(value)
+
+    if args.random is not None:
+        configurations = random_sample(space, args.random, args.seed)
+    else:
+        if any(isinstance(v, tuple) for v in space.values()):
+            parser.error('Ranges need --random')
+        configurations = grid(space)
+
+    target = None
+    if args.target is not None:
+        target = tuple(float(v) for v in args.target.split(','))
+
+    results = sweep(args.mode_name, args.end_state, configurations, target, args.processes, fixed)
+
+    finished = sum(1 for r in results if r.finished)
+    print('%d runs, %d finished in time' % (len(results), finished))
+
+    for r in results[:args.top]:
+        if r.error is not None:
+            print('  ERROR %s  %s' % (r.error, r.tunables))
+            continue
+
+        completion = '%6.2fs' % r.completion_time if r.completion_time is not None else '   ---'
+        pose_error = '%5.2fft' % r.pose_error if r.pose_error is not None else '   ---'
+        print('  %s  %s  %-20s %s' % (completion, pose_error, r.last_state, r.tunables))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
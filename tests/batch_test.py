@@ -0,0 +1,38 @@
+import importlib
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from sim import batch
+
+
+def mode_class(plan):
+    module, name = plan.mode.rsplit('.', 1)
+    return getattr(importlib.import_module('autonomous.' + module), name)
+
+
+@pytest.mark.parametrize('name', sorted(batch.PLANS))
+def test_plan_is_up_to_date(name):
+    plan = batch.PLANS[name]
+    mode = mode_class(plan)
+
+    missing = set(plan.states) - set(batch.mode_states(mode))
+    assert not missing, "%s no longer has the states %s" % (plan.mode, ', '.join(sorted(missing)))
+
+    revision = batch.mode_revision(mode)
+    assert revision == plan.revision, \
+        "%s has changed since %s was written. Make the plan do what the mode does now, " \
+        "then set its revision to '%s'." % (plan.mode, plan.__name__, revision)
+
+
+@pytest.mark.parametrize('name', sorted(batch.PLANS))
+def test_plan_finishes(name):
+    result = batch.run_plan(batch.PLANS[name](), n=50, seed=1)
+    assert result.success.all()
+
+
+def test_loop_period_comes_from_the_robot():
+    from robot import MyRobot
+
+    assert batch.defaults()['dt'] == MyRobot.control_loop_wait_time
@@ -0,0 +1,30 @@
+import time
+
+from common.calibrationStore import CalibrationStore
+
+
+def test_saved_across_restarts(tmpdir):
+    path = str(tmpdir.join('calibration.json'))
+
+    store = CalibrationStore(path)
+    assert store.get('arm') is None
+    store.put('arm', {'position': 10, 'analog': 500})
+
+    saved = CalibrationStore(path).get('arm')
+    assert saved['position'] == 10
+    assert saved['analog'] == 500
+    assert abs(saved['time'] - time.time()) < 5
+
+
+def test_keeps_when_it_was_calibrated(tmpdir):
+    store = CalibrationStore(str(tmpdir.join('calibration.json')))
+
+    store.put('arm', {'position': 10}, 1000)
+    assert store.get('arm')['time'] == 1000
+
+
+def test_bad_file(tmpdir):
+    path = tmpdir.join('calibration.json')
+    path.write('{not json')
+
+    assert CalibrationStore(str(path)).get('arm') is None
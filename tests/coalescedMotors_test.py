@@ -0,0 +1,128 @@
+import pytest
+import wpilib
+
+from common import coalescedMotors
+
+
+class Clock:
+    def __init__(self):
+        self.time = 10
+
+    def now(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(clock.now))
+    return clock
+
+
+@pytest.fixture
+def sets(monkeypatch):
+    """Every set() that gets through to the CANTalon and Talon"""
+    sets = []
+    for cls in (wpilib.CANTalon, wpilib.Talon):
+        original = cls.set
+        monkeypatch.setattr(cls, 'set', lambda self, value, syncGroup=0, original=original:
+                            (sets.append(value), original(self, value, syncGroup)))
+    return sets
+
+
+def test_unchanged_set_is_skipped(clock, sets):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+
+    talon.set(.5)
+    talon.set(.5)
+    talon.set(.25)
+
+    assert sets == [.5, .25]
+    assert talon.suppressed_sets == 1
+    assert talon.last_output() == .25
+    # Skipped sets don't save a CAN frame
+    assert talon.suppressed_frames == 0
+
+
+def test_unchanged_set_is_resent_after_keepalive(clock, sets):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+
+    talon.set(.5)
+    clock.time += .03
+    talon.set(.5)
+    clock.time += .03
+    talon.set(.5)
+
+    # Counted from the last time it was sent
+    assert sets == [.5, .5]
+    assert talon.suppressed_sets == 1
+
+
+def test_control_mode(clock, sets):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+    talon.changeControlMode(wpilib.CANTalon.ControlMode.Position)
+    talon.set(.5)
+    assert talon.suppressed_sets == 0
+
+    talon.changeControlMode(wpilib.CANTalon.ControlMode.Position)
+    assert talon.suppressed_sets == 1
+
+    # A new mode disables the Talon until the next set, so that set goes
+    # out even though the value is the same
+    talon.changeControlMode(wpilib.CANTalon.ControlMode.PercentVbus)
+    talon.set(.5)
+    assert sets == [.5, .5]
+
+
+def test_stop_forgets_the_last_output(clock, sets):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+
+    talon.set(.5)
+    talon.stopMotor()
+    assert talon.last_output() == 0
+
+    talon.set(.5)
+    assert sets == [.5, .5]
+
+
+def test_pid(clock):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+
+    talon.setPID(2, 0, 0)
+    talon.setPID(2, 0, 0)
+    assert (talon.sent_frames, talon.suppressed_frames) == (1, 1)
+
+    talon.setPID(3, 0, 0)
+    assert (talon.sent_frames, talon.suppressed_frames) == (2, 1)
+
+    # Resent now and then even if it hasn't changed
+    clock.time += 1
+    talon.setPID(3, 0, 0)
+    assert (talon.sent_frames, talon.suppressed_frames) == (3, 1)
+
+
+def test_set_position_only_skipped_when_the_sensor_reads_it(clock, hal_data):
+    talon = coalescedMotors.CoalescedCANTalon(3)
+
+    talon.setPosition(100)
+    talon.setPosition(100)
+    assert (talon.sent_frames, talon.suppressed_frames) == (1, 1)
+
+    # The sensor moved since it was set, so setting the same value again
+    # isn't a repeat
+    hal_data['CAN'][3]['enc_position'] = 150
+    talon.setPosition(100)
+    assert (talon.sent_frames, talon.suppressed_frames) == (2, 1)
+    assert talon.getPosition() == 100
+
+
+def test_pwm_talon(clock, sets):
+    talon = coalescedMotors.CoalescedTalon(4)
+
+    talon.set(1)
+    talon.set(1)
+    talon.set(-1)
+
+    assert sets == [1, -1]
+    assert talon.suppressed_sets == 1
+    assert talon.last_output() == -1
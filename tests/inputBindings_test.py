@@ -0,0 +1,272 @@
+import json
+
+import pytest
+import wpilib
+from robotpy_ext.control.button_debouncer import ButtonDebouncer
+
+from common import inputBindings
+from common.inputBindings import HELD, PRESSED, RELEASED, TOGGLED, DEBOUNCED
+
+
+class Stick:
+    """Just enough of a Joystick for InputBindings and ButtonDebouncer"""
+
+    def __init__(self, port):
+        self.port = port
+        self.buttons = 0
+
+    def set(self, button, down):
+        if down:
+            self.buttons |= 1 << (button - 1)
+        else:
+            self.buttons &= ~(1 << (button - 1))
+
+    def getRawButton(self, button):
+        return bool(self.buttons & (1 << (button - 1)))
+
+
+class Buttons:
+    def __init__(self, buttons):
+        self.buttons = buttons
+
+
+class DriverStation:
+    def __init__(self, sticks):
+        self.sticks = sticks
+
+    def getStickButtons(self, port):
+        for stick in self.sticks:
+            if stick.port == port:
+                return Buttons(stick.buttons)
+
+
+class Clock:
+    def __init__(self):
+        self.time = 10
+
+    def now(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(clock.now))
+    return clock
+
+
+def make_bindings(table, sticks=None, conditions=None):
+    sticks = sticks or [Stick(0)]
+    calls = []
+    actions = {name: (lambda name=name: calls.append(name)) for name in ('a', 'b', 'c')}
+    bindings = inputBindings.InputBindings(sticks, table, actions, conditions)
+    bindings.ds = DriverStation(sticks)
+    return bindings, sticks, calls
+
+
+def run(bindings, stick, calls, presses, button=1):
+    """Runs one update per entry in presses, and returns which ones fired"""
+    fired = []
+    for down in presses:
+        stick.set(button, down)
+        count = len(calls)
+        bindings.update()
+        fired.append(len(calls) > count)
+    return fired
+
+
+def binding(mode, action='a', button=1, stick=0, **kwargs):
+    spec = {'stick': stick, 'button': button, 'mode': mode, 'action': action}
+    spec.update(kwargs)
+    return spec
+
+
+def fires(mode, presses):
+    bindings, sticks, calls = make_bindings([binding(mode)])
+    return run(bindings, sticks[0], calls, presses)
+
+
+PRESSES = [False, True, True, False, False, True, False]
+
+
+def test_held():
+    assert fires(HELD, PRESSES) == [False, True, True, False, False, True, False]
+
+
+def test_pressed():
+    assert fires(PRESSED, PRESSES) == [False, True, False, False, False, True, False]
+
+
+def test_released():
+    assert fires(RELEASED, PRESSES) == [False, False, False, True, False, False, True]
+
+
+def test_toggled():
+    # On from the first press until the second
+    assert fires(TOGGLED, PRESSES) == [False, True, True, True, True, False, False]
+
+
+def test_debounced_matches_button_debouncer(clock):
+    stick = Stick(0)
+    bindings, sticks, calls = make_bindings([binding(DEBOUNCED)], [stick])
+    debouncer = ButtonDebouncer(stick, 1)
+
+    # Tapped, held through a few periods, released, and tapped again
+    # right away and after a while
+    presses = [True, False] + [True] * 60 + [False, True, False, False] + [False] * 30 + [True]
+
+    expected = []
+    fired = []
+    for down in presses:
+        clock.time += .02
+        stick.set(1, down)
+        expected.append(debouncer.get())
+        count = len(calls)
+        bindings.update()
+        fired.append(len(calls) > count)
+
+    assert fired == expected
+    assert fired.count(True) > 3
+
+
+def test_debounced_period(clock):
+    bindings, sticks, calls = make_bindings([binding(DEBOUNCED, period=.5)])
+
+    fired = []
+    for i in range(12):
+        # Steps that are exact in binary, so it doesn't depend on rounding
+        clock.time += .25
+        fired += run(bindings, sticks[0], calls, [True])
+
+    # Has to be more than the period since the last one
+    assert fired == [True, False, False] * 4
+
+
+def test_group_is_an_elif_chain():
+    stick = Stick(0)
+    bindings, sticks, calls = make_bindings([
+        binding(HELD, 'a', button=1, group='arm'),
+        binding(HELD, 'b', button=2, group='arm'),
+        binding(HELD, 'c', button=2),
+    ], [stick])
+
+    stick.set(2, True)
+    bindings.update()
+    assert calls == ['b', 'c']
+
+    # Only the first one in the group runs, the one outside it still does
+    del calls[:]
+    stick.set(1, True)
+    bindings.update()
+    assert calls == ['a', 'c']
+
+
+def test_group_only_counts_bindings_that_fired(clock):
+    # Like raiseButton.get() / elif lowerButton.get(): a raise that's
+    # debounced away doesn't stop a lower
+    stick = Stick(0)
+    bindings, sticks, calls = make_bindings([
+        binding(DEBOUNCED, 'a', button=3, group='arm'),
+        binding(DEBOUNCED, 'b', button=2, group='arm'),
+    ], [stick])
+
+    stick.set(3, True)
+    bindings.update()
+    assert calls == ['a']
+
+    clock.time += .1
+    stick.set(2, True)
+    bindings.update()
+    assert calls == ['a', 'b']
+
+
+def test_group_skips_later_bindings_entirely(clock):
+    # Suppressed bindings don't see the press either, like a debouncer in
+    # an elif that never has get() called
+    stick = Stick(0)
+    bindings, sticks, calls = make_bindings([
+        binding(HELD, 'a', button=1, group='g'),
+        binding(DEBOUNCED, 'b', button=2, group='g'),
+    ], [stick])
+
+    stick.set(1, True)
+    stick.set(2, True)
+    bindings.update()
+    assert calls == ['a']
+
+    clock.time += .1
+    stick.set(1, False)
+    bindings.update()
+    assert calls == ['a', 'b']
+
+
+def test_when():
+    state = {'allowed': False}
+    stick = Stick(0)
+    bindings, sticks, calls = make_bindings([
+        binding(HELD, 'a', when='allowed', group='g'),
+        binding(HELD, 'b', group='g'),
+    ], [stick], {'allowed': lambda: state['allowed']})
+
+    stick.set(1, True)
+    bindings.update()
+    # The condition stops it firing, so it doesn't hold up the group
+    assert calls == ['b']
+
+    state['allowed'] = True
+    bindings.update()
+    assert calls == ['b', 'a']
+
+
+def test_when_debounced(clock):
+    # Like `if self.lightButton.get() and self.turningOffState == 0`, the
+    # period starts over on a press even if the condition stops it
+    state = {'allowed': False}
+    bindings, sticks, calls = make_bindings([binding(DEBOUNCED, when='allowed')],
+                                            conditions={'allowed': lambda: state['allowed']})
+    stick = sticks[0]
+
+    stick.set(1, True)
+    bindings.update()
+    assert calls == []
+
+    state['allowed'] = True
+    clock.time += .3
+    bindings.update()
+    assert calls == []
+    clock.time += .3
+    bindings.update()
+    assert calls == ['a']
+
+
+def test_two_sticks():
+    sticks = [Stick(0), Stick(1)]
+    bindings, sticks, calls = make_bindings([
+        binding(PRESSED, 'a', stick=0),
+        binding(PRESSED, 'b', stick=1),
+    ], sticks)
+
+    sticks[1].set(1, True)
+    bindings.update()
+    assert calls == ['b']
+
+
+@pytest.mark.parametrize('spec', [
+    binding('sometimes'),
+    binding(HELD, action='d'),
+    binding(HELD, stick=1),
+    binding(HELD, when='never'),
+])
+def test_bad_bindings(spec):
+    with pytest.raises(ValueError):
+        make_bindings([spec])
+
+
+def test_load(tmpdir):
+    default = [binding(HELD)]
+    path = tmpdir.join('bindings.json')
+    assert inputBindings.load(str(path), default) is default
+
+    table = [binding(PRESSED, 'b', button=4)]
+    path.write(json.dumps(table))
+    assert inputBindings.load(str(path), default) == table
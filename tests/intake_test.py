@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from common import calibrationStore
+from components import intake
+
+
+class Snapshot:
+    arm_analog = 100
+
+
+class Sensors:
+    def get(self):
+        return Snapshot()
+
+
+class Talon:
+    def __init__(self, position):
+        self.position = position
+
+    def getEncPosition(self):
+        return self.position
+
+    def setPosition(self, position):
+        self.position = position
+
+
+def make_arm(saved_analog, saved_time):
+    arm = intake.Arm()
+    arm.sensors = Sensors()
+    arm.leftArm = Talon(0)
+    arm.calibration = calibrationStore.CalibrationStore(None)
+    arm.calibration.put('arm', {'position': 2300, 'analog': saved_analog}, saved_time)
+    arm._load_calibration()
+    return arm
+
+
+@pytest.mark.parametrize('saved_time', [
+    time.time() - 60,
+    # The clock wasn't set when it was saved, or isn't now
+    0,
+    time.time() + 365 * 24 * 60 * 60,
+])
+def test_saved_calibration_is_used_when_the_arm_hasnt_moved(saved_time):
+    arm = make_arm(102, saved_time)
+    assert arm.isCalibrated
+    # The Talon lost its position, so the saved one is put back
+    assert arm.leftArm.position == 2300
+
+
+def test_saved_calibration_is_ignored_when_the_arm_has_moved():
+    arm = make_arm(120, time.time() - 60)
+    assert not arm.isCalibrated
+    assert arm.leftArm.position == 0
@@ -0,0 +1,101 @@
+from common import mailbox
+
+
+class Table:
+    """Just enough of a NetworkTable, with the listener called by hand"""
+
+    def __init__(self, values):
+        self.values = values
+        self.listeners = []
+
+    def getValue(self, key, default):
+        return self.values.get(key, default)
+
+    def addTableListener(self, listener, immediateNotify, key):
+        self.listeners.append((key, listener))
+
+    def change(self, key, value):
+        self.values[key] = value
+        for listen_key, listener in self.listeners:
+            if listen_key == key:
+                listener(self, key, value, False)
+
+
+def test_drain_oldest_first():
+    box = mailbox.Mailbox()
+    box.post('a', 1)
+    box.post('b', 2)
+    box.post('a', 3)
+
+    assert [(key, value) for _, key, value in box.drain()] == [('a', 1), ('b', 2), ('a', 3)]
+    # Each message only comes out once
+    assert list(box.drain()) == []
+
+
+def test_messages_posted_while_draining():
+    box = mailbox.Mailbox()
+    box.post('a', 1)
+
+    drained = []
+    for _, key, value in box.drain():
+        drained.append(value)
+        if value == 1:
+            box.post('a', 2)
+
+    assert drained == [1, 2]
+
+
+def test_full_mailbox_drops_the_oldest():
+    box = mailbox.Mailbox(size=3)
+    for i in range(5):
+        box.post('a', i)
+
+    assert [value for _, _, value in box.drain()] == [2, 3, 4]
+
+
+def test_clear():
+    box = mailbox.Mailbox()
+    box.post('a', 1)
+    box.clear()
+    assert list(box.drain()) == []
+
+
+def test_dashboard_inputs_start_with_the_current_value():
+    table = Table({'robotPosition': '3'})
+    inputs = mailbox.DashboardInputs(table)
+    inputs.watch('robotPosition', '1')
+    inputs.watch('robotDefense', 'LowBar')
+
+    assert inputs.get('robotPosition') == '3'
+    assert inputs.get('robotDefense') == 'LowBar'
+
+
+def test_dashboard_inputs_only_change_on_update():
+    table = Table({})
+    inputs = mailbox.DashboardInputs(table)
+    inputs.watch('robotDefense', 'LowBar')
+
+    table.change('robotDefense', 'Portcullis')
+    assert inputs.get('robotDefense') == 'LowBar'
+
+    inputs.update()
+    assert inputs.get('robotDefense') == 'Portcullis'
+
+
+def test_dashboard_inputs_keep_the_latest_value():
+    table = Table({})
+    changes = []
+    inputs = mailbox.DashboardInputs(table)
+    inputs.watch('LightBulb', False, changes.append)
+
+    table.change('LightBulb', True)
+    table.change('LightBulb', False)
+    table.change('LightBulb', True)
+    inputs.update()
+
+    # Every change is handled, in order, and the last one sticks
+    assert changes == [True, False, True]
+    assert inputs.get('LightBulb') is True
+
+    inputs.update()
+    assert changes == [True, False, True]
@@ -0,0 +1,71 @@
+import os
+
+from common import matchRecorder
+
+
+def make_logs(tmpdir, sizes):
+    names = []
+    for i, size in enumerate(sizes):
+        path = tmpdir.join('2016031%d-101500-teleop.matchlog' % i)
+        path.write('x' * size)
+        os.utime(str(path), (1000 + i, 1000 + i))
+        names.append(path.basename)
+    return names
+
+
+def test_no_logs_from_unit_tests():
+    assert matchRecorder.default_directory() is None
+
+
+def test_remove_oldest_over_size(tmpdir):
+    names = make_logs(tmpdir, [100, 100, 100, 100])
+    tmpdir.join('notes.txt').write('x' * 1000)
+
+    removed = matchRecorder.remove_old_logs(str(tmpdir), 250, 10)
+
+    assert removed == names[:2]
+    assert sorted(os.listdir(str(tmpdir))) == sorted(names[2:] + ['notes.txt'])
+
+
+def test_remove_oldest_over_count(tmpdir):
+    names = make_logs(tmpdir, [10, 10, 10, 10, 10])
+
+    removed = matchRecorder.remove_old_logs(str(tmpdir), 1000, 3)
+
+    assert removed == names[:2]
+    assert sorted(os.listdir(str(tmpdir))) == names[2:]
+
+
+def test_nothing_to_remove(tmpdir):
+    make_logs(tmpdir, [10, 10])
+
+    assert matchRecorder.remove_old_logs(str(tmpdir), 1000, 3) == []
+    assert len(os.listdir(str(tmpdir))) == 2
+
+
+class Robot:
+    """Has everything MatchRecorder looks up by name"""
+
+    def __getattr__(self, name):
+        return None
+
+
+def test_not_recording_when_the_disk_is_full(tmpdir):
+    recorder = matchRecorder.MatchRecorder(str(tmpdir), [], None, Robot())
+    recorder.min_free_space = float('inf')
+
+    recorder.start('teleop')
+    assert recorder.logger is None
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_recording_when_there_is_room(tmpdir):
+    recorder = matchRecorder.MatchRecorder(str(tmpdir), [], None, Robot())
+    recorder.min_free_space = 0
+
+    recorder.start('teleop')
+    try:
+        assert recorder.logger is not None
+    finally:
+        recorder.stop()
+    assert len(os.listdir(str(tmpdir))) == 1
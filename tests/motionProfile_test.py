@@ -0,0 +1,89 @@
+import pytest
+
+from common.motionProfile import TrapezoidalProfile
+
+
+def samples(profile, dt=.001):
+    t = 0
+    while t <= profile.total_time + dt:
+        yield t, profile.sample(t)
+        t += dt
+
+
+def test_trapezoid_reaches_cruise():
+    profile = TrapezoidalProfile(100, 20, 10)
+
+    assert profile.accel_time == pytest.approx(2)
+    assert profile.accel_distance == pytest.approx(20)
+    # 60 inches at cruise velocity
+    assert profile.total_time == pytest.approx(2 + 3 + 2)
+    assert profile.sample(3.5) == pytest.approx((20 + 30, 20, 0))
+
+
+def test_triangle_when_too_short():
+    profile = TrapezoidalProfile(10, 20, 10)
+
+    assert profile.max_velocity < 20
+    assert profile.cruise_end == pytest.approx(profile.accel_time)
+    assert profile.sample(profile.accel_time)[0] == pytest.approx(5)
+
+
+@pytest.mark.parametrize('distance', [100, -100, 7, -7])
+def test_limits_and_end(distance):
+    profile = TrapezoidalProfile(distance, 20, 10)
+
+    last = 0
+    for t, (position, velocity, acceleration) in samples(profile):
+        assert abs(velocity) <= 20 + 1e-9
+        assert abs(acceleration) <= 10 + 1e-9
+        # Never goes backwards or past the end
+        assert (position - last) * distance >= -1e-9
+        assert abs(position) <= abs(distance) + 1e-9
+        last = position
+
+    assert profile.sample(profile.total_time) == pytest.approx((distance, 0, 0))
+
+
+def test_before_and_after():
+    profile = TrapezoidalProfile(50, 20, 10)
+
+    assert profile.sample(-1) == (0, 0, 0)
+    assert profile.sample(profile.total_time + 5) == (50, 0, 0)
+
+
+def test_zero_distance():
+    profile = TrapezoidalProfile(0, 20, 10)
+
+    assert profile.total_time == 0
+    assert profile.sample(1) == (0, 0, 0)
+
+
+@pytest.mark.parametrize('distance, initial_velocity', [
+    (100, 10),      # Already moving towards it
+    (100, 30),      # Faster than cruise velocity
+    (-100, -10),
+    (5, 15),        # Too fast to stop in time
+    (100, -15),     # Moving the other way
+    (-100, 15),
+    (0, 10),
+])
+def test_initial_velocity(distance, initial_velocity):
+    profile = TrapezoidalProfile(distance, 20, 10, initial_velocity)
+
+    assert profile.sample(0) == pytest.approx((0, initial_velocity, 0))
+
+    last_position, last_velocity = 0, initial_velocity
+    for t, (position, velocity, acceleration) in samples(profile):
+        assert abs(acceleration) <= 10 + 1e-9
+        # Doesn't jump, and only speeds up to cruise velocity
+        assert abs(velocity - last_velocity) <= 10 * .001 + 1e-9
+        assert abs(velocity) <= max(20, abs(initial_velocity)) + 1e-9
+        assert abs(position - last_position) <= max(20, abs(initial_velocity)) * .001 + 1e-9
+        last_position, last_velocity = position, velocity
+
+    assert profile.sample(profile.total_time + .001) == pytest.approx((distance, 0, 0))
+
+
+def test_initial_velocity_saves_time():
+    assert TrapezoidalProfile(100, 20, 10, 10).total_time < TrapezoidalProfile(100, 20, 10).total_time
+    assert TrapezoidalProfile(100, 20, 10, -10).total_time > TrapezoidalProfile(100, 20, 10).total_time
@@ -0,0 +1,69 @@
+import pytest
+
+from common.odometry import Odometry
+
+
+def test_first_update_only_starts():
+    odometry = Odometry(10)
+    odometry.update(500, 700, 30)
+
+    assert (odometry.x, odometry.y, odometry.heading) == (0, 0, 0)
+
+
+def test_straight():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 0)
+    odometry.update(1000, 1000, 0)
+
+    assert (odometry.x, odometry.y) == pytest.approx((100, 0))
+
+
+def test_heading_is_clockwise():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 0)
+    odometry.update(0, 0, 90)
+    odometry.update(1000, 1000, 90)
+
+    assert odometry.heading == pytest.approx(90)
+    assert (odometry.x, odometry.y) == pytest.approx((0, 100))
+
+
+def test_arc_uses_the_middle_heading():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 0)
+    odometry.update(1000, 1000, 90)
+
+    assert (odometry.x, odometry.y) == pytest.approx((100 * .5 ** .5, 100 * .5 ** .5))
+
+
+def test_heading_wraps():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 170)
+    odometry.update(0, 0, -170)
+
+    assert odometry.heading == pytest.approx(20)
+
+    odometry.reset(heading=170)
+    odometry.update(0, 0, -150)
+    assert odometry.heading == pytest.approx(-170)
+
+
+def test_gyro_reset_doesnt_jump():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 0)
+    odometry.update(0, 0, 45)
+
+    odometry.yaw_reset()
+    odometry.update(0, 0, 0)
+    assert odometry.heading == pytest.approx(45)
+
+
+def test_reset():
+    odometry = Odometry(10)
+    odometry.update(0, 0, 0)
+    odometry.update(1000, 1000, 0)
+
+    odometry.reset(1, 2, 3)
+    assert (odometry.x, odometry.y, odometry.heading) == (1, 2, 3)
+    odometry.update(1100, 1100, 0)
+    assert (odometry.x, odometry.y) == pytest.approx((1 + 10 * .99863, 2 + 10 * .05234), abs=1e-3)
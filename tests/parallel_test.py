@@ -0,0 +1,137 @@
+import pytest
+import wpilib
+
+from common import parallel
+
+
+class Clock:
+    def __init__(self):
+        self.time = 10
+
+    def now(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(clock.now))
+    return clock
+
+
+class Branch:
+    """A branch that's done after a number of calls, and remembers its calls"""
+
+    def __init__(self, calls_needed=None):
+        self.calls_needed = calls_needed
+        self.calls = []
+
+    def __call__(self, initial_call):
+        self.calls.append(initial_call)
+        return self.calls_needed is not None and len(self.calls) >= self.calls_needed
+
+
+def run(p, clock, loops, initial_call=True):
+    """Runs p like a state does, and returns what run() returned each loop"""
+    joined = []
+    for i in range(loops):
+        joined.append(p.run(initial_call and i == 0))
+        clock.time += .25
+    return joined
+
+
+def test_all_waits_for_every_branch(clock):
+    arm, drive = Branch(2), Branch(4)
+    p = parallel.Parallel().add('arm', arm).add('drive', drive)
+
+    assert run(p, clock, 4) == [False, False, False, True]
+
+    # Both run from the start, and each gets initial_call once
+    assert arm.calls == [True, False]
+    assert drive.calls == [True, False, False, False]
+
+
+def test_done_branch_isnt_called_again(clock):
+    arm, drive = Branch(1), Branch(3)
+    p = parallel.Parallel().add('arm', arm).add('drive', drive)
+
+    run(p, clock, 3)
+    assert len(arm.calls) == 1
+    assert p.is_done('arm')
+
+
+def test_any(clock):
+    arm, drive = Branch(2), Branch()
+    p = parallel.Parallel(parallel.ANY).add('arm', arm).add('drive', drive)
+
+    assert run(p, clock, 2) == [False, True]
+
+
+def test_join_on_one_branch(clock):
+    arm, drive = Branch(), Branch(2)
+    p = parallel.Parallel('drive').add('arm', arm).add('drive', drive)
+
+    # The arm never finishes, but only the drive has to
+    assert run(p, clock, 2) == [False, True]
+
+
+def test_start_when(clock):
+    arm, drive = Branch(), Branch(2)
+    p = parallel.Parallel().add('arm', arm).add('drive', drive, start_when=lambda elapsed: elapsed >= .5)
+
+    run(p, clock, 3)
+    # Started on the third loop, and that's its initial call
+    assert drive.calls == [True]
+    assert p.elapsed('drive') == .25
+    assert p.elapsed('arm') == .75
+
+
+def test_timeout(clock):
+    arm, drive = Branch(), Branch(2)
+    p = parallel.Parallel().add('arm', arm, timeout=.5).add('drive', drive)
+
+    # The arm counts as done half a second after it started
+    assert run(p, clock, 3) == [False, False, True]
+    assert len(arm.calls) == 3
+
+
+def test_reset_mid_run(clock):
+    arm, drive = Branch(2), Branch(4)
+    p = parallel.Parallel().add('arm', arm).add('drive', drive)
+
+    run(p, clock, 3)
+    assert p.is_done('arm')
+
+    p.reset()
+    assert not p.is_done('arm')
+    assert p.elapsed('drive') is None
+
+    # Everything starts over, with initial calls again
+    arm.calls, drive.calls = [], []
+    run(p, clock, 1, initial_call=False)
+    assert arm.calls == [True]
+    assert drive.calls == [True]
+
+
+def test_leaving_the_state_and_coming_back(clock):
+    # A state that's left partway and entered again passes initial_call,
+    # which starts the branches over, timeouts and all
+    arm, drive = Branch(), Branch()
+    p = parallel.Parallel().add('arm', arm, timeout=1).add('drive', drive)
+
+    run(p, clock, 3)
+    clock.time += 5
+    assert run(p, clock, 1) == [False]
+    assert arm.calls == [True, False, False, True]
+    assert not p.is_done('arm')
+
+
+def test_names(clock):
+    p = parallel.Parallel().add('arm', Branch())
+
+    with pytest.raises(ValueError):
+        p.add('arm', Branch())
+    with pytest.raises(ValueError):
+        p.is_done('drive')
+    with pytest.raises(ValueError):
+        p.elapsed('drive')
@@ -0,0 +1,99 @@
+import pytest
+
+from common.pidController import PIDController
+
+
+def test_integral_stops_while_saturated():
+    pid = PIDController(1, I=1, output_limit=.5)
+
+    # Error of 10 saturates the output, so nothing should build up
+    for i in range(100):
+        pid.update(10, 0, i * .02)
+
+    assert pid.integral == 0
+    assert pid.output == .5
+
+    # Integrates again once the output comes off the limit
+    pid.update(10, 9.9, 2.02)
+    assert pid.integral == 0
+    pid.update(10, 9.9, 2.04)
+    assert pid.integral > 0
+
+
+def test_integral_limit():
+    pid = PIDController(0, I=2, integral_limit=.2)
+
+    for i in range(100):
+        pid.update(1, 0, i * .02)
+
+    assert pid.integral == pytest.approx(.1)
+    assert pid.update(1, 0, 2.02) == pytest.approx(.2)
+
+
+def test_slew_limit():
+    pid = PIDController(1, slew_rate=3)
+
+    outputs = [pid.update(100, 0, i * .01) for i in range(50)]
+
+    # The first update has no dt, so it can't move at all
+    assert outputs[0] == 0
+    for last, output in zip(outputs, outputs[1:]):
+        assert output - last <= .03 + 1e-9
+    assert outputs[-1] == 1
+
+
+def test_hold_time_and_settle_time():
+    pid = PIDController(1, tolerance=1, rate_tolerance=5, hold_time=.2)
+
+    pid.update(10, 0, 0)
+    assert not pid.on_target()
+
+    # In tolerance, but still moving too fast
+    pid.update(10, 9.5, .1, rate=20)
+    assert not pid.on_target()
+
+    pid.update(10, 9.6, .2, rate=1)
+    pid.update(10, 9.7, .3, rate=1)
+    assert not pid.on_target()
+    pid.update(10, 9.8, .4, rate=1)
+    assert pid.on_target()
+    assert pid.settle_time == pytest.approx(.4)
+
+    # Leaving tolerance starts the wait over, but settle_time is kept
+    pid.update(10, 8, .5, rate=1)
+    assert not pid.on_target()
+    pid.update(10, 9.9, .6, rate=1)
+    assert not pid.on_target()
+    assert pid.settle_time == pytest.approx(.4)
+
+
+def test_no_hold_time():
+    pid = PIDController(1, tolerance=1)
+
+    assert not pid.on_target()
+    pid.update(10, 9.5, 0)
+    assert pid.on_target()
+    assert pid.settle_time == 0
+
+
+def test_new_setpoint_is_a_new_move():
+    pid = PIDController(1, tolerance=1)
+
+    pid.update(10, 10, 0)
+    assert pid.on_target()
+
+    # Within tolerance of the old setpoint is the same move
+    pid.update(10.5, 10, .1)
+    assert pid.on_target()
+
+    pid.update(20, 10, .2)
+    assert not pid.on_target()
+    assert pid.settle_time is None
+
+
+def test_continuous_error():
+    pid = PIDController(.01, continuous=360)
+
+    # 350 -> 10 is 20 degrees the short way, not 340 the long way
+    assert pid.update(10, 350, 0) == pytest.approx(.2)
+    assert pid.update(350, 10, .02) == pytest.approx(-.2)
@@ -0,0 +1,159 @@
+import pytest
+
+from common import scheduler
+
+
+class Clock:
+    """A clock for the scheduler that only moves when something takes time"""
+
+    def __init__(self):
+        self.time = 100
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += seconds
+
+
+def make_scheduler(period=.25):
+    # A period that's exact in binary, so the tests don't depend on rounding
+    clock = Clock()
+    s = scheduler.Scheduler(period)
+    s.now = clock.now
+    s.sleep = clock.sleep
+    return s, clock
+
+
+def test_no_drift():
+    s, clock = make_scheduler()
+    starts = []
+
+    def task():
+        starts.append(clock.time)
+        # Takes a different amount of time each loop
+        clock.time += .001 * (len(starts) % 7)
+
+    s.add('task', task)
+    s.start()
+    for i in range(500):
+        s.run_tick()
+        s.wait()
+
+    # Still lined up with the start, however long each loop took
+    for i, start in enumerate(starts):
+        assert start == 100 + i * .25
+    assert s.missed == 0
+
+
+def test_missed_ticks_are_skipped():
+    s, clock = make_scheduler()
+    starts = []
+
+    def task():
+        starts.append(clock.time)
+        if len(starts) == 3:
+            # Runs past the next tick, and halfway into the one after
+            clock.time += .625
+
+    s.add('task', task)
+    s.start()
+    for i in range(5):
+        s.run_tick()
+        s.wait()
+
+    # The tick that went by is skipped, the one it's in the middle of
+    # runs late, and then it's back on time
+    assert s.missed == 1
+    assert starts == [100, 100.25, 100.5, 101.125, 101.25]
+    assert s.ticks == 6
+
+
+def test_slow_tasks_keep_their_rate():
+    s, clock = make_scheduler()
+    ran = []
+
+    s.add('fast', lambda: None)
+    s.add('slow', lambda: ran.append(s.ticks), rate=1)
+
+    s.start()
+    s.run_tick()
+    s.wait()
+    # Stalls for ticks 1 to 4, so 2 to 4 are missed
+    clock.time += 1
+    for i in range(20):
+        s.run_tick()
+        s.wait()
+
+    # Still every 4 ticks in real time, it doesn't shift after the stall
+    assert s.missed == 3
+    assert ran == [0, 8, 12, 16, 20]
+
+
+def test_offsets_spread_slow_tasks():
+    s, clock = make_scheduler()
+    ran = {}
+
+    for name in ('a', 'b', 'c'):
+        ran[name] = []
+        s.add(name, lambda name=name: ran[name].append(s.ticks), rate=.8)
+    s.add('every', lambda: ran.setdefault('every', []).append(s.ticks))
+
+    s.start()
+    for i in range(10):
+        s.run_tick()
+        s.wait()
+
+    assert ran['every'] == list(range(10))
+    assert ran['a'] == [0, 5]
+    assert ran['b'] == [4, 9]
+    assert ran['c'] == [3, 8]
+
+
+def test_low_priority_is_shed():
+    s, clock = make_scheduler()
+    ran = []
+
+    def slow_motor():
+        if s.ticks == 1:
+            clock.time += .375
+
+    s.add('motors', slow_motor)
+    s.add('telemetry', lambda: ran.append(s.ticks), priority=scheduler.LOW)
+
+    s.start()
+    for i in range(4):
+        s.run_tick()
+        s.wait()
+
+    # Tick 1 ran past its deadline, so telemetry was put off to tick 2
+    assert s.shed_counts() == {'telemetry': 1}
+    assert ran == [0, 2, 3]
+
+
+def test_low_priority_that_wont_fit():
+    s, clock = make_scheduler()
+    ran = []
+
+    def telemetry():
+        ran.append(s.ticks)
+        clock.time += .125
+
+    s.add('motors', lambda: None)
+    s.add('telemetry', telemetry, priority=scheduler.LOW)
+
+    s.start()
+    s.run_tick()
+    s.wait()
+    assert s.tasks[1].cost == pytest.approx(.025)
+
+    # Once it's known to take long enough to miss the deadline, it's put
+    # off to the next tick, and then runs anyway
+    s.tasks[1].cost = .25
+    clock.time += .01
+    for i in range(2):
+        s.run_tick()
+        s.wait()
+
+    assert s.shed_counts() == {'telemetry': 1}
+    assert ran == [0, 2]
@@ -0,0 +1,70 @@
+import pytest
+
+from common import sensors
+
+
+def make_sensors(samples=()):
+    s = sensors.Sensors(None, None, None, None, None, None)
+    for t, yaw in samples:
+        s._record_yaw(t, yaw)
+    return s
+
+
+def test_yaw_at_a_sample():
+    s = make_sensors([(1, 10), (1.02, 12), (1.04, 14)])
+    assert s.yaw_at(1.02) == 12
+
+
+def test_yaw_at_between_samples():
+    s = make_sensors([(1, 10), (1.02, 12), (1.04, 20)])
+    assert s.yaw_at(1.03) == pytest.approx(16)
+
+
+def test_yaw_at_across_180():
+    # The short way round, not back through 0
+    s = make_sensors([(1, 170), (1.02, -170)])
+    assert abs(s.yaw_at(1.01)) == pytest.approx(180)
+    assert s.yaw_at(1.015) == pytest.approx(-175)
+
+
+def test_yaw_at_past_the_ends():
+    s = make_sensors([(1, 10), (1.02, 12), (1.04, 14)])
+    assert s.yaw_at(0) == 10
+    assert s.yaw_at(2) == 14
+
+
+def test_yaw_at_after_wrapping_around():
+    size = sensors.Sensors.yaw_history_size
+    s = make_sensors((i, i % 90) for i in range(size + 10))
+
+    # The first 10 were written over, so the oldest left is 10
+    assert s.yaw_at(0) == 10
+    assert s.yaw_at(size + 9) == (size + 9) % 90
+    assert s.yaw_at(size + 2.5) == pytest.approx((size + 2.5) % 90)
+
+
+def test_yaw_at_with_no_history():
+    assert make_sensors().yaw_at(1) == 0
+
+
+def test_yaw_rate():
+    # 90 degrees a second, sampled every 20ms
+    s = make_sensors((1 + i * .02, i * 1.8) for i in range(10))
+    assert s._yaw_rate(1.2, 18) == pytest.approx(90)
+
+
+def test_yaw_rate_uses_the_window():
+    # The last loop is noise, the window smooths it out
+    s = make_sensors([(1, 0), (1.02, 1.8), (1.04, 3.6), (1.06, 7)])
+    assert s._yaw_rate(1.08, 7.2) == pytest.approx((7.2 - 1.8) / .06)
+
+
+def test_yaw_rate_across_180():
+    s = make_sensors([(1, 175), (1.02, 177), (1.04, 179)])
+    assert s._yaw_rate(1.06, -179) == pytest.approx(6 / .06)
+
+
+def test_yaw_rate_with_no_history():
+    assert make_sensors()._yaw_rate(1, 10) == 0
+    # Only this loop's sample, so nothing to compare against
+    assert make_sensors([(1, 10)])._yaw_rate(1, 10) == 0
@@ -0,0 +1,50 @@
+import pytest
+import wpilib
+from magicbot.magic_tunable import setup_tunables
+
+from automations import shootBall
+
+
+class Arm:
+    """Stands in for intake.Arm, at a set position and time from the middle"""
+
+    def __init__(self, position, time_to_middle):
+        self.position = position
+        self.time_to_middle = time_to_middle
+        self.firing = False
+
+    def set_arm_middle(self):
+        pass
+
+    def get_position(self):
+        return self.position
+
+    def ready_to_fire(self):
+        return self.time_to_middle <= .15
+
+    def outtake(self):
+        self.firing = True
+
+
+def shoot(arm, monkeypatch):
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(lambda: 1))
+    shooter = shootBall.ShootBall()
+    setup_tunables(shooter, 'shootBall')
+    shooter.intake = arm
+    shooter.shoot()
+    shooter.execute()
+    return arm.firing
+
+
+def test_fires_straight_away_from_the_bottom(monkeypatch):
+    # Like the old position check, it doesn't wait for the arm to come up
+    assert shoot(Arm(3000, 1), monkeypatch)
+
+
+def test_waits_for_the_middle_from_the_top(monkeypatch):
+    assert not shoot(Arm(-20, 1), monkeypatch)
+
+
+@pytest.mark.parametrize('time_to_middle', [.1, .15])
+def test_fires_just_before_the_middle(monkeypatch, time_to_middle):
+    assert shoot(Arm(1500, time_to_middle), monkeypatch)
@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+from common.splinePath import SplinePath
+
+
+def test_straight_line():
+    path = SplinePath((0, 0, 0), (100, 0, 0))
+
+    assert path.length == pytest.approx(100)
+    for y in path.ys:
+        assert y == pytest.approx(0)
+    assert path.point_at(25) == pytest.approx((25, 0))
+
+
+def test_ends_at_the_poses():
+    path = SplinePath((0, 0, 0), (50, 120, -45))
+
+    assert (path.xs[0], path.ys[0]) == pytest.approx((0, 0))
+    assert (path.xs[-1], path.ys[-1]) == pytest.approx((50, 120))
+    assert path.point_at(0) == pytest.approx((0, 0))
+    assert path.point_at(path.length) == pytest.approx((50, 120))
+
+    # A curve is longer than the straight line between its ends
+    assert path.length > math.hypot(50, 120)
+
+
+def test_distances_increase():
+    path = SplinePath((0, 0, 0), (50, -120, 45))
+
+    for last, distance in zip(path.distances, path.distances[1:]):
+        assert distance > last
+
+
+def test_past_the_end_follows_the_heading():
+    path = SplinePath((0, 0, 0), (50, 50, 90))
+
+    x, y = path.point_at(path.length + 10)
+    assert x == pytest.approx(50)
+    assert y == pytest.approx(60)
+
+
+def test_closest():
+    path = SplinePath((0, 0, 0), (100, 0, 0), spacing=10)
+
+    assert path.closest(31, 5) == 3
+    # Only looks forward from the hint
+    assert path.closest(0, 0, hint=4) == 4
+    # And only within the window
+    assert path.closest(100, 0, window=3) == 2
@@ -0,0 +1,153 @@
+import pytest
+import wpilib
+from magicbot import state as machine_state
+from magicbot.magic_tunable import setup_tunables
+from robotpy_ext.autonomous import state
+
+from common import stateChaining
+
+
+class Chain(stateChaining.ChainedAutonomous):
+    MODE_NAME = 'Chain Test'
+
+    def initialize(self):
+        self.ran = []
+
+    @stateChaining.instant
+    @state(first=True)
+    def start(self):
+        self.ran.append('start')
+        self.next_state('decide')
+
+    @stateChaining.instant
+    @state
+    def decide(self):
+        self.ran.append('decide')
+        self.next_state('drive')
+
+    @state
+    def drive(self):
+        self.ran.append('drive')
+        self.next_state('stop')
+
+    @state
+    def stop(self):
+        self.ran.append('stop')
+        self.done()
+
+
+class Loop(stateChaining.ChainedAutonomous):
+    MODE_NAME = 'Loop Test'
+
+    def initialize(self):
+        self.ran = 0
+
+    @stateChaining.instant
+    @state(first=True)
+    def spin(self):
+        self.ran += 1
+        self.next_state('spin')
+
+
+class Waits(stateChaining.ChainedAutonomous):
+    MODE_NAME = 'Wait Test'
+
+    def initialize(self):
+        self.ran = []
+
+    @stateChaining.instant
+    @state(first=True)
+    def start(self, initial_call):
+        self.ran.append(('start', initial_call))
+        if not initial_call:
+            self.next_state('drive')
+
+    @state
+    def drive(self):
+        self.ran.append(('drive', True))
+
+
+def test_instant_states_chain_in_one_loop():
+    mode = Chain()
+    mode.on_enable()
+
+    # Both instant states hand off straight away, drive takes a loop
+    mode.on_iteration(0)
+    assert mode.ran == ['start', 'decide', 'drive']
+
+    mode.on_iteration(.02)
+    assert mode.ran == ['start', 'decide', 'drive', 'stop']
+
+    mode.on_iteration(.04)
+    assert len(mode.ran) == 4
+
+
+def test_instant_state_that_stays_takes_a_loop():
+    mode = Waits()
+    mode.on_enable()
+
+    mode.on_iteration(0)
+    assert mode.ran == [('start', True)]
+
+    mode.on_iteration(.02)
+    assert mode.ran == [('start', True), ('start', False), ('drive', True)]
+
+
+def test_max_chain():
+    mode = Loop()
+    mode.on_enable()
+
+    # A state that keeps moving to itself can't hang the loop
+    mode.on_iteration(0)
+    assert mode.ran == Loop.max_chain
+    mode.on_iteration(.02)
+    assert mode.ran == 2 * Loop.max_chain
+
+
+class Automation(stateChaining.ChainedStateMachine):
+
+    def __init__(self):
+        self.ran = []
+
+    @stateChaining.instant
+    @machine_state(first=True)
+    def start(self):
+        self.ran.append('start')
+        self.next_state('lift')
+
+    @machine_state
+    def lift(self):
+        self.ran.append('lift')
+
+
+@pytest.fixture
+def automation(monkeypatch):
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(lambda: 1))
+    automation = Automation()
+    # MagicRobot does this for its components
+    setup_tunables(automation, 'automation')
+    return automation
+
+
+def test_state_machine_keeps_engage(automation):
+    automation.engage()
+    automation.execute()
+
+    # The second state still sees the engage from this loop, instead of
+    # ending the state machine
+    assert automation.ran == ['start', 'lift']
+    assert automation.is_executing
+
+    automation.engage()
+    automation.execute()
+    assert automation.ran == ['start', 'lift', 'lift']
+
+    # And it stops when it isn't engaged
+    automation.execute()
+    assert automation.ran == ['start', 'lift', 'lift']
+    assert not automation.is_executing
+
+
+def test_state_machine_without_engage(automation):
+    automation.execute()
+    assert automation.ran == []
@@ -0,0 +1,122 @@
+import pytest
+import wpilib
+
+from common import telemetry
+
+
+class Table:
+    def __init__(self):
+        self.values = []
+
+    def putValue(self, key, value):
+        self.values.append((key, value))
+
+
+class Clock:
+    def __init__(self):
+        self.time = 10
+
+    def now(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', staticmethod(clock.now))
+    return clock
+
+
+def make_telemetry():
+    table = Table()
+    return telemetry.Telemetry(table), table
+
+
+def test_only_changes_are_sent(clock):
+    t, table = make_telemetry()
+
+    for value in (1, 1, 2, 2, 1):
+        t.put('Arm/Calibrated', value)
+        t.flush()
+
+    assert table.values == [('Arm/Calibrated', 1), ('Arm/Calibrated', 2), ('Arm/Calibrated', 1)]
+    assert t.sent == 3
+    assert t.suppressed == 2
+
+
+def test_last_put_before_a_flush_wins(clock):
+    t, table = make_telemetry()
+
+    t.put('Mode', 'auto')
+    t.put('Mode', 'teleop')
+    t.flush()
+
+    assert table.values == [('Mode', 'teleop')]
+
+
+def test_deadband(clock):
+    t, table = make_telemetry()
+    t.register('Arm/Encoder', deadband=5)
+
+    for value in (100, 103, 104, 106, 110):
+        t.put('Arm/Encoder', value)
+        t.flush()
+
+    # Measured from the last value sent, not the last one put
+    assert [value for key, value in table.values] == [100, 106]
+    assert t.suppressed == 3
+
+
+def test_rate(clock):
+    t, table = make_telemetry()
+    t.register('Arm/Position', rate=4)
+
+    # Changes every 62.5ms, sent at most every 250ms. The times are exact
+    # in binary, so the tests don't depend on rounding.
+    for i in range(9):
+        t.put('Arm/Position', i)
+        t.flush()
+        clock.time += .0625
+
+    assert [value for key, value in table.values] == [0, 4, 8]
+
+
+def test_rate_limited_value_still_gets_there(clock):
+    t, table = make_telemetry()
+    t.register('Arm/Position', rate=4)
+
+    t.put('Arm/Position', 1)
+    t.flush()
+    clock.time += .125
+    t.put('Arm/Position', 2)
+    t.flush()
+    assert table.values == [('Arm/Position', 1)]
+
+    # Nothing else is put, but it goes once the period's up
+    clock.time += .0625
+    t.flush()
+    assert table.values == [('Arm/Position', 1)]
+    clock.time += .0625
+    t.flush()
+    assert table.values == [('Arm/Position', 1), ('Arm/Position', 2)]
+
+    clock.time += 1
+    t.flush()
+    assert len(table.values) == 2
+
+
+def test_rate_limited_value_that_goes_back(clock):
+    t, table = make_telemetry()
+    t.register('Arm/Position', rate=4)
+
+    t.put('Arm/Position', 1)
+    t.flush()
+    t.put('Arm/Position', 2)
+    t.flush()
+    t.put('Arm/Position', 1)
+    t.flush()
+
+    # It's back to what was sent, so there's nothing left to send
+    clock.time += 1
+    t.flush()
+    assert table.values == [('Arm/Position', 1)]